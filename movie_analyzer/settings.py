@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # قياس زمن الطلبات واستعلاماتها؛ لا يعمل إلا مع MOVIES_PROFILE_REQUESTS
+    'movies.profiling.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # Added for i18n
     'django.middleware.common.CommonMiddleware',
@@ -119,28 +121,129 @@ FILE_UPLOAD_HANDLERS = [
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Movie import settings
+MOVIES_IMPORT_CHUNK_SIZE = int(os.getenv('MOVIES_IMPORT_CHUNK_SIZE', 5000))  # صفوف لكل جزء عند قراءة CSV
+MOVIES_EXCEL_MAX_UPLOAD_SIZE = 15 * 1024 * 1024  # 15MB - ملفات Excel تُحمّل كاملة في الذاكرة
+MOVIES_CSV_MAX_UPLOAD_SIZE = None  # ملفات CSV تُستورد على أجزاء بذاكرة ثابتة
+# محرك قراءة CSV: 'auto' (pyarrow إن كانت مثبتة)، 'pyarrow'، أو 'c' (محرك pandas الافتراضي)
+MOVIES_CSV_ENGINE = os.getenv('MOVIES_CSV_ENGINE', 'auto')
+# صفوف لكل INSERT: رقم ثابت أو 'auto' (من max_allowed_packet في MySQL وحد المتغيرات في SQLite)
+MOVIES_IMPORT_BATCH_SIZE = os.getenv('MOVIES_IMPORT_BATCH_SIZE', 'auto')
+# تثبيت المعاملة كل N دفعة لتقصير مدة الأقفال (None = كل جزء، أو كل الملف عند الرفع المباشر)
+MOVIES_IMPORT_COMMIT_EVERY = int(os.getenv('MOVIES_IMPORT_COMMIT_EVERY', 0)) or None
+# عدد العمليات التي تحوّل الملفات/الأوراق بالتوازي عند استيراد عدة مصادر في عامل الاستيراد
+# وأمر import_movies (None = عدد المعالجات)؛ الرفع من الويب يحوّلها في عملية الطلب
+MOVIES_IMPORT_WORKERS = int(os.getenv('MOVIES_IMPORT_WORKERS', 0)) or None
+# الملفات الأكبر من هذا الحجم تُحوَّل تلقائياً إلى مهمة خلفية (None = فقط عند طلب المستخدم)
+# تتطلب تشغيل العامل: python manage.py run_import_worker
+MOVIES_BACKGROUND_IMPORT_THRESHOLD = None
+# مهمة قيد التنفيذ لم يُحدّث عاملها تقدمها منذ هذا العدد من الثواني تُعتبر متوقفة (انهيار العامل)
+# فتُعاد إلى الانتظار، أو تُعلَّم فاشلة بعد MOVIES_IMPORT_JOB_MAX_ATTEMPTS محاولات
+MOVIES_IMPORT_JOB_TIMEOUT = int(os.getenv('MOVIES_IMPORT_JOB_TIMEOUT', 30 * 60))
+MOVIES_IMPORT_JOB_MAX_ATTEMPTS = 3
+# عدد المخرجين (الأكثر أفلاماً) في تجميع المخرجين بلوحة التحليلات
+MOVIES_ANALYTICS_TOP_DIRECTORS = 50
+# عدد الصفوف المرفوضة المحفوظة في تقرير كل استيراد (ImportRun.error_report) بدلاً من السجل
+MOVIES_ERROR_REPORT_ROWS = 200
+# عدد الصفوف المرفوضة التي تبقى في ذاكرة نتيجة الاستيراد؛ كلها تُكتب إلى تقرير CSV على القرص
+MOVIES_IMPORT_ERROR_ROWS_IN_MEMORY = 1000
+# مجلد بيانات التطبيق الدائمة خارج MEDIA_ROOT (لا يُقدَّم للعموم)؛ يجب أن يكون على تخزين مشترك
+# بين كل الخوادم وعمال الاستيراد عند تشغيل أكثر من مضيف أو حاوية
+MOVIES_DATA_DIR = os.getenv('MOVIES_DATA_DIR') or os.path.join(BASE_DIR, 'data')
+# مجلد تقارير الصفوف المرفوضة القابلة للتنزيل (يكتبها العامل ويقرؤها خادم الويب) ومدة الاحتفاظ بها بالثواني
+MOVIES_ERROR_REPORT_DIR = os.getenv('MOVIES_ERROR_REPORT_DIR') or os.path.join(MOVIES_DATA_DIR, 'import_errors')
+MOVIES_ERROR_REPORT_MAX_AGE = 7 * 24 * 3600
+# قياس كل طلب (عدد الاستعلامات وزمنها وأبطأها) في ترويسة Server-Timing وصفحة /debug/requests/
+MOVIES_PROFILE_REQUESTS = os.getenv('MOVIES_PROFILE_REQUESTS', 'False') == 'True'
+# عدد آخر الطلبات المحفوظة لكل مسار، وعدد أبطأ الاستعلامات المحفوظة لكل طلب
+MOVIES_PROFILE_WINDOW = 200
+MOVIES_PROFILE_SLOW_QUERIES = 5
 # Django tables 2 configuration
 DJANGO_TABLES2_TEMPLATE = "django_tables2/bootstrap4.html"
 
+# Cache configuration (locmem افتراضياً، ويمكن استخدام filebased عبر متغيرات البيئة)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'movie-analyzer'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,  # سياسة الإزالة: حذف ثلث المدخلات عند الامتلاء
+            'CULL_FREQUENCY': 3,
+        },
+    }
+}
+MOVIES_CACHE_ALIAS = 'default'
+# مدة صلاحية كل نوع من مدخلات صفحة النتائج (بالثواني)؛ تُبطل كلها فوراً عند الاستيراد
+MOVIES_CACHE_TIMEOUTS = {
+    'stats': 300,
+    'highest_values': 300,
+    'table_page': 120,
+}
+
+# Results table pagination
+# keyset: صفحات بمؤشرات (rating, id) دون OFFSET أو COUNT(*)؛ offset: الترقيم التقليدي برقم الصفحة
+MOVIES_RESULTS_PAGINATION = os.getenv('MOVIES_RESULTS_PAGINATION', 'keyset')
+# مصدر العدد الكلي المعروض: cached (ملخص الإحصائيات) أو approximate (تقدير MySQL) أو exact أو none
+MOVIES_RESULTS_COUNT = 'cached'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Logging configuration
+# السجلات تُكتب من خيط خلفي (طابور محدود) إلى debug.log مع تدوير بالحجم، ومستوى كل
+# مسجل قابل للضبط: استعلامات SQL (django.db.backends) لا تُسجل إلا بطلب صريح
+LOG_LEVEL = os.getenv('DJANGO_LOG_LEVEL', 'INFO')
+SQL_LOG_LEVEL = os.getenv('DJANGO_SQL_LOG_LEVEL', 'WARNING')  # DEBUG لتسجيل كل استعلام
+MOVIES_LOG_LEVEL = os.getenv('MOVIES_LOG_LEVEL', 'INFO')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            # يعرض عدد التحذيرات المتشابهة التي أسقطها rate_limit
+            '()': 'movies.logging_utils.SuppressedCountFormatter',
+            'fmt': '{asctime} {levelname} {name} [{process}:{threadName}] {message}',
+            'style': '{',
+        },
+    },
+    'filters': {
+        # تحذيرات متكررة (WARNING فقط): 10 في الدقيقة لكل رسالة ثم عينة 1 من كل 100
+        'rate_limit': {
+            '()': 'movies.logging_utils.RateLimitFilter',
+            'rate': 10,
+            'per': 60,
+            'sample_every': 100,
+        },
+    },
     'handlers': {
         'file': {
+            '()': 'movies.logging_utils.BackgroundRotatingFileHandler',
+            # مع عدة عمليات (عمال gunicorn) يُفضَّل ملف لكل عملية: DJANGO_LOG_FILE=/path/debug-{pid}.log
+            'filename': os.getenv('DJANGO_LOG_FILE', os.path.join(BASE_DIR, 'debug.log')),
+            'max_bytes': int(os.getenv('DJANGO_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            'backup_count': int(os.getenv('DJANGO_LOG_BACKUP_COUNT', 5)),
+            'queue_size': 10000,
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'debug.log'),
+            'formatter': 'verbose',
+            'filters': ['rate_limit'],
         },
     },
     'loggers': {
         'django': {
             'handlers': ['file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'django.db.backends': {
+            'level': SQL_LOG_LEVEL,
+        },
+        'movies': {
+            'handlers': ['file'],
+            'level': MOVIES_LOG_LEVEL,
+            'propagate': False,
         },
     },
 }
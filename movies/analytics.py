@@ -0,0 +1,173 @@
+"""
+تجميعات لوحة التحليلات: توزيع التقييمات، عدد الأفلام لكل سنة، متوسط التقييم
+والإيرادات لكل سنة ونوع ومخرج، وارتباط التقييم بالإيرادات.
+
+كل تجميع يُحسب في قاعدة البيانات (GROUP BY و AVG) ويُخزَّن في جدول
+AnalyticsRollup بعد كل استيراد، فتقرأ نقطة النهاية صفاً واحداً بدلاً من
+مسح جدول الأفلام عند كل طلب. حفظ فيلم أو حذفه (الإدارة أو ORM) يحذف التجميعات
+المحفوظة مع معاملته، فيُعاد حسابها عند أول طلب بعده.
+"""
+import logging
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum
+from django.db.models.functions import Floor
+
+from .dimensions import director_breakdown, genre_breakdown
+from .models import AnalyticsRollup, Movie
+
+logger = logging.getLogger(__name__)
+
+# عرض فئة مدرج التقييمات (التقييم من 0 إلى 10)
+RATING_BUCKET_WIDTH = 0.5
+MAX_RATING = 10
+
+# عدد المخرجين في تجميع المخرجين (الأكثر أفلاماً)
+DEFAULT_TOP_DIRECTORS = 50
+
+
+def get_top_directors():
+    return getattr(settings, 'MOVIES_ANALYTICS_TOP_DIRECTORS', DEFAULT_TOP_DIRECTORS)
+
+
+def _round(value, digits=2):
+    return None if value is None else round(value, digits)
+
+
+def rating_histogram():
+    """عدد الأفلام في كل فئة تقييم بعرض RATING_BUCKET_WIDTH (كل الفئات حتى الفارغة)"""
+    bucket_count = int(MAX_RATING / RATING_BUCKET_WIDTH)
+    counts = [0] * bucket_count
+    rows = (
+        Movie.objects
+        .annotate(bucket=Floor(F('rating') / RATING_BUCKET_WIDTH))
+        .values('bucket')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for row in rows:
+        # التقييم 10 يقع في الفئة الأخيرة
+        counts[min(max(int(row['bucket']), 0), bucket_count - 1)] += row['count']
+    return [
+        {
+            'rating_from': index * RATING_BUCKET_WIDTH,
+            'rating_to': (index + 1) * RATING_BUCKET_WIDTH,
+            'count': count,
+        }
+        for index, count in enumerate(counts)
+    ]
+
+
+def by_year():
+    """عدد الأفلام ومتوسط التقييم والإيرادات لكل سنة"""
+    rows = (
+        Movie.objects.values('year')
+        .annotate(count=Count('pk'), avg_rating=Avg('rating'), avg_revenue=Avg('revenue'))
+        .order_by('year')
+    )
+    return [
+        {
+            'year': row['year'],
+            'count': row['count'],
+            'avg_rating': _round(row['avg_rating']),
+            'avg_revenue': _round(row['avg_revenue']),
+        }
+        for row in rows
+    ]
+
+
+def _dimension_rows(queryset):
+    return [
+        {
+            'name': item.name,
+            'count': item.movie_count,
+            'avg_rating': _round(item.avg_rating),
+            'avg_revenue': _round(item.avg_revenue),
+        }
+        for item in queryset
+    ]
+
+
+def by_genre():
+    """عدد الأفلام ومتوسط التقييم والإيرادات لكل نوع"""
+    return _dimension_rows(genre_breakdown())
+
+
+def by_director():
+    """نفس التجميع لأكثر المخرجين أفلاماً (MOVIES_ANALYTICS_TOP_DIRECTORS)"""
+    return _dimension_rows(director_breakdown()[:get_top_directors()])
+
+
+def rating_revenue_correlation():
+    """
+    معامل ارتباط بيرسون بين التقييم والإيرادات للأفلام ذات الإيرادات.
+    يُحسب على مرحلتين في قاعدة البيانات (المتوسطات ثم مجاميع الانحرافات)
+    لتفادي فقد الدقة في المجاميع الكبيرة.
+    """
+    movies = Movie.objects.filter(revenue__isnull=False)
+    means = movies.aggregate(count=Count('pk'), rating=Avg('rating'), revenue=Avg('revenue'))
+    result = {'count': means['count'], 'correlation': None}
+    if means['count'] < 2:
+        return result
+
+    rating = F('rating') - means['rating']
+    revenue = F('revenue') - means['revenue']
+    sums = movies.aggregate(
+        covariance=Sum(rating * revenue),
+        rating_variance=Sum(rating * rating),
+        revenue_variance=Sum(revenue * revenue),
+    )
+    denominator = math.sqrt((sums['rating_variance'] or 0) * (sums['revenue_variance'] or 0))
+    if denominator:
+        result['correlation'] = round(sums['covariance'] / denominator, 4)
+    return result
+
+
+# اسم التجميع في الرابط وجدول AnalyticsRollup ← دالة حسابه
+ROLLUPS = {
+    'rating_histogram': rating_histogram,
+    'by_year': by_year,
+    'by_genre': by_genre,
+    'by_director': by_director,
+    'rating_revenue_correlation': rating_revenue_correlation,
+}
+
+
+def refresh_rollup(name):
+    """إعادة حساب تجميع واحد وحفظه"""
+    rollup, _ = AnalyticsRollup.objects.update_or_create(name=name, defaults={'data': ROLLUPS[name]()})
+    return rollup
+
+
+def refresh_rollups():
+    """إعادة حساب كل التجميعات في معاملة واحدة (لا تُقرأ مجموعة نصف محدَّثة)"""
+    with transaction.atomic():
+        return {name: refresh_rollup(name) for name in ROLLUPS}
+
+
+def refresh_rollups_on_commit():
+    """
+    إعادة الحساب بعد تثبيت معاملة الاستيراد الحالية (فوراً إن لم تكن هناك معاملة).
+    فشلها يُسجَّل دون إفشال الاستيراد، ويبقى آخر تجميع محفوظ.
+    """
+    transaction.on_commit(refresh_rollups, robust=True)
+
+
+def invalidate_rollups():
+    """
+    تعليم التجميعات قديمة بعد تعديل فيلم واحد: حذفها داخل معاملة الكتابة بدلاً
+    من إعادة حسابها كلها مع كل save أو delete، ويعيد get_rollup حسابها عند الطلب.
+    """
+    AnalyticsRollup.objects.all().delete()
+
+
+def get_rollup(name):
+    """التجميع المحفوظ، أو حسابه وحفظه إن لم يكن موجوداً"""
+    if name not in ROLLUPS:
+        raise ValueError(f'تجميع غير معروف: {name}')
+    rollup = AnalyticsRollup.objects.filter(name=name).first()
+    if rollup is None:
+        rollup = refresh_rollup(name)
+    return rollup
@@ -0,0 +1,101 @@
+"""
+واجهة برمجية للقراءة فقط (JSON): قائمة الأفلام بمؤشرات keyset، فيلم واحد،
+وملخص الإحصائيات.
+
+كل استجابة تحمل ETag و Last-Modified مشتقين من رقم إصدار البيانات في
+قاعدة البيانات (movies.cache.get_dataset_state) الذي يُرفع مع كل استيراد أو
+تعديل، فيتفق عليه كل الخوادم؛ فإذا أرسل العميل If-None-Match أو
+If-Modified-Since لبيانات لم تتغير عادت 304 باستعلام واحد بالمفتاح الأساسي.
+"""
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from .cache import get_dataset_state, get_or_set as cache_get_or_set
+from .exports import EXPORT_FIELDS
+from .filters import MovieFilterForm, filter_movies
+from .models import Movie
+from .pagination import RESULTS_PER_PAGE, KeysetPaginator
+from .stats import get_movie_stats
+
+# حقول الفيلم في الاستجابات
+API_FIELDS = ('id',) + EXPORT_FIELDS + ('updated_at',)
+
+# أقصى عدد أفلام في الصفحة (معامل limit)
+MAX_PAGE_SIZE = 100
+
+
+def dataset_state(request):
+    """(رقم الإصدار، وقت آخر تغيير) مقروءاً مرة واحدة لكل طلب"""
+    if not hasattr(request, '_movies_dataset_state'):
+        request._movies_dataset_state = get_dataset_state()
+    return request._movies_dataset_state
+
+
+def dataset_etag(request, *args, **kwargs):
+    """ETag للإصدار الحالي من البيانات"""
+    version, modified = dataset_state(request)
+    stamp = int(modified.timestamp() * 1000) if modified else 0
+    return f'movies-v{version}-{stamp}'
+
+
+def dataset_last_modified(request, *args, **kwargs):
+    return dataset_state(request)[1]
+
+
+# 304 عند تطابق ETag أو Last-Modified قبل تنفيذ العرض
+conditional = condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified)
+
+
+def serialize_movie(movie):
+    return {field: getattr(movie, 'pk' if field == 'id' else field) for field in API_FIELDS}
+
+
+def page_size(value):
+    """حجم الصفحة من معامل limit ضمن [1, MAX_PAGE_SIZE]"""
+    try:
+        return min(max(int(value), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return RESULTS_PER_PAGE
+
+
+@require_safe
+@conditional
+def movie_list(request):
+    """صفحة من الأفلام بشروط صفحة النتائج نفسها؛ cursor من next_cursor أو previous_cursor"""
+    filter_form = MovieFilterForm(request.GET)
+    if not filter_form.is_valid():
+        return JsonResponse({'errors': filter_form.errors}, status=400)
+
+    movies = filter_movies(Movie.objects.only(*API_FIELDS), filter_form.active_filters())
+    paginator = KeysetPaginator(movies, request.GET.get('sort'), per_page=page_size(request.GET.get('limit')))
+    page = paginator.page(request.GET.get('cursor'))
+    return JsonResponse({
+        'sort': paginator.sort,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+        'results': [serialize_movie(movie) for movie in page.object_list],
+    })
+
+
+@require_safe
+@conditional
+def movie_detail(request, movie_id):
+    """فيلم واحد بالمعرف"""
+    movie = Movie.objects.only(*API_FIELDS).filter(pk=movie_id).first()
+    if movie is None:
+        raise Http404('الفيلم غير موجود')
+    return JsonResponse(serialize_movie(movie))
+
+
+@require_safe
+@conditional
+def stats(request):
+    """الملخص نفسه الذي تعرضه صفحة النتائج مع معرفات أفلام أعلى القيم"""
+    movie_stats = get_movie_stats()
+    summary = cache_get_or_set('stats', movie_stats.as_stats, version=dataset_state(request)[0])
+    highest = {
+        key: serialize_movie(movie) if movie else None
+        for key, movie in movie_stats.highest_values().items()
+    }
+    return JsonResponse({**summary, 'highest_values': highest})
+
@@ -1,5 +1,43 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate
+
+
+def create_movie_indexes(sender, using='default', **kwargs):
+    """
+    التطبيق بلا ملفات ترحيل: migrate ينشئ الجداول مرة واحدة فقط، فتُضاف هنا
+    فهارس Movie.Meta الجديدة على قواعد البيانات الموجودة، ثم فهرس النص الكامل.
+    """
+    from .models import Movie
+    from .search import ensure_search_index
+
+    connection = connections[using]
+    table = Movie._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return
+        existing = connection.introspection.get_constraints(cursor, table)
+    missing = [index for index in Movie._meta.indexes if index.name not in existing]
+    if missing:
+        with connection.schema_editor() as editor:
+            for index in missing:
+                editor.add_index(Movie, index)
+
+    ensure_search_index(using)
+
 
 class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'movies'  # هذا هو الاسم المهم
\ No newline at end of file
+    name = 'movies'  # هذا هو الاسم المهم
+
+    def ready(self):
+        from .error_reports import check_error_report_dir
+        from .models import Movie
+        from .stats import movie_deleted
+
+        checks.register(check_error_report_dir)
+
+        post_migrate.connect(create_movie_indexes, sender=self)
+        # الحذف (منفرداً أو بالجملة) يحدّث ملخص الإحصائيات ويرفع إصدار البيانات
+        post_delete.connect(movie_deleted, sender=Movie)
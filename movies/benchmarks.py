@@ -0,0 +1,443 @@
+"""
+أدوات قياس أداء مسار الاستيراد: توليد بيانات اصطناعية وقياس الزمن.
+
+run_benchmark_suite() تقيس المسارات الساخنة (القراءة، التحويل، الحفظ، الرفع
+الكامل، عرض صفحة النتائج) على كتالوج اصطناعي ثابت البذرة بصيغتي CSV و XLSX،
+وتنتج قاموساً يُحفظ كخط أساس JSON وتُقارن به التشغيلات اللاحقة (الأمر
+benchmark_suite).
+"""
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+
+from .importer import (
+    CSV_ENGINE_C, CSV_ENGINE_PYARROW, convert_dataframe, get_max_upload_size, import_chunks, read_csv_chunks,
+    read_file_chunks, resolve_batch_size
+)
+from .models import Movie
+from .stats import rebuild_movie_stats
+
+# بادئة عناوين الأفلام التي ينشئها قياس الحفظ ثم يحذفها
+BENCHMARK_TITLE_PREFIX = 'Benchmark Movie'
+
+GENRES = ['Action', 'Adventure', 'Comedy', 'Drama', 'Horror', 'Sci-Fi', 'Thriller', 'Romance', 'Animation']
+DIRECTORS = ['Christopher Nolan', 'Ridley Scott', 'يوسف شاهين', 'Denis Villeneuve', 'محمد خان', 'Greta Gerwig']
+
+# كلمات العناوين العربية في الكتالوج الاصطناعي
+ARABIC_TITLE_WORDS = ['الطريق', 'الليل', 'الصحراء', 'البحر', 'المدينة', 'الحلم', 'العودة', 'الغريب', 'النهر', 'الأخير']
+
+
+def make_movie_frame(rows, error_ratio=0.02, seed=42, title_prefix='Movie'):
+    """
+    توليد DataFrame اصطناعي بأعمدة ملف الرفع، مع نسبة من الصفوف غير الصالحة.
+    """
+    rng = np.random.default_rng(seed)
+    randomizer = random.Random(seed)
+
+    df = pd.DataFrame({
+        'title': [f'{title_prefix} {i}' for i in range(rows)],
+        'genre': [','.join(randomizer.sample(GENRES, 2)) for _ in range(rows)],
+        'director': [randomizer.choice(DIRECTORS) for _ in range(rows)],
+        'year': rng.integers(1920, 2024, rows).astype(object),
+        'runtime': rng.integers(70, 200, rows),
+        'rating': rng.uniform(1, 10, rows).round(1),
+        'votes': rng.integers(0, 2_000_000, rows),
+        'revenue': np.where(rng.random(rows) < 0.1, np.nan, rng.uniform(0, 900, rows).round(2)),
+        'metascore': np.where(rng.random(rows) < 0.1, np.nan, rng.integers(0, 100, rows)),
+    })
+
+    bad = rng.random(rows) < error_ratio
+    kinds = rng.integers(0, 4, rows)
+    df.loc[bad & (kinds == 0), 'title'] = None
+    df.loc[bad & (kinds == 1), 'year'] = 1500
+    df.loc[bad & (kinds == 2), 'rating'] = 11.5
+    df.loc[bad & (kinds == 3), 'year'] = 'unknown'
+    return df
+
+
+def legacy_iterrows_conversion(df):
+    """
+    نسخة من حلقة iterrows القديمة في upload_file، للمقارنة فقط.
+    """
+    movies_to_create = []
+    error_rows = []
+
+    for idx, row in df.iterrows():
+        try:
+            movie_data = {
+                'title': str(row['title']).strip()[:255] if pd.notna(row.get('title')) else None,
+                'year': int(row['year']) if pd.notna(row.get('year')) else None,
+                'rating': float(row['rating']) if pd.notna(row.get('rating')) else 0.0,
+                'genre': str(row.get('genre', '')).strip()[:255] if pd.notna(row.get('genre')) else '',
+                'director': str(row.get('director', '')).strip()[:255] if pd.notna(row.get('director')) else '',
+                'runtime': int(row.get('runtime', 0)) if pd.notna(row.get('runtime')) else 0,
+                'votes': int(row.get('votes', 0)) if pd.notna(row.get('votes')) else 0,
+                'revenue': float(row.get('revenue', 0.0)) if pd.notna(row.get('revenue')) else 0.0,
+                'metascore': int(row.get('metascore', 0)) if pd.notna(row.get('metascore')) else 0,
+            }
+
+            if not movie_data['title']:
+                raise ValidationError('عنوان الفيلم مطلوب')
+            if movie_data['year'] is None:
+                raise ValidationError('سنة الإنتاج مطلوبة')
+            if not (1888 <= movie_data['year'] <= 2100):
+                raise ValidationError('سنة الإنتاج يجب أن تكون بين 1888 و 2100')
+            if not (0 <= movie_data['rating'] <= 10):
+                raise ValidationError('التقييم يجب أن يكون بين 0 و 10')
+
+            movies_to_create.append(Movie(**movie_data))
+
+        except Exception as e:
+            error_rows.append((idx + 2, str(e)))
+            continue
+
+    return movies_to_create, error_rows
+
+
+MOVIE_FIELDS = ('title', 'year', 'rating', 'genre', 'director', 'runtime', 'votes', 'revenue', 'metascore')
+
+
+def movie_signature(movie):
+    """تمثيل قابل للمقارنة لقيم الفيلم"""
+    return tuple(getattr(movie, field) for field in MOVIE_FIELDS)
+
+
+def compare_conversions(df):
+    """
+    التأكد من أن التحويل العمودي ينتج نفس الأفلام ونفس أرقام صفوف الأخطاء.
+    """
+    legacy_movies, legacy_errors = legacy_iterrows_conversion(df)
+    movies, errors = convert_dataframe(df)
+    return (
+        [movie_signature(m) for m in legacy_movies] == [movie_signature(m) for m in movies]
+        and [row for row, _ in legacy_errors] == [row for row, _ in errors]
+    )
+
+
+def time_call(func, *args, repeat=3, **kwargs):
+    """تشغيل الدالة عدة مرات وإرجاع أفضل زمن بالثواني"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_batch_sizes(rows, batch_sizes, commit_every_values=(None,), chunk_size=5000):
+    """
+    قياس سرعة حفظ rows صفاً في قاعدة البيانات الحالية لكل تركيبة من حجم الدفعة
+    و commit_every. الأفلام المنشأة تُحذف بعد كل قياس ويُعاد بناء ملخص الإحصائيات.
+    يعيد قائمة قواميس: batch_size (المطلوب والفعلي)، commit_every، seconds، rows_per_second.
+    """
+    df = make_movie_frame(rows, error_ratio=0, title_prefix=BENCHMARK_TITLE_PREFIX)
+    chunks = [df.iloc[start:start + chunk_size] for start in range(0, rows, chunk_size)]
+    sample, _ = convert_dataframe(chunks[0])
+
+    results = []
+    try:
+        for batch_size in batch_sizes:
+            for commit_every in commit_every_values:
+                start = time.perf_counter()
+                result = import_chunks(chunks, batch_size=batch_size, commit_every=commit_every or 0)
+                elapsed = time.perf_counter() - start
+                Movie.objects.filter(title__startswith=BENCHMARK_TITLE_PREFIX).delete()
+                results.append({
+                    'batch_size': batch_size,
+                    'effective_batch_size': resolve_batch_size(sample, batch_size),
+                    'commit_every': commit_every,
+                    'created': result['created'],
+                    'seconds': elapsed,
+                    'rows_per_second': rows / elapsed,
+                })
+    finally:
+        Movie.objects.filter(title__startswith=BENCHMARK_TITLE_PREFIX).delete()
+        rebuild_movie_stats()
+    return results
+
+
+def _consume(chunks):
+    return sum(len(chunk) for chunk in chunks)
+
+
+def _legacy_csv_chunks(path, chunk_size):
+    """القراءة السابقة: كل الأعمدة مع استنتاج الأنواع لكل عمود"""
+    with pd.read_csv(path, encoding='utf-8-sig', chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def csv_engines():
+    """محركات القراءة المتاحة للقياس (pyarrow فقط إذا كانت مثبتة)"""
+    engines = {
+        'legacy': lambda path, chunk_size: _legacy_csv_chunks(path, chunk_size),
+        CSV_ENGINE_C: lambda path, chunk_size: read_csv_chunks(path, chunk_size, engine=CSV_ENGINE_C),
+    }
+    try:
+        import pyarrow.csv  # noqa: F401
+        engines[CSV_ENGINE_PYARROW] = lambda path, chunk_size: read_csv_chunks(
+            path, chunk_size, engine=CSV_ENGINE_PYARROW
+        )
+    except ImportError:
+        pass
+    return engines
+
+
+def benchmark_csv_engines(rows, chunk_size=5000, repeat=3):
+    """
+    قياس سرعة قراءة ملف CSV اصطناعي (مع أعمدة نصية حرة لا يستخدمها Movie)
+    بكل محرك متاح. يعيد قائمة قواميس: engine، seconds، mb_per_second، rows.
+    """
+    df = make_movie_frame(rows)
+    df['description'] = 'وصف طويل للفيلم ' * 10
+    df['actors'] = 'Actor One, Actor Two, ممثل ثالث'
+
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    try:
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+        megabytes = os.path.getsize(path) / (1024 * 1024)
+        results = []
+        for name, reader in csv_engines().items():
+            seconds = time_call(lambda: _consume(reader(path, chunk_size)), repeat=repeat)
+            results.append({
+                'engine': name,
+                'rows': rows,
+                'megabytes': megabytes,
+                'seconds': seconds,
+                'mb_per_second': megabytes / seconds,
+            })
+        return results
+    finally:
+        os.remove(path)
+
+
+def make_catalog_frame(rows, error_ratio=0.02, duplicate_ratio=0.05, arabic_ratio=0.3, seed=42):
+    """
+    كتالوج اصطناعي أقرب للملفات الحقيقية من make_movie_frame: عناوين عربية
+    وإنجليزية، من نوع إلى ثلاثة أنواع لكل فيلم، صفوف غير صالحة، وصفوف مكررة
+    (نفس العنوان والسنة) موزعة عشوائياً. عدد الصفوف الكلي rows.
+    """
+    duplicates = int(rows * duplicate_ratio)
+    df = make_movie_frame(rows - duplicates, error_ratio=error_ratio, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    randomizer = random.Random(seed + 1)
+
+    arabic = rng.random(len(df)) < arabic_ratio
+    df.loc[arabic & df['title'].notna(), 'title'] = [
+        f'{randomizer.choice(ARABIC_TITLE_WORDS)} {randomizer.choice(ARABIC_TITLE_WORDS)} {i}'
+        for i in df.index[arabic & df['title'].notna()]
+    ]
+    df['genre'] = [','.join(randomizer.sample(GENRES, randomizer.randint(1, 3))) for _ in range(len(df))]
+
+    if duplicates and len(df):
+        df = pd.concat([df, df.iloc[rng.integers(0, len(df), duplicates)]], ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    return df
+
+
+def write_catalog(df, path):
+    """
+    كتابة الكتالوج إلى CSV أو XLSX حسب امتداد path. ملفات XLSX تُكتب بمصنف
+    write-only صفاً بصف فلا يُبنى المصنف كاملاً في الذاكرة حتى مليون صف.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+        return path
+    if ext != '.xlsx':
+        raise ValueError(f'صيغة الكتالوج يجب أن تكون .csv أو .xlsx: {path}')
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Movies')
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if isinstance(value, float) and np.isnan(value) else value for value in row])
+    workbook.save(path)
+    return path
+
+
+# الحالات التي تقيسها run_benchmark_suite
+BENCHMARK_CASES = ('parse', 'convert', 'bulk_create', 'upload', 'results_page')
+
+BENCHMARK_FORMATS = ('csv', 'xlsx')
+
+
+def benchmark_environment():
+    """وصف بيئة القياس (يُحفظ مع خط الأساس لأن النتائج لا تُقارن إلا في البيئة نفسها)"""
+    import django
+    from django.db import connection
+
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'pandas': pd.__version__,
+        'database': connection.vendor,
+        'sqlite': sqlite3.sqlite_version if connection.vendor == 'sqlite' else None,
+        'machine': platform.machine(),
+    }
+
+
+def _time_writes(func, repeat):
+    """
+    أفضل زمن لـ func() التي تكتب أفلاماً، مع حذف ما أضافته بعد كل تكرار
+    (المعرفات بعد أكبر معرف قبل القياس).
+    """
+    from django.db.models import Max
+
+    last_pk = Movie.objects.aggregate(last=Max('pk'))['last'] or 0
+    best = None
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            Movie.objects.filter(pk__gt=last_pk).delete()
+    finally:
+        Movie.objects.filter(pk__gt=last_pk).delete()
+    return best
+
+
+def _upload(client, path):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.urls import reverse
+
+    with open(path, 'rb') as handle:
+        upload = SimpleUploadedFile(os.path.basename(path), handle.read())
+    response = client.post(reverse('upload'), {'file': upload, 'mode': 'insert'})
+    if response.status_code != 302:
+        raise RuntimeError(f'فشل رفع {path}: {response.status_code}')
+
+
+def _results_page(client, path, repeat):
+    """زمن عرض صفحة النتائج (دون تخزين مؤقت) بعد استيراد الملف"""
+    from django.core.cache import cache
+    from django.db.models import Max
+    from django.urls import reverse
+
+    last_pk = Movie.objects.aggregate(last=Max('pk'))['last'] or 0
+    try:
+        import_chunks(read_file_chunks(path, os.path.splitext(path)[1]))
+        rebuild_movie_stats()
+
+        def render():
+            cache.clear()
+            response = client.get(reverse('results'), {'sort': '-rating'})
+            if response.status_code != 200:
+                raise RuntimeError(f'فشل عرض صفحة النتائج: {response.status_code}')
+
+        return time_call(render, repeat=repeat)
+    finally:
+        Movie.objects.filter(pk__gt=last_pk).delete()
+
+
+def benchmark_file(path, rows, repeat=3, cases=BENCHMARK_CASES):
+    """قياس كل حالة على ملف واحد؛ يعيد قائمة نتائج (case, format, rows, seconds, rows_per_second)"""
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.conf import settings
+
+    from .file_processor import FileProcessor
+
+    ext = os.path.splitext(path)[1].lower()
+    frame = FileProcessor.process_file(path)
+    client = Client()
+
+    def parse():
+        _consume(read_file_chunks(path, ext))
+
+    def convert():
+        FileProcessor.create_movie_objects(FileProcessor.convert_to_movies_data(frame.copy()))
+
+    def bulk_create():
+        import_chunks([frame])
+
+    measures = {
+        'parse': lambda: time_call(parse, repeat=repeat),
+        'convert': lambda: time_call(convert, repeat=repeat),
+        'bulk_create': lambda: _time_writes(bulk_create, repeat),
+        'upload': lambda: _time_writes(lambda: _upload(client, path), repeat),
+        'results_page': lambda: _results_page(client, path, repeat),
+    }
+
+    max_size = get_max_upload_size(ext)
+    results = []
+    # عميل الاختبار يرسل الطلبات باسم المضيف testserver
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for case in cases:
+            if case == 'upload' and max_size and os.path.getsize(path) > max_size:
+                results.append({'case': case, 'format': ext.lstrip('.'), 'rows': rows, 'skipped': 'الملف أكبر من حد الرفع'})
+                continue
+            seconds = measures[case]()
+            results.append({
+                'case': case,
+                'format': ext.lstrip('.'),
+                'rows': rows,
+                'seconds': round(seconds, 6),
+                'rows_per_second': round(rows / seconds, 1),
+            })
+    return results
+
+
+def run_benchmark_suite(sizes=(1000, 10000), formats=BENCHMARK_FORMATS, repeat=3, cases=BENCHMARK_CASES,
+                        seed=42, on_result=None):
+    """
+    تشغيل مجموعة القياس: لكل حجم وصيغة يُولَّد ملف كتالوج (بالبذرة نفسها دائماً)
+    ثم تُقاس الحالات. يكتب في قاعدة البيانات الحالية ويحذف ما أضافه بعد كل قياس.
+    يعيد {'environment': ..., 'settings': ..., 'results': [...]}.
+    """
+    from django.utils import timezone
+
+    from .analytics import refresh_rollups
+    from .models import ImportRun
+
+    started_at = timezone.now()
+    results = []
+    with tempfile.TemporaryDirectory(prefix='movies_benchmark_') as directory:
+        for rows in sizes:
+            df = make_catalog_frame(rows, seed=seed)
+            for fmt in formats:
+                path = write_catalog(df, os.path.join(directory, f'catalog_{rows}.{fmt}'))
+                for result in benchmark_file(path, rows, repeat, cases):
+                    results.append(result)
+                    if on_result:
+                        on_result(result)
+    # إزالة آثار القياس: ملخص الإحصائيات والتجميعات وقياسات رفع ملفات القياس
+    rebuild_movie_stats()
+    refresh_rollups()
+    ImportRun.objects.filter(started_at__gte=started_at).delete()
+    return {
+        'environment': benchmark_environment(),
+        'settings': {'sizes': list(sizes), 'formats': list(formats), 'repeat': repeat, 'seed': seed},
+        'results': results,
+    }
+
+
+def compare_to_baseline(current, baseline, tolerance=0.2):
+    """
+    الحالات الأبطأ من خط الأساس بأكثر من tolerance (نسبة). يعيد قائمة
+    (case, format, rows, baseline_seconds, seconds, ratio) مرتبة بالأسوأ.
+    """
+    previous = {
+        (row['case'], row['format'], row['rows']): row['seconds']
+        for row in baseline['results'] if 'seconds' in row
+    }
+    regressions = []
+    for row in current['results']:
+        key = (row['case'], row['format'], row['rows'])
+        if 'seconds' not in row or key not in previous:
+            continue
+        ratio = row['seconds'] / previous[key]
+        if ratio > 1 + tolerance:
+            regressions.append((*key, previous[key], row['seconds'], ratio))
+    return sorted(regressions, key=lambda regression: regression[-1], reverse=True)
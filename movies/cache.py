@@ -0,0 +1,138 @@
+"""
+طبقة تخزين مؤقت مرتبطة برقم إصدار البيانات.
+
+كل مفتاح يتضمن رقم إصدار بيانات الأفلام المحفوظ في قاعدة البيانات (صف
+MovieStats)؛ كل كتابة (استيراد، حفظ، حذف) ترفع الرقم داخل معاملتها، فيراه
+كل خادم وعامل بعد التثبيت وتصبح مفاتيحه القديمة غير مستخدمة وتنتهي بمدة
+صلاحيتها (أو تُزال بسياسة الإزالة في الخلفية MAX_ENTRIES/CULL_FREQUENCY).
+لذلك تعمل مع خلفيات Django المحلية لكل عملية (locmem) والمشتركة معاً.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MovieStats
+
+logger = logging.getLogger(__name__)
+
+COUNTER_KEY = 'movies:cache_counter:{name}:{kind}'
+
+# مدة الصلاحية الافتراضية لكل نوع من المدخلات (بالثواني)
+DEFAULT_TIMEOUTS = {
+    'stats': 300,
+    'highest_values': 300,
+    'table_page': 120,
+}
+
+
+def get_cache():
+    return caches[getattr(settings, 'MOVIES_CACHE_ALIAS', 'default')]
+
+
+def get_timeout(name):
+    """مدة صلاحية نوع المدخل من MOVIES_CACHE_TIMEOUTS أو القيمة الافتراضية"""
+    timeouts = {**DEFAULT_TIMEOUTS, **getattr(settings, 'MOVIES_CACHE_TIMEOUTS', {})}
+    return timeouts.get(name, 300)
+
+
+def get_dataset_state():
+    """
+    (رقم الإصدار، وقت آخر تغيير) من صف الملخص باستعلام واحد بالمفتاح الأساسي،
+    أو (0, None) قبل إنشاء الصف.
+    """
+    state = MovieStats.objects.filter(pk=MovieStats.SINGLETON_PK).values_list(
+        'data_version', 'data_modified'
+    ).first()
+    return state or (0, None)
+
+
+def get_dataset_version():
+    """رقم إصدار البيانات الحالي"""
+    return get_dataset_state()[0]
+
+
+def get_dataset_modified():
+    """وقت آخر رفع لرقم الإصدار (datetime)، أو None قبل إنشاء الملخص"""
+    return get_dataset_state()[1]
+
+
+def bump_dataset_version():
+    """
+    رفع رقم إصدار البيانات لإبطال كل المدخلات المخزنة. يُنفَّذ داخل معاملة
+    الكتابة فيظهر لكل العمليات مع تثبيتها، ولا شيء إذا تم التراجع عنها.
+    """
+    bumped = MovieStats.objects.filter(pk=MovieStats.SINGLETON_PK).update(
+        data_version=F('data_version') + 1, data_modified=timezone.now()
+    )
+    if not bumped:
+        # لا ملخص بعد: بناؤه ينشئ رقم الإصدار
+        from .stats import rebuild_movie_stats
+        rebuild_movie_stats()
+    logger.debug("Movies dataset version bumped")
+
+
+def make_key(name, *parts, version=None):
+    """مفتاح مرتبط بإصدار البيانات (الحالي، أو version إذا قُرئ مسبقاً في الطلب)"""
+    suffix = ':'.join(str(part) for part in parts)
+    if version is None:
+        version = get_dataset_version()
+    return f'movies:v{version}:{name}:{suffix}'
+
+
+def _count(name, kind):
+    cache = get_cache()
+    key = COUNTER_KEY.format(name=name, kind=kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_or_set(name, builder, *parts, version=None):
+    """
+    إرجاع القيمة المخزنة أو بناؤها بـ builder() وتخزينها بمدة صلاحية نوعها،
+    مع تحديث عدادات الإصابة/الإخفاق. version: رقم الإصدار إذا قرأه الطلب
+    مسبقاً (لتفادي استعلام لكل مفتاح).
+    """
+    cache = get_cache()
+    key = make_key(name, *parts, version=version)
+    value = cache.get(key)
+    if value is not None:
+        _count(name, 'hits')
+        return value
+
+    _count(name, 'misses')
+    value = builder()
+    cache.set(key, value, timeout=get_timeout(name))
+    return value
+
+
+def get_counters():
+    """عدادات الإصابة والإخفاق لكل نوع من المدخلات"""
+    cache = get_cache()
+    counters = {}
+    for name in DEFAULT_TIMEOUTS.keys() | getattr(settings, 'MOVIES_CACHE_TIMEOUTS', {}).keys():
+        hits = cache.get(COUNTER_KEY.format(name=name, kind='hits'), 0)
+        misses = cache.get(COUNTER_KEY.format(name=name, kind='misses'), 0)
+        total = hits + misses
+        counters[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0,
+            'timeout': get_timeout(name),
+        }
+    return counters
+
+
+def reset_counters():
+    """تصفير عدادات الإصابة والإخفاق"""
+    cache = get_cache()
+    cache.delete_many([
+        COUNTER_KEY.format(name=name, kind=kind)
+        for name in DEFAULT_TIMEOUTS.keys() | getattr(settings, 'MOVIES_CACHE_TIMEOUTS', {}).keys()
+        for kind in ('hits', 'misses')
+    ])
@@ -0,0 +1,154 @@
+"""
+جداول الأبعاد: تقسيم قيم genre و director المتعددة (مثل "Action,Adventure,Sci-Fi")
+إلى جداول Genre و Person مع جداول ربط (MovieGenre و MovieDirector).
+
+الاستيراد يربط كل دفعة بالجملة: الأسماء تُحوَّل إلى معرفات عبر ذاكرة مؤقتة
+(قاموس) طوال عملية الاستيراد، فلا يُستعلم عن الاسم نفسه أو يُنشأ إلا مرة واحدة،
+ثم تُدرج الروابط بـ bulk_create. بذلك يصبح تجميع الأفلام وتصفيتها حسب النوع أو
+المخرج ربطاً (JOIN) مفهرساً بدلاً من LIKE '%...%'.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Avg, Count
+
+from .models import Genre, Movie, MovieDirector, MovieGenre, Person
+
+# الفواصل بين القيم المتعددة (الفاصلة اللاتينية والعربية)
+NAME_SEPARATORS = re.compile(r'[,،]')
+
+# عدد الأسماء أو المعرفات في كل استعلام IN
+LOOKUP_BATCH = 500
+
+
+def name_key(name):
+    """
+    مفتاح مطابقة الاسم كما تقارنه قاعدة البيانات: ترتيب MySQL الافتراضي لا يميز
+    حالة الأحرف ولا التشكيل، بينما SQLite يطابق حرفياً.
+    """
+    if connection.vendor == 'mysql':
+        name = unicodedata.normalize('NFKD', name).casefold()
+        name = ''.join(char for char in name if not unicodedata.combining(char))
+    return name
+
+
+def split_names(value):
+    """قائمة الأسماء غير المكررة في قيمة متعددة، بترتيب ظهورها"""
+    names = {}
+    for name in NAME_SEPARATORS.split(value or ''):
+        name = name.strip()[:255]
+        if name:
+            names.setdefault(name_key(name), name)
+    return list(names.values())
+
+
+class NameCache:
+    """قاموس الاسم → المعرف لجدول أبعاد (Genre أو Person) طوال عملية استيراد واحدة"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def _load(self, names):
+        for start in range(0, len(names), LOOKUP_BATCH):
+            rows = self.model.objects.filter(name__in=names[start:start + LOOKUP_BATCH]).values_list('pk', 'name')
+            for pk, name in rows:
+                self.ids[name_key(name)] = pk
+
+    def resolve(self, names):
+        """
+        معرفات الأسماء (بمفتاح name_key): الأسماء غير المعروفة تُجلب باستعلام
+        واحد لكل دفعة، وما لا يوجد منها يُنشأ بـ bulk_create (مع تجاهل التعارض
+        إذا أنشأه استيراد متزامن) ثم تُجلب معرفاته.
+        """
+        missing = {}
+        for name in names:
+            key = name_key(name)
+            if key not in self.ids:
+                missing.setdefault(key, name)
+        if missing:
+            self._load(list(missing.values()))
+            new_names = [name for key, name in missing.items() if key not in self.ids]
+            if new_names:
+                self.model.objects.bulk_create(
+                    [self.model(name=name) for name in new_names], ignore_conflicts=True
+                )
+                self._load(new_names)
+        return self.ids
+
+
+class DimensionLinker:
+    """ربط الأفلام بأنواعها ومخرجيها بالجملة، مع ذاكرة أسماء مشتركة بين الدفعات"""
+
+    def __init__(self):
+        self.genres = NameCache(Genre)
+        self.people = NameCache(Person)
+
+    def _link(self, through, field, cache, values):
+        names = {movie_id: split_names(value) for movie_id, value in values}
+        ids = cache.resolve([name for movie_names in names.values() for name in movie_names])
+        through.objects.bulk_create(
+            [
+                through(movie_id=movie_id, **{f'{field}_id': ids[name_key(name)]})
+                for movie_id, movie_names in names.items()
+                for name in movie_names
+            ],
+            ignore_conflicts=True,
+        )
+
+    def link(self, rows, replace=()):
+        """
+        ربط rows: قائمة (movie_id, genre, director). الأفلام في replace تُحذف
+        روابطها السابقة أولاً (عند تعديل قيمها)؛ الروابط الموجودة تُتجاهل.
+        """
+        rows = list(rows)
+        replace = list(replace)
+        for start in range(0, len(replace), LOOKUP_BATCH):
+            movie_ids = replace[start:start + LOOKUP_BATCH]
+            MovieGenre.objects.filter(movie_id__in=movie_ids).delete()
+            MovieDirector.objects.filter(movie_id__in=movie_ids).delete()
+        if not rows:
+            return
+        self._link(MovieGenre, 'genre', self.genres, [(movie_id, genre) for movie_id, genre, _ in rows])
+        self._link(MovieDirector, 'person', self.people, [(movie_id, director) for movie_id, _, director in rows])
+
+
+def rebuild_dimensions(batch_size=2000):
+    """
+    إعادة بناء كل روابط الأنواع والمخرجين من حقلي genre و director (للبيانات
+    المستوردة قبل إضافة الجداول). يعيد عدد الأفلام المعالجة.
+    """
+    linker = DimensionLinker()
+    MovieGenre.objects.all().delete()
+    MovieDirector.objects.all().delete()
+    rows = Movie.objects.order_by('pk').values_list('pk', 'genre', 'director').iterator(chunk_size=batch_size)
+    batch = []
+    processed = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            linker.link(batch)
+            processed += len(batch)
+            batch = []
+    linker.link(batch)
+    return processed + len(batch)
+
+
+def _breakdown(model, link_name):
+    movie_path = f'{link_name}__movie'
+    return model.objects.annotate(
+        movie_count=Count(link_name),
+        avg_rating=Avg(f'{movie_path}__rating'),
+        avg_revenue=Avg(f'{movie_path}__revenue'),
+    ).filter(movie_count__gt=0).order_by('-movie_count', 'name')
+
+
+def genre_breakdown():
+    """عدد الأفلام ومتوسط التقييم والإيرادات لكل نوع (تجميع عبر جدول الربط)"""
+    return _breakdown(Genre, 'movie_links')
+
+
+def director_breakdown():
+    """عدد الأفلام ومتوسط التقييم والإيرادات لكل مخرج"""
+    return _breakdown(Person, 'movie_links')
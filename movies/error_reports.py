@@ -0,0 +1,158 @@
+"""
+تقرير الصفوف المرفوضة في الاستيراد: ملف CSV على القرص يُكتب جزءاً بجزء أثناء
+الاستيراد، بصف لكل خطأ (المصدر، رقم الصف، العمود، رمز الخطأ، الرسالة).
+
+نتيجة الاستيراد لا تحتفظ في الذاكرة إلا بأول MOVIES_IMPORT_ERROR_ROWS_IN_MEMORY
+صفاً مرفوضاً، بينما يحوي التقرير كل الصفوف مهما كثرت، ويُرسل للمستخدم من رابط
+تنزيل في نتيجة الرفع. التقارير تُحفظ خارج MEDIA_ROOT في MOVIES_ERROR_REPORT_DIR
+وتُحذف بعد MOVIES_ERROR_REPORT_MAX_AGE ثانية. المجلد يكتبه عامل الاستيراد ويقرؤه
+خادم الويب، فيجب أن يكون على تخزين مشترك بينهما لا في المجلد المؤقت لكل مضيف
+(فحص النظام movies.E001/W001).
+"""
+import csv
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.checks import Error, Warning
+from django.core.exceptions import ImproperlyConfigured
+
+from .importer import ERROR_DETAILS
+
+logger = logging.getLogger(__name__)
+
+ERROR_REPORT_FIELDS = ('source', 'row', 'column', 'code', 'message')
+
+# رمز الأخطاء التي لا تطابق رسائل التحقق المعروفة
+ERROR_INVALID = 'invalid'
+
+# عمر التقرير قبل حذفه (أسبوع)
+DEFAULT_ERROR_REPORT_MAX_AGE = 7 * 24 * 3600
+
+_REPORT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def get_error_report_dir():
+    directory = getattr(settings, 'MOVIES_ERROR_REPORT_DIR', None)
+    if not directory:
+        raise ImproperlyConfigured('MOVIES_ERROR_REPORT_DIR غير مضبوط')
+    return str(directory)
+
+
+def check_error_report_dir(app_configs=None, **kwargs):
+    """فحص النظام: مجلد التقارير مضبوط، وليس داخل المجلد المؤقت الخاص بكل مضيف"""
+    directory = getattr(settings, 'MOVIES_ERROR_REPORT_DIR', None)
+    if not directory:
+        return [Error(
+            'MOVIES_ERROR_REPORT_DIR غير مضبوط',
+            hint='اضبطه على مجلد في تخزين مشترك بين خوادم الويب وعمال الاستيراد',
+            id='movies.E001',
+        )]
+    temp_dir = os.path.realpath(tempfile.gettempdir())
+    if os.path.commonpath([os.path.realpath(directory), temp_dir]) == temp_dir:
+        return [Warning(
+            f'MOVIES_ERROR_REPORT_DIR داخل المجلد المؤقت ({temp_dir})',
+            hint='المجلد المؤقت لا يُشارك بين المضيفات والحاويات (ومع PrivateTmp بين الخدمات)، '
+                 'فقد لا يجد خادم الويب التقارير التي كتبها العامل',
+            id='movies.W001',
+        )]
+    return []
+
+
+def get_error_report_max_age():
+    return getattr(settings, 'MOVIES_ERROR_REPORT_MAX_AGE', DEFAULT_ERROR_REPORT_MAX_AGE)
+
+
+def report_path(report_id):
+    """مسار ملف التقرير، أو None إذا لم يكن المعرف صالحاً"""
+    if not report_id or not _REPORT_ID_RE.match(report_id):
+        return None
+    return os.path.join(get_error_report_dir(), f'{report_id}.csv')
+
+
+def error_details(message, source=''):
+    """
+    (المصدر، العمود، الرمز، الرسالة) لرسالة خطأ. رسائل الاستيراد المتوازي
+    تبدأ باسم الملف أو الورقة ("label: message").
+    """
+    if message not in ERROR_DETAILS:
+        label, separator, text = message.rpartition(': ')
+        if separator and text in ERROR_DETAILS:
+            source, message = label, text
+    code, column = ERROR_DETAILS.get(message, (ERROR_INVALID, ''))
+    return source, column, code, message
+
+
+def prune_error_reports(max_age=None):
+    """حذف التقارير الأقدم من max_age ثانية؛ يعيد عدد الملفات المحذوفة"""
+    max_age = get_error_report_max_age() if max_age is None else max_age
+    directory = get_error_report_dir()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if report_path(entry.name[:-4]) and entry.name.endswith('.csv') and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove import error report {entry.name}: {e}")
+    return removed
+
+
+class ErrorReportWriter:
+    """
+    كاتب تقرير الصفوف المرفوضة لعملية استيراد واحدة. يُمرَّر إلى محرك الاستيراد
+    (error_report=...) فيُكتب كل جزء فور تحويله. الملف لا يُنشأ إلا عند أول خطأ.
+    """
+
+    def __init__(self, source=''):
+        self.source = str(source)
+        self.report_id = uuid.uuid4().hex
+        self.path = report_path(self.report_id)
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        prune_error_reports()
+        # BOM ليفتح Excel النصوص العربية بترميز UTF-8
+        self._file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(ERROR_REPORT_FIELDS)
+
+    def write(self, error_rows):
+        """إضافة صفوف (رقم الصف، الرسالة) إلى التقرير"""
+        if not error_rows:
+            return
+        if self._file is None:
+            self._open()
+        for row_number, message in error_rows:
+            source, column, code, message = error_details(message, self.source)
+            self._writer.writerow((source, row_number, column, code, message))
+        self.count += len(error_rows)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    @property
+    def available(self):
+        """هل يحوي التقرير صفوفاً يمكن تنزيلها؟"""
+        return self.count > 0
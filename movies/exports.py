@@ -0,0 +1,145 @@
+"""
+تصدير نتائج جدول الأفلام (بالترتيب المعروض) إلى CSV أو Excel بذاكرة ثابتة.
+
+الصفوف تُقرأ من قاعدة البيانات على دفعات keyset عند الترتيب بعمود مفهرس: كل
+دفعة استعلام مستقل بشرط على آخر (قيمة الترتيب، المعرف) وحد LIMIT يقرأ نطاقاً من
+الفهرس، فلا يُحمَّل الناتج كاملاً حتى مع مؤشر MySQL الافتراضي الذي يجلب كل صفوف
+الاستعلام إلى العميل. الترتيب بعمود غير مفهرس يُقرأ باستعلام واحد (iterator)،
+لأن كل دفعة keyset عليه تعيد مسح الجدول وفرزه كاملاً. ثم:
+- CSV: كل دفعة تُكتب نصاً وتُرسل فوراً عبر StreamingHttpResponse.
+- XLSX: مصنف write-only يكتب الصفوف إلى ملف مؤقت على القرص بذاكرة ثابتة،
+  ولا يُرسل إلا بعد اكتماله (صيغة xlsx أرشيف zip لا يكتمل إلا بعد آخر صف).
+أسماء الأعمدة هي أسماء حقول Movie فيمكن إعادة استيراد الملف المصدَّر كما هو.
+"""
+import csv
+import io
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Movie
+from .pagination import KEYSET_COLUMNS, rows_after
+
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_XLSX = 'xlsx'
+EXPORT_FORMATS = (EXPORT_FORMAT_CSV, EXPORT_FORMAT_XLSX)
+
+# أعمدة الملف بترتيب أعمدة MovieTable
+EXPORT_FIELDS = ('title', 'genre', 'director', 'year', 'runtime', 'rating', 'votes', 'revenue', 'metascore')
+
+# عدد الصفوف المقروءة من قاعدة البيانات في كل دفعة
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    EXPORT_FORMAT_CSV: 'text/csv; charset=utf-8',
+    EXPORT_FORMAT_XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def get_export_chunk_size():
+    return getattr(settings, 'MOVIES_EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+
+
+def export_ordering(sort):
+    """
+    ترتيب التصدير من معامل sort في صفحة النتائج (مثل -rating) مع المعرف
+    لكسر التعادل، أو الترتيب الافتراضي إذا لم يكن العمود من أعمدة الجدول.
+    """
+    if not sort or sort.lstrip('-') not in EXPORT_FIELDS:
+        sort = Movie._meta.ordering[0]
+    return (sort, '-pk' if sort.startswith('-') else 'pk')
+
+
+def export_rows(queryset, chunk_size=None, sort=None):
+    """
+    صفوف الأفلام كقيم (tuples) بترتيب export_ordering(sort). مع عمود مفهرس
+    (KEYSET_COLUMNS) تُقرأ بدفعات keyset من chunk_size صفاً (استعلام لكل دفعة)
+    دون تخزين الناتج كاملاً، وإلا باستعلام واحد مرتب عبر iterator(chunk_size).
+    """
+    chunk_size = chunk_size or get_export_chunk_size()
+    ordering = export_ordering(sort)
+    field = ordering[0].lstrip('-')
+    ascending = not ordering[0].startswith('-')
+    position = EXPORT_FIELDS.index(field)
+    rows = queryset.order_by(*ordering).values_list(*EXPORT_FIELDS, 'pk')
+
+    if field not in KEYSET_COLUMNS:
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield row[:-1]
+        return
+
+    batch = list(rows[:chunk_size])
+    while batch:
+        for row in batch:
+            yield row[:-1]
+        if len(batch) < chunk_size:
+            return
+        last = batch[-1]
+        batch = list(rows.filter(rows_after(field, last[position], last[-1], ascending))[:chunk_size])
+
+
+def stream_csv(queryset, chunk_size=None, sort=None):
+    """
+    نص CSV على أجزاء: سطر العناوين ثم جزء لكل دفعة من الصفوف.
+    يبدأ بـ BOM ليفتح Excel النصوص العربية بترميز UTF-8.
+    """
+    chunk_size = chunk_size or get_export_chunk_size()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_FIELDS)
+    for number, row in enumerate(export_rows(queryset, chunk_size, sort), start=1):
+        writer.writerow(row)
+        if number % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_xlsx(queryset, destination, chunk_size=None, sort=None):
+    """كتابة الصفوف إلى مصنف write-only (لا يحتفظ بالخلايا في الذاكرة)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Movies')
+    sheet.append(EXPORT_FIELDS)
+    for row in export_rows(queryset, chunk_size, sort):
+        sheet.append(row)
+    workbook.save(destination)
+
+
+def export_filename(fmt):
+    return f'movies-{timezone.localdate():%Y%m%d}.{fmt}'
+
+
+def export_response(queryset, fmt, sort=None):
+    """
+    استجابة تنزيل لنتائج queryset بالترتيب المطلوب: CSV متدفق، و XLSX يُرسل
+    على كتل من ملف مؤقت بعد كتابته كاملاً.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'صيغة تصدير غير مدعومة: {fmt}')
+
+    if fmt == EXPORT_FORMAT_CSV:
+        response = StreamingHttpResponse(stream_csv(queryset, sort=sort), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt)}"'
+        return response
+
+    # الملف المؤقت يُحذف تلقائياً عند إغلاقه بعد إرسال الاستجابة
+    destination = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        write_xlsx(queryset, destination, sort=sort)
+    except Exception:
+        destination.close()
+        raise
+    destination.seek(0)
+    return FileResponse(
+        destination,
+        as_attachment=True,
+        filename=export_filename(fmt),
+        content_type=CONTENT_TYPES[fmt],
+    )
@@ -1,43 +1,47 @@
 import pandas as pd
 import logging
+import os
 from django.utils.translation import gettext_lazy as _
-from django.db import transaction
-from .models import Movie
+from .importer import (
+    IMPORT_FIELDS, REQUIRED_COLUMNS, check_required_columns, convert_dataframe,
+    get_max_upload_size, normalize_columns, read_file_chunks, resolve_column_aliases, supported_extensions
+)
+from .instrumentation import stage, timed_chunks
 
 logger = logging.getLogger(__name__)
 
 class FileProcessor:
-    """فئة لمعالجة ملفات الأفلام وتحويلها إلى بيانات يمكن تخزينها"""
+    """
+    فئة لمعالجة ملفات الأفلام وتحويلها إلى بيانات يمكن تخزينها.
+    واجهة متوافقة مع الاستخدام السابق فوق محرك الاستيراد الموحد (movies.importer):
+    نفس القراء وخريطة الأسماء البديلة وقواعد التحقق.
+    """
 
     @staticmethod
     def validate_file(file):
         """
         التحقق من صحة الملف قبل معالجته
         """
-        if not file.name.endswith(('.csv', '.xls', '.xlsx')):
+        ext = os.path.splitext(file.name)[1].lower()
+        if ext not in supported_extensions():
             raise ValueError(_('نوع الملف غير مدعوم. يرجى استخدام ملف CSV أو Excel'))
         
-        if file.size > 10 * 1024 * 1024:  # 10MB كحد أقصى
-            raise ValueError(_('حجم الملف يتجاوز الحد المسموح (10MB)'))
+        # ملفات CSV تُستورد على أجزاء، لذا حدها قابل للضبط من الإعدادات (أو بدون حد)
+        max_size = get_max_upload_size(ext)
+        if max_size and file.size > max_size:
+            raise ValueError(_('حجم الملف يتجاوز الحد المسموح (%(max_size)sMB)') % {
+                'max_size': round(max_size / (1024 * 1024))
+            })
 
     @staticmethod
     def process_file(file_path):
         """
-        معالجة الملف وتحويله إلى DataFrame
+        معالجة الملف وتحويله إلى DataFrame بأعمدة موحدة
         """
         try:
-            if file_path.endswith('.csv'):
-                df = pd.read_csv(file_path)
-            elif file_path.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(file_path)
-            else:
-                raise ValueError(_('نوع الملف غير مدعوم'))
-            
-            # تنظيف البيانات: إزالة مسافات زائدة من أسماء الأعمدة
-            df.columns = df.columns.str.strip()
-            
-            return df
-            
+            ext = os.path.splitext(str(file_path))[1].lower()
+            return pd.concat(list(timed_chunks('read', read_file_chunks(file_path, ext))), ignore_index=True)
+
         except pd.errors.EmptyDataError:
             raise ValueError(_('الملف فارغ أو لا يحتوي على بيانات'))
         except pd.errors.ParserError:
@@ -49,84 +53,34 @@ class FileProcessor:
     @staticmethod
     def validate_dataframe(df):
         """
-        التحقق من وجود الأعمدة الأساسية في DataFrame
+        التحقق من وجود الأعمدة الأساسية (بأسمائها أو أسمائها البديلة) في DataFrame
+        دون تعديله. يعيد خريطة {الحقل: اسم العمود في DataFrame} للحقول الأساسية.
         """
-        required_columns = {
-            'title': ['title', 'film', 'movie', 'اسم الفيلم'],
-            'year': ['year', 'release_year', 'سنة', 'سنة الإصدار'],
-            'rating': ['rating', 'score', 'تقييم']
-        }
-        
-        column_mapping = {}
-        
-        for field, possible_names in required_columns.items():
-            for name in possible_names:
-                if name in df.columns:
-                    column_mapping[field] = name
-                    break
-            else:
-                raise ValueError(_(f'عمود {field} مفقود في الملف'))
-        
-        return column_mapping
+        names = {str(column).strip().lower(): column for column in df.columns}
+        aliases = resolve_column_aliases(names)
+        columns = {aliases.get(name, name): column for name, column in names.items()}
+        check_required_columns(pd.DataFrame(columns=list(columns)))
+        return {field: columns[field] for field in sorted(REQUIRED_COLUMNS)}
 
     @staticmethod
     def convert_to_movies_data(df, column_mapping=None):
         """
-        تحويل DataFrame إلى قواميس جاهزة لحفظها في قاعدة البيانات
+        تحويل DataFrame إلى قواميس جاهزة لحفظها في قاعدة البيانات (الصفوف غير الصالحة تُتجاهل)
         """
         if column_mapping is None:
             column_mapping = FileProcessor.validate_dataframe(df)
-        
-        movies_data = []
-        
-        for _, row in df.iterrows():
-            try:
-                movie_data = {
-                    'title': str(row[column_mapping['title']]).strip(),
-                    'year': int(row[column_mapping['year']]),
-                    'rating': float(row[column_mapping['rating']]),
-                    # يمكن إضافة المزيد من الحقول هنا حسب الحاجة
-                }
-                
-                # معالجة حقول اختيارية
-                if 'revenue' in df.columns:
-                    movie_data['revenue'] = float(row['revenue']) if pd.notna(row['revenue']) else None
-                
-                if 'runtime' in df.columns:
-                    movie_data['runtime'] = int(row['runtime']) if pd.notna(row['runtime']) else None
-                
-                movies_data.append(movie_data)
-                
-            except (ValueError, TypeError) as e:
-                logger.warning(f"خطأ في تحويل بيانات الفيلم: {str(e)}")
-                continue
-                
-        return movies_data
+        # rename ينشئ نسخة، فلا تتغير أعمدة DataFrame المستدعي عند توحيد الأسماء
+        df = normalize_columns(df.rename(columns={column: field for field, column in column_mapping.items()}))
+
+        with stage('convert', len(df)):
+            movies, error_rows = convert_dataframe(df)
+        for row_number, message in error_rows:
+            logger.warning(f"خطأ في تحويل بيانات الفيلم (الصف {row_number}): {message}")
+        return [{field: getattr(movie, field) for field in IMPORT_FIELDS} for movie in movies]
 
     @staticmethod
     def create_movie_objects(movies_data):
         """
         إنشاء كائنات Movie من البيانات المعالجة
         """
-        movies_to_create = []
-        error_rows = []
-        
-        for idx, data in enumerate(movies_data, start=2):  # الصفوف تبدأ من 2 في Excel
-            try:
-                # التحقق من صحة البيانات قبل الإنشاء
-                if not data['title'] or len(str(data['title']).strip()) == 0:
-                    raise ValueError(_('اسم الفيلم لا يمكن أن يكون فارغًا'))
-                
-                if data['year'] < 1900 or data['year'] > 2100:
-                    raise ValueError(_('سنة الإصدار غير صالحة'))
-                
-                if data['rating'] < 0 or data['rating'] > 10:
-                    raise ValueError(_('التقييم يجب أن يكون بين 0 و 10'))
-                
-                movies_to_create.append(Movie(**data))
-                
-            except Exception as e:
-                error_rows.append((idx, str(e)))
-                continue
-                
-        return movies_to_create, error_rows
\ No newline at end of file
+        return convert_dataframe(pd.DataFrame(list(movies_data)))
@@ -0,0 +1,114 @@
+"""
+تصفية نتائج الأفلام: نطاق السنة، نطاق التقييم، النوع، المخرج، بادئة العنوان،
+والبحث النصي في العنوان.
+
+كل شرط مكتوب بصيغة تستطيع قاعدة البيانات تنفيذها من فهرس (مساواة أو نطاق،
+لا LIKE '%...%'): النوع والمخرج عبر جداول الربط المفهرسة (movies.dimensions)
+فيطابق النوع الواحد الأفلام متعددة الأنواع، ونطاقا السنة والتقييم عبر فهارس
+Movie.Meta.
+"""
+import hashlib
+
+from django import forms
+from django.utils.translation import gettext_lazy as _
+
+from .importer import MAX_YEAR, MIN_YEAR
+from .search import search_titles
+
+# أسماء معاملات الرابط بترتيب ظهورها في مفتاح التخزين المؤقت والروابط
+FILTER_FIELDS = ('year_min', 'year_max', 'rating_min', 'rating_max', 'genre', 'director', 'title', 'q')
+
+
+def prefix_upper_bound(prefix):
+    """أصغر نص أكبر من كل النصوص التي تبدأ بـ prefix (لشرط النطاق title < bound)"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class MovieFilterForm(forms.Form):
+    """نموذج تصفية صفحة النتائج (GET)؛ الحقول الفارغة لا تضيف شروطاً"""
+
+    year_min = forms.IntegerField(
+        label=_('من سنة'), required=False, min_value=MIN_YEAR, max_value=MAX_YEAR,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    year_max = forms.IntegerField(
+        label=_('إلى سنة'), required=False, min_value=MIN_YEAR, max_value=MAX_YEAR,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    rating_min = forms.FloatField(
+        label=_('أقل تقييم'), required=False, min_value=0, max_value=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.1'})
+    )
+    rating_max = forms.FloatField(
+        label=_('أعلى تقييم'), required=False, min_value=0, max_value=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.1'})
+    )
+    genre = forms.CharField(
+        label=_('النوع'), required=False, max_length=255,
+        widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    director = forms.CharField(
+        label=_('المخرج'), required=False, max_length=255,
+        widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    title = forms.CharField(
+        label=_('العنوان يبدأ بـ'), required=False, max_length=255,
+        widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    q = forms.CharField(
+        label=_('بحث في العناوين'), required=False, max_length=255,
+        widget=forms.TextInput(attrs={'class': 'form-control form-control-sm', 'type': 'search'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for low, high in (('year_min', 'year_max'), ('rating_min', 'rating_max')):
+            if cleaned_data.get(low) is not None and cleaned_data.get(high) is not None \
+                    and cleaned_data[low] > cleaned_data[high]:
+                self.add_error(high, _('الحد الأعلى أصغر من الحد الأدنى'))
+        return cleaned_data
+
+    def active_filters(self):
+        """الشروط الصالحة غير الفارغة كقاموس {الحقل: القيمة}"""
+        if not self.is_valid():
+            return {}
+        active = {}
+        for name in FILTER_FIELDS:
+            value = self.cleaned_data.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value not in (None, ''):
+                active[name] = value
+        return active
+
+
+def filter_movies(queryset, filters):
+    """تطبيق الشروط (من MovieFilterForm.active_filters) على queryset"""
+    if 'year_min' in filters:
+        queryset = queryset.filter(year__gte=filters['year_min'])
+    if 'year_max' in filters:
+        queryset = queryset.filter(year__lte=filters['year_max'])
+    if 'rating_min' in filters:
+        queryset = queryset.filter(rating__gte=filters['rating_min'])
+    if 'rating_max' in filters:
+        queryset = queryset.filter(rating__lte=filters['rating_max'])
+    if 'genre' in filters:
+        queryset = queryset.filter(genre_links__genre__name=filters['genre'])
+    if 'director' in filters:
+        queryset = queryset.filter(director_links__person__name=filters['director'])
+    if 'title' in filters:
+        # نطاق بدلاً من LIKE 'x%' ليستخدم فهرس العنوان في كل قواعد البيانات
+        # (حساس لحالة الأحرف في SQLite، وحسب ترتيب الجدول في MySQL)
+        prefix = filters['title']
+        queryset = queryset.filter(title__gte=prefix, title__lt=prefix_upper_bound(prefix))
+    if 'q' in filters:
+        queryset = search_titles(queryset, filters['q'])
+    return queryset
+
+
+def filter_cache_key(filters):
+    """بصمة ثابتة للشروط لاستخدامها في مفتاح التخزين المؤقت (دون مسافات أو أحرف خاصة)"""
+    if not filters:
+        return ''
+    text = '&'.join(f'{name}={filters[name]}' for name in FILTER_FIELDS if name in filters)
+    return hashlib.md5(text.encode()).hexdigest()
@@ -1,25 +1,55 @@
+import importlib.util
 import logging
 import os
+import zipfile
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 from django.core.files.uploadedfile import UploadedFile
+from .importer import IMPORT_MODE_INSERT, IMPORT_MODE_UPSERT, get_max_upload_size
 
 logger = logging.getLogger(__name__)
 
+
+def _format_size_limit(ext):
+    """نص الحد الأقصى لحجم الملف لعرضه في النموذج"""
+    max_size = get_max_upload_size(ext)
+    if not max_size:
+        return _('بدون حد (استيراد على أجزاء)')
+    return f'{round(max_size / (1024 * 1024))}MB'
+
+
+class MultipleFileInput(forms.FileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """حقل ملفات يقبل ملفاً أو عدة ملفات، ويعيد دائماً قائمة"""
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(item, initial) for item in data]
+        cleaned = single_file_clean(data, initial)
+        return [cleaned] if cleaned else []
+
+
 class UploadFileForm(forms.Form):
     """
     نموذج لتحميل ملفات الأفلام مع تحسينات للتعامل مع ملفات Excel التي يتم التعرف عليها كـ zip
     """
     
-    file = forms.FileField(
+    file = MultipleFileField(
         label=_('اختر ملف بيانات الأفلام'),
-        widget=forms.FileInput(attrs={
+        widget=MultipleFileInput(attrs={
             'class': 'form-control',
-            'accept': '.xlsx,.xls,.csv',
+            'accept': '.xlsx,.xls,.csv,.parquet,.zip',
             'id': 'fileInput',
             'required': 'required',
-            'aria-label': _('رفع ملف بيانات الأفلام')
+            'aria-label': _('رفع ملف بيانات الأفلام'),
+            # حدود الحجم لكل نوع ليستخدمها التحقق في المتصفح (0 = بدون حد)
+            'data-csv-max-size': get_max_upload_size('.csv') or 0,
+            'data-excel-max-size': get_max_upload_size('.xlsx') or 0,
         }),
         help_text=_('''
             <div class="file-requirements mt-2">
@@ -29,59 +59,108 @@ class UploadFileForm(forms.Form):
                 </ul>
             </div>
         ''') % {
-            'extensions': _('الامتدادات المسموحة: .xlsx, .xls, .csv'),
-            'size_limit': _('الحد الأقصى للحجم: 15MB')
+            'extensions': _('الامتدادات المسموحة: .xlsx, .xls, .csv, .parquet, .zip (عدة ملفات معاً مسموحة)'),
+            'size_limit': _('الحد الأقصى للحجم: Excel %(excel)s، CSV %(csv)s') % {
+                'excel': _format_size_limit('.xlsx'),
+                'csv': _format_size_limit('.csv'),
+            }
         },
         validators=[
             FileExtensionValidator(
-                allowed_extensions=['xlsx', 'xls', 'csv'],
-                message=_('نوع الملف غير مدعوم. يرجى استخدام ملف Excel أو CSV')
+                allowed_extensions=['xlsx', 'xls', 'csv', 'parquet', 'zip'],
+                message=_('نوع الملف غير مدعوم. يرجى استخدام ملف Excel أو CSV أو Parquet أو أرشيف ZIP')
             )
         ]
     )
 
+    mode = forms.ChoiceField(
+        label=_('الأفلام الموجودة مسبقاً'),
+        choices=[
+            (IMPORT_MODE_INSERT, _('تجاهلها (إضافة الأفلام الجديدة فقط)')),
+            (IMPORT_MODE_UPSERT, _('تحديث قيمها من الملف (التقييم، الأصوات، الإيرادات...)')),
+        ],
+        initial=IMPORT_MODE_INSERT,
+        required=False,
+        help_text=_('يُطابق الفيلم بالعنوان وسنة الإنتاج'),
+        widget=forms.Select(attrs={'class': 'form-select', 'id': 'modeInput'})
+    )
+
+    all_sheets = forms.BooleanField(
+        label=_('استيراد كل أوراق المصنف'),
+        required=False,
+        help_text=_('لملفات Excel التي تحتوي ورقة لكل سنة مثلاً؛ بدونه تُستورد الورقة الأولى فقط'),
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input', 'id': 'allSheetsInput'})
+    )
+
+    batch_size = forms.IntegerField(
+        label=_('حجم دفعة الحفظ'),
+        required=False,
+        min_value=1,
+        max_value=10000,
+        help_text=_('عدد الصفوف في كل عملية إدراج (اتركه فارغاً للحساب التلقائي حسب قاعدة البيانات)'),
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'id': 'batchSizeInput'})
+    )
+
+    background = forms.BooleanField(
+        label=_('معالجة الملف في الخلفية'),
+        required=False,
+        help_text=_('مناسب للملفات الكبيرة: يُحفظ الملف وتتم متابعة التقدم من صفحة النتائج'),
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input', 'id': 'backgroundInput'})
+    )
+
+    def clean_mode(self):
+        """النمط الافتراضي هو الإضافة فقط إذا لم يُرسل الحقل"""
+        return self.cleaned_data.get('mode') or IMPORT_MODE_INSERT
+
+    @property
+    def size_limit_text(self):
+        """وصف حدود الحجم لكل نوع ملف لعرضه في صفحة الرفع"""
+        return _('Excel: %(excel)s، CSV: %(csv)s') % {
+            'excel': _format_size_limit('.xlsx'),
+            'csv': _format_size_limit('.csv'),
+        }
+
     def clean_file(self):
         """
-        التحقق المتقدم من صحة الملف المرفوع مع تحسينات لملفات Excel
+        التحقق من كل الملفات المرفوعة؛ يعيد قائمة الملفات
         """
-        file = self.cleaned_data.get('file')
+        files = self.cleaned_data.get('file')
         
-        if not file:
+        if not files:
             raise forms.ValidationError(
                 _('الرجاء اختيار ملف للرفع'),
                 code='missing_file'
             )
 
-        # التحقق من حجم الملف (15MB كحد أقصى)
-        max_size = 15 * 1024 * 1024
-        if file.size > max_size:
-            raise forms.ValidationError(
-                _('حجم الملف كبير جداً (%(size)sMB). الحد الأقصى المسموح به هو %(max_size)sMB'),
-                params={
-                    'size': round(file.size / (1024 * 1024), 2),
-                    'max_size': 15
-                },
-                code='file_too_large'
-            )
-
-        # التحقق من أن الملف ليس فارغاً
-        if file.size == 0:
-            raise forms.ValidationError(
-                _('الملف فارغ'),
-                code='empty_file'
-            )
+        return [self._validate_upload(file) for file in files]
 
+    def _validate_upload(self, file):
+        """
+        التحقق المتقدم من صحة ملف مرفوع واحد مع تحسينات لملفات Excel
+        """
         # التحقق من الامتداد
         file_name = file.name
         ext = os.path.splitext(file_name)[1].lower()
         
-        if ext not in ['.xlsx', '.xls', '.csv']:
+        if ext not in ['.xlsx', '.xls', '.csv', '.parquet', '.zip']:
             raise forms.ValidationError(
                 _('امتداد الملف "%(ext)s" غير مسموح به'),
                 params={'ext': ext},
                 code='invalid_extension'
             )
 
+        # التحقق من حجم الملف (ملفات CSV تُستورد على أجزاء فحدها قابل للضبط أو غير محدود)
+        max_size = get_max_upload_size(ext)
+        if max_size and file.size > max_size:
+            raise forms.ValidationError(
+                _('حجم الملف كبير جداً (%(size)sMB). الحد الأقصى المسموح به هو %(max_size)sMB'),
+                params={
+                    'size': round(file.size / (1024 * 1024), 2),
+                    'max_size': round(max_size / (1024 * 1024), 2)
+                },
+                code='file_too_large'
+            )
+
         # التحقق من نوع الملف بناءً على المحتوى (MIME Type)
         try:
             import magic
@@ -97,6 +176,8 @@ class UploadFileForm(forms.Form):
                 'application/zip',  # لأن بعض ملفات XLSX يتم التعرف عليها كـ zip
                 'text/csv',
                 'text/plain',
+                'application/vnd.apache.parquet',
+                'application/x-parquet',
                 'application/octet-stream'
             ]
 
@@ -124,7 +205,29 @@ class UploadFileForm(forms.Form):
         try:
             file.seek(0)
             
-            if ext == '.csv':
+            if ext == '.zip':
+                # محتويات الأرشيف يُتحقق منها عند فكه أثناء الاستيراد
+                if not zipfile.is_zipfile(file):
+                    raise forms.ValidationError(
+                        _('ملف ZIP غير صالح'),
+                        code='invalid_zip'
+                    )
+                file.seek(0)
+            elif ext == '.parquet':
+                # ملف Parquet يبدأ وينتهي بالعلامة PAR1؛ الأعمدة تُفحص من تذييله عند الاستيراد
+                if not importlib.util.find_spec('pyarrow'):
+                    raise forms.ValidationError(
+                        _('رفع ملفات Parquet يتطلب تثبيت مكتبة pyarrow على الخادم'),
+                        code='parquet_unavailable'
+                    )
+                magic_bytes = file.read(4)
+                file.seek(0)
+                if magic_bytes != b'PAR1':
+                    raise forms.ValidationError(
+                        _('ملف Parquet غير صالح'),
+                        code='invalid_parquet'
+                    )
+            elif ext == '.csv':
                 # قراءة أول سطر للتحقق من أنه CSV صالح
                 first_line = file.read(1024).decode('utf-8-sig').split('\n')[0]
                 file.seek(0)
@@ -138,15 +241,15 @@ class UploadFileForm(forms.Form):
                 import pandas as pd
                 try:
                     if ext == '.xlsx':
-                        engine = 'openpyxl'
+                        # ملف xlsx حاوية ZIP: يُفحص فهرسها فقط دون فتح المصنف، فيُفتح مرة واحدة
+                        # عند الاستيراد حيث يُتحقق من صف العناوين والأعمدة المطلوبة في الجزء الأول
+                        empty = not zipfile.is_zipfile(file)
                     else:  # .xls
-                        engine = 'xlrd'
-                    
-                    # قراءة أول صف فقط للتحقق
-                    df = pd.read_excel(file, engine=engine, nrows=1)
+                        # قراءة أول صف فقط للتحقق
+                        empty = pd.read_excel(file, engine='xlrd', nrows=1).empty
                     file.seek(0)
                     
-                    if df.empty:
+                    if empty:
                         raise forms.ValidationError(
                             _('ملف Excel فارغ أو غير صالح'),
                             code='invalid_excel'
@@ -0,0 +1,947 @@
+import logging
+import unicodedata
+from contextlib import nullcontext
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection, transaction
+
+from .dimensions import DimensionLinker
+from .instrumentation import stage, timed_chunks
+from .models import Movie
+from .stats import apply_movie_updates, track_new_movies
+from .analytics import refresh_rollups_on_commit
+from .cache import bump_dataset_version
+
+logger = logging.getLogger(__name__)
+
+# الأعمدة المطلوبة في ملف الرفع
+REQUIRED_COLUMNS = {'title', 'year', 'rating'}
+
+# الأسماء البديلة المقبولة لأعمدة الملف (بعد التحويل لأحرف صغيرة)
+COLUMN_ALIASES = {
+    'title': ['film', 'movie', 'اسم الفيلم', 'العنوان'],
+    'year': ['release_year', 'سنة', 'سنة الإصدار'],
+    'rating': ['score', 'تقييم', 'التقييم'],
+    'genre': ['genres', 'النوع'],
+    'director': ['directors', 'المخرج'],
+    'runtime': ['runtime (minutes)', 'المدة'],
+    'revenue': ['revenue (millions)', 'الإيرادات'],
+}
+
+# الحقول الاختيارية حسب نوعها
+TEXT_FIELDS = ('genre', 'director', 'actors', 'description', 'country', 'language')
+INT_FIELDS = ('runtime', 'votes', 'metascore')
+FLOAT_FIELDS = ('revenue',)
+
+# كل الحقول التي يملؤها الاستيراد
+IMPORT_FIELDS = ('title', 'year', 'rating') + TEXT_FIELDS + INT_FIELDS + FLOAT_FIELDS
+
+# ترتيب التحويل نفسه المستخدم سابقاً داخل حلقة iterrows (يحدد أول خطأ يظهر للصف)
+CONVERSION_ORDER = ('year', 'rating', 'runtime', 'votes', 'revenue', 'metascore')
+
+# أنماط الاستيراد: insert يتجاهل الأفلام الموجودة، upsert يحدّث قيمها
+IMPORT_MODE_INSERT = 'insert'
+IMPORT_MODE_UPSERT = 'upsert'
+IMPORT_MODES = (IMPORT_MODE_INSERT, IMPORT_MODE_UPSERT)
+
+# الحقول التي يحدّثها نمط upsert للأفلام الموجودة (المفتاح هو title, year)
+UPSERT_FIELDS = (
+    'rating', 'genre', 'director', 'runtime', 'votes', 'revenue', 'metascore',
+    'actors', 'description', 'country', 'language',
+)
+
+# مفتاح قناع الحقول الفارغة في سجلات convert_records (بت لكل حقل من UPSERT_FIELDS):
+# الحقل الغائب عن الملف أو الفارغ في الصف لا يحدّثه upsert
+MISSING_KEY = '_missing'
+
+# عدد العناوين في كل استعلام بحث عن الأفلام الموجودة
+EXISTING_LOOKUP_BATCH = 500
+
+MIN_YEAR = 1888
+MAX_YEAR = 2100
+
+# رسائل التحقق ورمز كل خطأ والعمود الذي يخصه (لتقرير الصفوف المرفوضة)
+ERROR_INVALID_NUMBER = 'invalid_number'
+ERROR_REQUIRED = 'required'
+ERROR_OUT_OF_RANGE = 'out_of_range'
+
+INVALID_VALUE_MESSAGE = 'قيمة غير صالحة في العمود {field}'
+TITLE_REQUIRED_MESSAGE = 'عنوان الفيلم مطلوب'
+YEAR_REQUIRED_MESSAGE = 'سنة الإنتاج مطلوبة'
+YEAR_RANGE_MESSAGE = f'سنة الإنتاج يجب أن تكون بين {MIN_YEAR} و {MAX_YEAR}'
+RATING_RANGE_MESSAGE = 'التقييم يجب أن يكون بين 0 و 10'
+
+ERROR_DETAILS = {
+    **{INVALID_VALUE_MESSAGE.format(field=field): (ERROR_INVALID_NUMBER, field) for field in CONVERSION_ORDER},
+    TITLE_REQUIRED_MESSAGE: (ERROR_REQUIRED, 'title'),
+    YEAR_REQUIRED_MESSAGE: (ERROR_REQUIRED, 'year'),
+    YEAR_RANGE_MESSAGE: (ERROR_OUT_OF_RANGE, 'year'),
+    RATING_RANGE_MESSAGE: (ERROR_OUT_OF_RANGE, 'rating'),
+}
+
+# عدد الصفوف المرفوضة التي تبقى في نتيجة الاستيراد (error_rows)؛ العدد الكلي في error_count
+DEFAULT_ERROR_ROWS_IN_MEMORY = 1000
+
+# محركات قراءة CSV (MOVIES_CSV_ENGINE)
+CSV_ENGINE_AUTO = 'auto'
+CSV_ENGINE_PYARROW = 'pyarrow'
+CSV_ENGINE_C = 'c'
+
+# الصيغ العمودية (Parquet و Feather/Arrow IPC) تُقرأ بمكتبة pyarrow الاختيارية
+COLUMNAR_EXTENSIONS = ('.parquet', '.feather')
+
+# الملفات التي تُقرأ على أجزاء فتأخذ حد حجم CSV بدلاً من حد Excel
+STREAMED_EXTENSIONS = ('.csv', '.zip') + COLUMNAR_EXTENSIONS
+
+# حجم الدفعة الافتراضي عند قراءة ملفات CSV على أجزاء
+DEFAULT_CHUNK_SIZE = 5000
+
+# حجم دفعة bulk_create: رقم ثابت أو 'auto' للحساب من حدود قاعدة البيانات
+BATCH_SIZE_AUTO = 'auto'
+DEFAULT_BATCH_SIZE = BATCH_SIZE_AUTO
+MAX_ADAPTIVE_BATCH_SIZE = 10000
+
+# نسبة max_allowed_packet التي تُملأ بدفعة واحدة في MySQL (هامش لبقية نص الاستعلام)
+PACKET_FILL_RATIO = 0.5
+
+# الحد الأقصى لحجم ملفات Excel (تُحمّل كاملة في الذاكرة)؛ ملفات CSV تُقرأ على أجزاء فلا حد لها افتراضياً
+DEFAULT_EXCEL_MAX_UPLOAD_SIZE = 15 * 1024 * 1024
+DEFAULT_CSV_MAX_UPLOAD_SIZE = None
+
+# أكبر قيمة يمكن تحويلها إلى int64 دون فيضان
+_INT64_LIMIT = 2 ** 63
+
+
+def _column(df, name):
+    """إرجاع العمود إن وجد، أو عمود فارغ بنفس الفهرس"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(np.nan, index=df.index, dtype=object)
+
+
+def _clean_text(series, max_length=255):
+    """مكافئ str(x).strip()[:max_length] لكل قيمة غير فارغة، مع None للقيم الفارغة (TextField بلا حد)"""
+    present = series.notna()
+    text = series.astype(str).str.strip()
+    if max_length:
+        text = text.str[:max_length]
+    return text.where(present, None)
+
+
+def _to_number(series, integer=False):
+    """
+    تحويل عمود إلى أرقام دفعة واحدة.
+    يعيد القيم (float64) وقناع القيم الموجودة التي تعذر تحويلها.
+    """
+    present = series.notna()
+    values = pd.to_numeric(series, errors='coerce').astype('float64')
+    invalid = present & values.isna()
+    if integer:
+        # int() يرفض اللانهاية والقيم التي لا تتسع لها الأعمدة الصحيحة
+        invalid |= present & ~(np.abs(values) < _INT64_LIMIT)
+    return values, invalid
+
+
+def convert_records(df):
+    """
+    تحويل DataFrame (بأعمدة موحدة بأحرف صغيرة) إلى قواميس حقول Movie وصفوف أخطاء.
+
+    بديل عمودي لحلقة df.iterrows(): تتم كل التحويلات وأقنعة التحقق على
+    الأعمدة كاملة، ثم تُبنى قواميس الصفوف الصالحة فقط. القواميس لا تحتاج
+    قاعدة البيانات فيمكن إنتاجها في عمليات منفصلة (movies.parallel).
+    يعيد (records, error_rows)، حيث رقم الصف = فهرس الصف + 2 كما في Excel.
+    """
+    if df.empty:
+        return [], []
+
+    title = _clean_text(_column(df, 'title'))
+
+    numbers = {}
+    conversion_errors = {}
+    for field in CONVERSION_ORDER:
+        values, invalid = _to_number(_column(df, field), integer=field not in ('rating', 'revenue'))
+        numbers[field] = values
+        conversion_errors[field] = invalid
+
+    year = np.trunc(numbers['year'])
+    rating = numbers['rating'].fillna(0.0)
+
+    # الشروط بالترتيب نفسه الذي كانت تُفحص به داخل الحلقة
+    conditions = [conversion_errors[field] for field in CONVERSION_ORDER]
+    choices = [INVALID_VALUE_MESSAGE.format(field=field) for field in CONVERSION_ORDER]
+    conditions += [
+        title.isna() | (title == ''),
+        year.isna(),
+        ~year.between(MIN_YEAR, MAX_YEAR),
+        ~rating.between(0, 10),
+    ]
+    choices += [TITLE_REQUIRED_MESSAGE, YEAR_REQUIRED_MESSAGE, YEAR_RANGE_MESSAGE, RATING_RANGE_MESSAGE]
+    conditions = [np.asarray(condition, dtype=bool) for condition in conditions]
+    invalid = np.logical_or.reduce(conditions)
+
+    error_rows = []
+    if invalid.any():
+        messages_per_row = np.select(conditions, choices, default='')
+        row_numbers = df.index[invalid] + 2
+        error_rows = list(zip(row_numbers.tolist(), messages_per_row[invalid].tolist()))
+
+    valid = ~invalid
+    if not valid.any():
+        return [], error_rows
+
+    frame = pd.DataFrame({
+        'title': title[valid],
+        'year': year[valid].astype('int64'),
+        'rating': rating[valid],
+    })
+    for field in TEXT_FIELDS:
+        max_length = Movie._meta.get_field(field).max_length
+        frame[field] = _clean_text(_column(df, field)[valid], max_length).fillna('')
+    for field in INT_FIELDS:
+        frame[field] = np.trunc(numbers[field][valid].fillna(0)).astype('int64')
+    for field in FLOAT_FIELDS:
+        frame[field] = numbers[field][valid].fillna(0.0)
+
+    missing = np.zeros(int(valid.sum()), dtype='int64')
+    for bit, field in enumerate(UPSERT_FIELDS):
+        if field in TEXT_FIELDS:
+            empty = frame[field] == ''
+        else:
+            empty = numbers[field][valid].isna()
+        missing |= np.asarray(empty, dtype='int64') << bit
+    frame[MISSING_KEY] = missing
+
+    return frame.to_dict('records'), error_rows
+
+
+@lru_cache(maxsize=None)
+def missing_fields(mask):
+    """أسماء حقول UPSERT_FIELDS المقابلة لقناع MISSING_KEY"""
+    return frozenset(field for bit, field in enumerate(UPSERT_FIELDS) if mask >> bit & 1)
+
+
+def build_movies(records):
+    """
+    كائنات Movie من سجلات convert_records، مع الحقول الفارغة في الملف في
+    movie.missing_fields (لا يكتبها upsert فوق القيم الموجودة).
+    """
+    movies = []
+    for record in records:
+        mask = record.pop(MISSING_KEY, 0)
+        movie = Movie(**record)
+        movie.missing_fields = missing_fields(mask)
+        movies.append(movie)
+    return movies
+
+
+def convert_dataframe(df):
+    """
+    تحويل DataFrame (بأعمدة موحدة بأحرف صغيرة) إلى كائنات Movie وصفوف أخطاء.
+    يعيد (movies_to_create, error_rows) حيث رقم الصف = فهرس الصف + 2 كما في Excel.
+    """
+    records, error_rows = convert_records(df)
+    return build_movies(records), error_rows
+
+
+def get_chunk_size():
+    """عدد الصفوف في كل جزء عند الاستيراد المتدفق"""
+    return getattr(settings, 'MOVIES_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def get_max_upload_size(ext):
+    """
+    الحد الأقصى لحجم الملف بالبايت حسب امتداده، أو None إذا لم يكن هناك حد.
+    أرشيفات zip والملفات العمودية تأخذ حد CSV، وكل ملف داخل الأرشيف يُفحص
+    بحد نوعه عند فكه.
+    """
+    if ext in STREAMED_EXTENSIONS:
+        return getattr(settings, 'MOVIES_CSV_MAX_UPLOAD_SIZE', DEFAULT_CSV_MAX_UPLOAD_SIZE)
+    return getattr(settings, 'MOVIES_EXCEL_MAX_UPLOAD_SIZE', DEFAULT_EXCEL_MAX_UPLOAD_SIZE)
+
+
+def get_error_rows_in_memory():
+    return getattr(settings, 'MOVIES_IMPORT_ERROR_ROWS_IN_MEMORY', DEFAULT_ERROR_ROWS_IN_MEMORY)
+
+
+def get_commit_every():
+    """
+    عدد دفعات bulk_create في كل معاملة (MOVIES_IMPORT_COMMIT_EVERY)،
+    أو None لحفظ كل جزء في معاملة واحدة.
+    """
+    return getattr(settings, 'MOVIES_IMPORT_COMMIT_EVERY', None) or None
+
+
+def _insert_fields():
+    return [field for field in Movie._meta.concrete_fields if not field.primary_key]
+
+
+def _max_allowed_packet():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT @@max_allowed_packet')
+        return cursor.fetchone()[0]
+
+
+def _estimate_row_bytes(movies, fields):
+    """تقدير حجم الصف في نص الاستعلام من عينة من الكائنات"""
+    sample = movies[:100]
+    total = sum(
+        len(str(getattr(movie, field.attname)).encode()) + 4
+        for movie in sample
+        for field in fields
+    )
+    return max(total // max(len(sample), 1), 1)
+
+
+def adaptive_batch_size(movies):
+    """
+    أكبر حجم دفعة تتحمله قاعدة البيانات الحالية لهذه الكائنات:
+    SQLite محدود بعدد المتغيرات في الاستعلام (SQLITE_LIMIT_VARIABLE_NUMBER)،
+    و MySQL بحجم max_allowed_packet مقسوماً على حجم الصف التقديري.
+    """
+    fields = _insert_fields()
+    if connection.vendor == 'mysql':
+        size = int(_max_allowed_packet() * PACKET_FILL_RATIO) // _estimate_row_bytes(movies, fields)
+    else:
+        size = connection.ops.bulk_batch_size(fields, movies)
+    return max(1, min(size, MAX_ADAPTIVE_BATCH_SIZE))
+
+
+def resolve_batch_size(movies, batch_size=None):
+    """
+    حجم الدفعة المستخدم فعلياً: المعطى للاستيراد، أو MOVIES_IMPORT_BATCH_SIZE،
+    مع حساب 'auto' من حدود قاعدة البيانات.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'MOVIES_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    if batch_size == BATCH_SIZE_AUTO:
+        return adaptive_batch_size(movies)
+    # Django يقلّص الدفعة إلى حد قاعدة البيانات على أي حال (999 متغيراً في SQLite)
+    return max(1, min(int(batch_size), connection.ops.bulk_batch_size(_insert_fields(), movies)))
+
+
+def normalize_columns(df):
+    """
+    توحيد أسماء الأعمدة (إزالة المسافات وتحويلها لأحرف صغيرة)، ثم تحويل
+    الأسماء البديلة في COLUMN_ALIASES إلى أسماء الحقول.
+    """
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    return df.rename(columns=resolve_column_aliases(df.columns))
+
+
+def resolve_column_aliases(columns):
+    """
+    خريطة {اسم العمود في الملف: اسم الحقل} للأعمدة البديلة.
+    أول اسم موجود لكل حقل هو المعتمد، ولا يُستبدل عمود يحمل اسم الحقل نفسه.
+    """
+    columns = list(columns)
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        if field in columns:
+            continue
+        for alias in aliases:
+            if alias in columns:
+                mapping[alias] = field
+                break
+    return mapping
+
+
+def check_required_columns(df):
+    """التأكد من وجود الأعمدة المطلوبة"""
+    missing_cols = REQUIRED_COLUMNS - set(df.columns)
+    if missing_cols:
+        raise ValueError(f'الأعمدة المطلوبة مفقودة: {", ".join(sorted(missing_cols))}')
+
+
+def get_csv_engine():
+    """
+    محرك قراءة CSV حسب MOVIES_CSV_ENGINE: 'pyarrow' أو 'c'، و 'auto' يختار
+    pyarrow إذا كانت المكتبة مثبتة وإلا محرك pandas الافتراضي (C).
+    """
+    engine = getattr(settings, 'MOVIES_CSV_ENGINE', CSV_ENGINE_AUTO)
+    if engine in (CSV_ENGINE_AUTO, CSV_ENGINE_PYARROW):
+        try:
+            import pyarrow.csv  # noqa: F401
+            return CSV_ENGINE_PYARROW
+        except ImportError:
+            if engine == CSV_ENGINE_PYARROW:
+                logger.warning("pyarrow is not installed, falling back to the C CSV engine")
+    return CSV_ENGINE_C
+
+
+def _field_for_column(name):
+    """اسم الحقل الذي يملؤه عمود الملف (باسمه أو باسم بديل)، أو None"""
+    name = str(name).strip().lower()
+    if name in IMPORT_FIELDS:
+        return name
+    for field, aliases in COLUMN_ALIASES.items():
+        if name in aliases:
+            return field
+    return None
+
+
+def _csv_plan(source):
+    """
+    قراءة صف العناوين فقط لتحديد الأعمدة المطلوبة (usecols) وأنواع الأعمدة
+    النصية مسبقاً بأسمائها الأصلية في الملف، ثم إعادة موضع الملف إلى البداية.
+    الأعمدة الرقمية تُترك لاستنتاج المحرك الأصلي: تحديد نوع رقمي يجعل قيمة
+    واحدة غير صالحة تُفشل الجزء كاملاً بدلاً من صف واحد.
+    """
+    header = pd.read_csv(source, encoding='utf-8-sig', nrows=0).columns
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return _plan_columns(header)
+
+
+def _plan_columns(header):
+    """أعمدة الملف التي تملأ حقول Movie (usecols) والأعمدة النصية منها"""
+    fields = {column: _field_for_column(column) for column in header}
+    check_required_columns(pd.DataFrame(columns=list(fields.values())))
+
+    usecols = [column for column, field in fields.items() if field]
+    text_columns = [column for column in usecols if fields[column] in ('title',) + TEXT_FIELDS]
+    return usecols, text_columns
+
+
+def _read_csv_chunks_c(source, chunk_size, usecols, text_columns):
+    reader = pd.read_csv(
+        source,
+        encoding='utf-8-sig',
+        usecols=usecols,
+        dtype={column: 'object' for column in text_columns},
+        chunksize=chunk_size,
+    )
+    with reader:
+        for chunk in reader:
+            yield normalize_columns(chunk)
+
+
+def _read_csv_chunks_pyarrow(source, chunk_size, usecols, text_columns):
+    """
+    قراءة متدفقة بمحرك pyarrow (open_csv) على كتل، مع تحليل كل كتلة بعدة
+    خيوط وتحويلها إلى DataFrame بفهرس متصل كما في محرك C.
+    open_csv يستنتج نوع العمود من الكتلة الأولى فقط، فتُفشل قيمة غير رقمية بعدها
+    الملف كاملاً؛ لذلك تُقرأ كل الأعمدة نصوصاً ويتم التحويل في convert_records
+    حيث تُرفض القيمة في صفها وحده.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    # حجم الكتلة بالبايت تقريباً بحجم الجزء المطلوب (~200 بايت للصف)
+    block_size = max(1 << 20, chunk_size * 200)
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types={column: pa.string() for column in usecols},
+            strings_can_be_null=True,
+        ),
+    )
+    try:
+        yield from _arrow_chunks(reader, chunk_size)
+    except pa.ArrowInvalid as e:
+        raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
+    finally:
+        reader.close()
+
+
+def _arrow_chunks(batches, chunk_size, columns=None):
+    """
+    إعادة تقسيم دفعات Arrow (RecordBatch) إلى أجزاء DataFrame بحجم chunk_size
+    وفهرس متصل كما في محرك C، مع اختيار أعمدة columns فقط إن حُددت.
+    """
+    import pyarrow as pa
+
+    def to_frame(table):
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    offset = 0
+    pending = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            chunk = to_frame(table.slice(0, chunk_size))
+            chunk.index += offset
+            offset += chunk_size
+            yield normalize_columns(chunk)
+            pending = table.slice(chunk_size).to_batches()
+            rows -= chunk_size
+    if pending:
+        chunk = to_frame(pa.Table.from_batches(pending))
+        if len(chunk):
+            chunk.index += offset
+            yield normalize_columns(chunk)
+
+
+def read_csv_chunks(source, chunk_size=None, engine=None):
+    """
+    قراءة ملف CSV على أجزاء ثابتة الحجم دون تحميله كاملاً في الذاكرة.
+    source يمكن أن يكون مساراً أو كائن ملف (مثل الملف المرفوع نفسه).
+    تُقرأ أعمدة حقول Movie فقط (usecols) مع أنواع الأعمدة النصية مسبقاً،
+    بمحرك get_csv_engine() أو المحرك المعطى ('pyarrow' أو 'c').
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    usecols, text_columns = _csv_plan(source)
+    if (engine or get_csv_engine()) == CSV_ENGINE_PYARROW:
+        yield from _read_csv_chunks_pyarrow(source, chunk_size, usecols, text_columns)
+    else:
+        yield from _read_csv_chunks_c(source, chunk_size, usecols, text_columns)
+
+
+def read_excel_frame(source, ext):
+    """
+    قراءة ملف Excel كاملاً مع تجربة كل المحركات المتاحة عند الفشل.
+    """
+    try:
+        try:
+            engine = 'openpyxl' if ext == '.xlsx' else 'xlrd'
+            df = pd.read_excel(source, engine=engine)
+        except Exception as e:
+            logger.warning(f"Failed to read with {engine}, trying other engines")
+            try:
+                if hasattr(source, 'seek'):
+                    source.seek(0)
+                df = pd.read_excel(source, engine=None)  # حاول مع جميع المحركات المتاحة
+            except Exception as e:
+                raise ValueError(f'لا يمكن قراءة ملف Excel: {str(e)}')
+
+        if df.empty:
+            raise ValueError('لا توجد بيانات في الملف')
+
+        # توحيد أسماء الأعمدة
+        return normalize_columns(df)
+
+    except Exception as e:
+        raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
+
+
+def read_excel_chunks(source, ext):
+    """ملفات Excel القديمة (.xls) تُقرأ كاملة كجزء واحد"""
+    return [read_excel_frame(source, ext)]
+
+
+def _open_xlsx(source):
+    """فتح المصنف بوضع read_only (قراءة متدفقة لورقة XML دون بناء الخلايا كلها)"""
+    import openpyxl
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return openpyxl.load_workbook(source, read_only=True, data_only=True)
+
+
+def _is_blank(row):
+    return all(value is None or (isinstance(value, str) and not value.strip()) for value in row)
+
+
+def xlsx_sheet_names(source):
+    """أسماء أوراق المصنف دون قراءة محتواها"""
+    workbook = _open_xlsx(source)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+
+def read_xlsx_chunks(source, ext='.xlsx', chunk_size=None, sheet=None, allow_empty=False):
+    """
+    قراءة ملف xlsx على أجزاء من الصفوف بفتح واحد للمصنف (openpyxl read_only)،
+    مباشرة من الملف المرفوع دون نسخه. الصفوف الفارغة تُتخطى مع الحفاظ على
+    الفهرس (رقم الصف في الملف = الفهرس + 2) كما في read_csv_chunks.
+    الملفات التي لا يفتحها openpyxl تُقرأ بـ read_excel_frame كجزء واحد.
+    sheet: اسم الورقة المطلوبة، والافتراضي الورقة النشطة. مع allow_empty لا
+    تُعد الورقة الفارغة خطأً (عند استيراد كل أوراق المصنف).
+    """
+    try:
+        workbook = _open_xlsx(source)
+    except Exception as e:
+        logger.warning(f"Failed to open workbook in read-only mode ({e}), trying other engines")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        yield read_excel_frame(source, ext)
+        return
+
+    chunk_size = chunk_size or get_chunk_size()
+    try:
+        # (رقم الصف في الورقة - 2) ليبقى رقم الصف في رسائل الأخطاء = الفهرس + 2
+        worksheet = workbook[sheet] if sheet is not None else workbook.active
+        rows = enumerate(worksheet.iter_rows(values_only=True), start=-1)
+        header = None
+        for _, row in rows:
+            if not _is_blank(row):
+                header = [str(value) if value is not None else f'unnamed: {i}' for i, value in enumerate(row)]
+                break
+        if header is None:
+            if allow_empty:
+                return
+            raise ValueError('لا توجد بيانات في الملف')
+
+        width = len(header)
+        records, index = [], []
+        for position, row in rows:
+            if _is_blank(row):
+                continue
+            records.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            index.append(position)
+            if len(records) == chunk_size:
+                yield normalize_columns(pd.DataFrame.from_records(records, columns=header, index=index))
+                records, index = [], []
+        if records:
+            yield normalize_columns(pd.DataFrame.from_records(records, columns=header, index=index))
+    finally:
+        workbook.close()
+
+
+def _import_pyarrow(ext):
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError(f'قراءة ملفات {ext} تتطلب تثبيت مكتبة pyarrow')
+    return pyarrow
+
+
+def read_parquet_chunks(source, ext='.parquet', chunk_size=None):
+    """
+    قراءة ملف Parquet على أجزاء (iter_batches) من مجموعات الصفوف دون تحميله
+    كاملاً، وبأعمدة حقول Movie فقط. الأنواع مخزنة في الملف فلا استنتاج لها.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    pa = _import_pyarrow(ext)
+    import pyarrow.parquet as pq
+
+    try:
+        parquet_file = pq.ParquetFile(source)
+    except pa.ArrowInvalid as e:
+        raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
+    try:
+        usecols, _ = _plan_columns(parquet_file.schema_arrow.names)
+        yield from _arrow_chunks(parquet_file.iter_batches(batch_size=chunk_size, columns=usecols), chunk_size)
+    except pa.ArrowInvalid as e:
+        raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
+    finally:
+        parquet_file.close()
+
+
+def read_feather_chunks(source, ext='.feather', chunk_size=None):
+    """
+    قراءة ملف Feather (الإصدار 2 / Arrow IPC) دفعة بعد دفعة دون تحميله
+    كاملاً، وبأعمدة حقول Movie فقط.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    pa = _import_pyarrow(ext)
+
+    try:
+        reader = pa.ipc.open_file(source)
+        usecols, _ = _plan_columns(reader.schema.names)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+        yield from _arrow_chunks(batches, chunk_size, columns=usecols)
+    except pa.ArrowInvalid as e:
+        raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
+
+
+# قارئ لكل امتداد: دالة (source, ext) تعيد أجزاء DataFrame بأعمدة موحدة
+READERS = {
+    '.csv': lambda source, ext: read_csv_chunks(source),
+    '.xlsx': read_xlsx_chunks,
+    '.xls': read_excel_chunks,
+    '.parquet': read_parquet_chunks,
+    '.feather': read_feather_chunks,
+}
+
+
+def register_reader(ext, reader):
+    """إضافة قارئ لامتداد جديد (أو استبدال قارئ موجود)"""
+    READERS[ext.lower()] = reader
+
+
+def supported_extensions():
+    return tuple(READERS)
+
+
+def read_file_chunks(source, ext):
+    """
+    إرجاع أجزاء الملف حسب نوعه من READERS: CSV على أجزاء متدفقة، و Excel كجزء واحد.
+    """
+    reader = READERS.get(ext.lower())
+    if reader is None:
+        raise ValueError(f'نوع الملف غير مدعوم: {ext}')
+    return reader(source, ext)
+
+
+def import_file(source, ext, **options):
+    """
+    استيراد ملف كامل عبر المحرك الموحد: القارئ المناسب لامتداده ثم import_chunks.
+    تُمرَّر options (batch_size, on_chunk, mode, commit_every, error_report) إلى import_chunks.
+    """
+    return import_chunks(read_file_chunks(source, ext), **options)
+
+
+def import_chunks(chunks, batch_size=None, on_chunk=None, mode=IMPORT_MODE_INSERT, commit_every=None,
+                  error_report=None):
+    """
+    تحويل وحفظ البيانات جزءاً بجزء، بحيث لا يبقى في الذاكرة إلا الجزء الحالي.
+
+    mode: 'insert' يتجاهل الأفلام الموجودة مسبقاً (title, year)، و 'upsert'
+    يحدّث قيمها من الملف.
+    batch_size: عدد الصفوف في كل INSERT (رقم أو 'auto')، الافتراضي MOVIES_IMPORT_BATCH_SIZE.
+    commit_every: عدد الدفعات في كل معاملة، الافتراضي MOVIES_IMPORT_COMMIT_EVERY.
+    on_chunk(chunk_number, chunk_result) تُستدعى بعد حفظ كل جزء للإبلاغ عن التقدم،
+    حيث chunk_result قاموس يحتوي rows و created و updated و unchanged و error_rows الخاصة بالجزء.
+    error_report: كاتب تقرير (movies.error_reports.ErrorReportWriter) تُكتب فيه كل
+    الصفوف المرفوضة على القرص جزءاً بجزء.
+    يعيد قاموساً بالإجماليات: chunks و rows و valid و created و updated و unchanged و
+    error_count، و error_rows (أول MOVIES_IMPORT_ERROR_ROWS_IN_MEMORY صفاً مرفوضاً فقط).
+
+    كل جزء يُحفظ داخل transaction.atomic خاصة به مع استدعاء on_chunk، فإذا
+    استُدعيت الدالة خارج أي معاملة (كما في عامل الاستيراد الخلفي) يُثبّت كل جزء
+    مع تقدمه على حدة؛ وإذا استُدعيت داخل معاملة يُحفظ الملف كاملاً أو لا شيء.
+    مع commit_every تُحفظ كل commit_every دفعة في معاملة مستقلة لتقصير مدة
+    الأقفال، فلا يعود الجزء ذرياً.
+    """
+    return import_converted(
+        convert_chunks(timed_chunks('read', chunks)), batch_size, on_chunk, mode, commit_every, error_report
+    )
+
+
+def convert_chunks(chunks):
+    """
+    تحويل الأجزاء بالترتيب مع التحقق من أعمدة الجزء الأول.
+    يعيد لكل جزء (عدد الصفوف، كائنات Movie، صفوف الأخطاء).
+    """
+    for number, chunk in enumerate(chunks):
+        if number == 0:
+            check_required_columns(chunk)
+        with stage('convert', len(chunk)):
+            movies, error_rows = convert_dataframe(chunk)
+        yield len(chunk), movies, error_rows
+
+
+def import_converted(converted, batch_size=None, on_chunk=None, mode=IMPORT_MODE_INSERT, commit_every=None,
+                     error_report=None):
+    """
+    الكاتب الموحد: حفظ أجزاء محوَّلة مسبقاً (rows, movies, error_rows) بنفس
+    معاملات ومعاني import_chunks. يُستخدم مباشرة عندما يتم التحويل في مكان
+    آخر، كعمليات الاستيراد المتوازي.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f'نمط استيراد غير معروف: {mode}')
+    if commit_every is None:
+        commit_every = get_commit_every()
+    try:
+        return _import_converted(converted, batch_size, on_chunk, mode, commit_every, error_report)
+    except pd.errors.EmptyDataError:
+        raise ValueError('لا توجد بيانات في الملف')
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
+
+
+def _link_new_movies(linker, last_pk):
+    """ربط الأفلام المضافة للتو (المعرفات بعد last_pk) بأنواعها ومخرجيها"""
+    linker.link(Movie.objects.filter(pk__gt=last_pk).values_list('pk', 'genre', 'director'))
+
+
+def _insert_movies(movies_to_create, batch_size, linker):
+    """إدراج الأفلام الجديدة فقط وتجاهل الموجود منها"""
+    # تحديث ملخص الإحصائيات بالأفلام المضافة فعلياً
+    with track_new_movies() as tracked:
+        Movie.objects.bulk_create(
+            movies_to_create,
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+    _link_new_movies(linker, tracked['last_pk'])
+    return {'created': tracked['created'], 'updated': 0, 'unchanged': len(movies_to_create) - tracked['created']}
+
+
+def _match_key(title, year):
+    """
+    مفتاح مطابقة (title, year) كما تقارنه قاعدة البيانات: ترتيب MySQL الافتراضي
+    لا يميز حالة الأحرف ولا التشكيل ولا المسافات في النهاية، بينما SQLite يطابق حرفياً.
+    """
+    if connection.vendor == 'mysql':
+        title = unicodedata.normalize('NFKD', title.rstrip()).casefold()
+        title = ''.join(char for char in title if not unicodedata.combining(char))
+    return title, year
+
+
+def _fetch_existing(movies):
+    """جلب القيم الحالية للأفلام الموجودة مسبقاً بنفس (title, year) على دفعات"""
+    titles = list({movie.title for movie in movies})
+    existing = {}
+    for start in range(0, len(titles), EXISTING_LOOKUP_BATCH):
+        rows = Movie.objects.filter(title__in=titles[start:start + EXISTING_LOOKUP_BATCH]).values(
+            'pk', 'title', 'year', *UPSERT_FIELDS
+        )
+        for row in rows:
+            existing[_match_key(row['title'], row['year'])] = row
+    return existing
+
+
+def _keep_missing(old, movie):
+    """الحقول الفارغة في الملف تأخذ القيم الحالية للفيلم الموجود بدلاً من ''/0"""
+    for field in getattr(movie, 'missing_fields', ()):
+        setattr(movie, field, (old[field] or '') if field in TEXT_FIELDS else old[field])
+
+
+def _has_changes(old, movie):
+    """هل تختلف قيمة حقل واحد على الأقل؟ (النص الفارغ و NULL متساويان كما يكتبهما الاستيراد)"""
+    for field in UPSERT_FIELDS:
+        current = old[field]
+        if field in TEXT_FIELDS:
+            current = current or ''
+        if getattr(movie, field) != current:
+            return True
+    return False
+
+
+def _upsert_movies(movies, batch_size, linker):
+    """
+    إدراج الأفلام الجديدة وتحديث الموجودة (title, year) بعملية bulk واحدة
+    (INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE)، مع تصنيف دقيق:
+    جديد، أو محدَّث (تغيرت قيمة واحدة على الأقل)، أو دون تغيير (لا يُكتب أصلاً).
+    تُحدَّث الحقول الموجودة في الملف فقط: العمود الغائب أو الخلية الفارغة
+    لا تمس القيمة الحالية.
+    """
+    # عند تكرار الفيلم في الجزء نفسه تُعتمد آخر قيمة
+    latest = {}
+    for movie in movies:
+        latest[_match_key(movie.title, movie.year)] = movie
+    duplicates = len(movies) - len(latest)
+
+    existing = _fetch_existing(list(latest.values()))
+    to_write = []
+    changes = []
+    unchanged = duplicates
+    for key, movie in latest.items():
+        old = existing.get(key)
+        if old is None:
+            to_write.append(movie)
+            continue
+        _keep_missing(old, movie)
+        if _has_changes(old, movie):
+            to_write.append(movie)
+            changes.append((old, movie))
+        else:
+            unchanged += 1
+
+    if not to_write:
+        return {'created': 0, 'updated': 0, 'unchanged': unchanged}
+
+    upsert_options = {'update_conflicts': True}
+    # MySQL لا يقبل تحديد الأعمدة الفريدة (يستخدم ON DUPLICATE KEY UPDATE)
+    if connection.features.supports_update_conflicts_with_target:
+        upsert_options['unique_fields'] = ['title', 'year']
+
+    # عملية bulk لكل مجموعة حقول فارغة (غالباً واحدة: أعمدة الملف نفسها لكل الصفوف)
+    groups = {}
+    for movie in to_write:
+        groups.setdefault(getattr(movie, 'missing_fields', frozenset()), []).append(movie)
+
+    with track_new_movies() as tracked:
+        for missing, group in groups.items():
+            update_fields = [field for field in UPSERT_FIELDS if field not in missing] + ['updated_at']
+            Movie.objects.bulk_create(group, batch_size=batch_size, update_fields=update_fields, **upsert_options)
+    apply_movie_updates(changes)
+
+    _link_new_movies(linker, tracked['last_pk'])
+    # الأفلام التي تغير نوعها أو مخرجها تُستبدل روابطها
+    relinked = [
+        (old['pk'], movie.genre, movie.director) for old, movie in changes
+        if (old['genre'] or '') != movie.genre or (old['director'] or '') != movie.director
+    ]
+    linker.link(relinked, replace=[movie_id for movie_id, _, _ in relinked])
+
+    return {'created': tracked['created'], 'updated': len(changes), 'unchanged': unchanged}
+
+
+def _write_chunk(write_movies, movies, batch_size, commit_every, linker):
+    """
+    حفظ أفلام الجزء على مجموعات من commit_every دفعة، كل مجموعة في معاملة
+    (أو مجموعة واحدة ضمن معاملة الجزء إذا لم يُحدد commit_every).
+    """
+    batch_size = resolve_batch_size(movies, batch_size)
+    group_size = batch_size * commit_every if commit_every else len(movies)
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+
+    for start in range(0, len(movies), group_size):
+        # بدون commit_every تكفي معاملة الجزء المحيطة دون نقطة حفظ إضافية
+        with transaction.atomic(savepoint=bool(commit_every)):
+            group_counts = write_movies(movies[start:start + group_size], batch_size, linker)
+            if group_counts['created'] or group_counts['updated']:
+                # إبطال الصفحات والإحصائيات المخزنة مؤقتاً (يظهر للعمليات الأخرى مع التثبيت)
+                bump_dataset_version()
+        for key, value in group_counts.items():
+            counts[key] += value
+    return counts
+
+
+def _import_converted(converted, batch_size, on_chunk, mode, commit_every, error_report):
+    result = {
+        'chunks': 0, 'rows': 0, 'valid': 0,
+        'created': 0, 'updated': 0, 'unchanged': 0,
+        'error_rows': [], 'error_count': 0,
+    }
+    error_rows_in_memory = get_error_rows_in_memory()
+    write_movies = _upsert_movies if mode == IMPORT_MODE_UPSERT else _insert_movies
+    # ذاكرة أسماء الأنواع والمخرجين مشتركة بين كل أجزاء الاستيراد
+    linker = DimensionLinker()
+
+    for row_count, movies_to_create, error_rows in converted:
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+
+        # مع commit_every تُثبَّت المجموعات على حدة بدلاً من معاملة الجزء
+        with nullcontext() if commit_every else transaction.atomic():
+            if movies_to_create:
+                with stage('write', len(movies_to_create)):
+                    counts = _write_chunk(write_movies, movies_to_create, batch_size, commit_every, linker)
+
+            result['chunks'] += 1
+            result['rows'] += row_count
+            result['valid'] += len(movies_to_create)
+            for key, value in counts.items():
+                result[key] += value
+            # كل الصفوف المرفوضة إلى التقرير على القرص، وأولها فقط في الذاكرة
+            result['error_count'] += len(error_rows)
+            result['error_rows'].extend(error_rows[:max(error_rows_in_memory - len(result['error_rows']), 0)])
+            if error_report is not None:
+                error_report.write(error_rows)
+
+            if on_chunk:
+                on_chunk(result['chunks'], {
+                    'rows': row_count,
+                    **counts,
+                    'error_rows': error_rows,
+                })
+
+    if not result['rows']:
+        raise ValueError('لا توجد بيانات في الملف')
+    if not result['valid']:
+        raise ValueError('لا توجد بيانات صالحة للحفظ')
+
+    if result['created'] or result['updated']:
+        # تجميعات لوحة التحليلات تُحدَّث مرة واحدة بعد الاستيراد كاملاً
+        refresh_rollups_on_commit()
+
+    return result
+
+
+def import_summary(result):
+    """رسالة نتيجة الاستيراد للمستخدم: المحفوظ والمحدَّث ودون تغيير والمرفوض"""
+    message = f'تم حفظ {result["created"]} أفلام بنجاح'
+    if result['updated']:
+        message += f'، وتحديث {result["updated"]} فيلماً'
+    if result['unchanged']:
+        message += f'، و{result["unchanged"]} دون تغيير'
+    error_count = result.get('error_count', len(result['error_rows']))
+    if error_count:
+        message += f' (تم تجاهل {error_count} صفاً)'
+    return message
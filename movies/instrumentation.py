@@ -0,0 +1,217 @@
+"""
+قياس مراحل الاستيراد وحفظها في ImportRun.
+
+record_import() تفعّل القياس لعملية استيراد واحدة (في متغير سياق) وتحفظ
+نتيجتها عند الانتهاء، نجحت أو فشلت. مراحل المحرك تُسجِّل نفسها بـ stage()
+و timed_chunks()، ولا تفعل شيئاً خارج record_import:
+
+- save: نسخ الملفات المرفوعة إلى مجلد مؤقت (الاستيراد المتوازي)
+- read: قراءة أجزاء الملف (pandas/pyarrow/openpyxl)
+- convert: التحقق والتحويل إلى كائنات Movie (في الاستيراد المتوازي: انتظار
+  نتائج العمليات، أي القراءة والتحويل معاً)
+- write: الحفظ بـ bulk_create/bulk_update مع ربط الأنواع والمخرجين والإحصائيات
+
+لكل مرحلة: الزمن الفعلي، عدد الصفوف ومعدلها في الثانية، عدد الاستعلامات،
+وذروة ذاكرة العملية (ru_maxrss) عند نهايتها.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .models import ImportRun
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('save', 'read', 'convert', 'write')
+
+# عدد الصفوف المرفوضة المحفوظة في تقرير كل عملية استيراد
+DEFAULT_ERROR_REPORT_ROWS = 200
+
+_current_profile = ContextVar('movies_import_profile', default=None)
+
+
+def get_error_report_rows():
+    return getattr(settings, 'MOVIES_ERROR_REPORT_ROWS', DEFAULT_ERROR_REPORT_ROWS)
+
+
+def error_report(error_rows, limit=None, total=None):
+    """
+    تقرير محدود بالصفوف المرفوضة (بدلاً من كتابة القائمة كاملة في السجل).
+    total: العدد الكلي إذا كانت error_rows أول الصفوف فقط.
+    """
+    limit = get_error_report_rows() if limit is None else limit
+    error_rows = list(error_rows)
+    total = len(error_rows) if total is None else total
+    return {
+        'total': total,
+        'truncated': total > min(limit, len(error_rows)),
+        'rows': [{'row': row, 'message': message} for row, message in error_rows[:limit]],
+    }
+
+
+def peak_memory_kb():
+    """ذروة ذاكرة العملية الحالية (KB)، أو None إذا تعذر قياسها"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ImportProfile:
+    """مجاميع قياسات المراحل لعملية استيراد واحدة"""
+
+    def __init__(self):
+        self.stages = {}
+        self.queries = 0
+        self.result = None
+
+    def count_query(self, execute, sql, params, many, context):
+        """(execute_wrapper) عدّ كل استعلام ينفذه الاستيراد"""
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def add(self, name, seconds, rows=0, queries=0):
+        metrics = self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0, 'queries': 0, 'peak_memory_kb': None})
+        metrics['seconds'] += seconds
+        metrics['rows'] += rows
+        metrics['queries'] += queries
+        metrics['peak_memory_kb'] = peak_memory_kb()
+
+    def as_stages(self):
+        """قياسات المراحل بترتيب STAGES مع معدل الصفوف في الثانية"""
+        stages = {}
+        for name in sorted(self.stages, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+            metrics = dict(self.stages[name])
+            metrics['seconds'] = round(metrics['seconds'], 6)
+            metrics['rows_per_second'] = round(metrics['rows'] / metrics['seconds'], 1) if metrics['seconds'] else None
+            stages[name] = metrics
+        return stages
+
+
+@contextmanager
+def stage(name, rows=0):
+    """قياس كتلة كمرحلة name من الاستيراد الحالي (لا شيء خارج record_import)"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    queries = profile.queries
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start, rows, profile.queries - queries)
+
+
+def timed_chunks(name, chunks, rows=len):
+    """تمرير الأجزاء كما هي مع قياس زمن إنتاج كل جزء كمرحلة name (rows(chunk) عدد صفوفه)"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield from chunks
+        return
+    chunks = iter(chunks)
+    while True:
+        queries = profile.queries
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        seconds = time.perf_counter() - start
+        profile.add(name, seconds, 0 if chunk is None else rows(chunk), profile.queries - queries)
+        if chunk is None:
+            return
+        yield chunk
+
+
+@contextmanager
+def record_import(source, origin, file_size=None):
+    """
+    قياس عملية استيراد وحفظها في ImportRun. يُسند الكود المستدعي نتيجة
+    الاستيراد إلى profile.result لتُحفظ أعدادها. يجب أن تكون خارج معاملة
+    الاستيراد ليُحفظ القياس حتى إذا فشل الاستيراد وتم التراجع عنه.
+    """
+    profile = ImportProfile()
+    token = _current_profile.set(profile)
+    started_at = timezone.now()
+    start = time.perf_counter()
+    status = ImportRun.STATUS_FAILED
+    try:
+        with connection.execute_wrapper(profile.count_query):
+            yield profile
+        status = ImportRun.STATUS_DONE
+    finally:
+        _current_profile.reset(token)
+        _save_run(profile, source, origin, file_size, status, started_at, time.perf_counter() - start)
+
+
+def _save_run(profile, source, origin, file_size, status, started_at, seconds):
+    result = profile.result or {}
+    error_rows = result.get('error_rows', ())
+    error_count = result.get('error_count', len(error_rows))
+    try:
+        ImportRun.objects.create(
+            source=str(source)[:255],
+            origin=origin,
+            status=status,
+            file_size=file_size,
+            rows=result.get('rows', 0),
+            created_count=result.get('created', 0),
+            updated_count=result.get('updated', 0),
+            error_count=error_count,
+            total_seconds=round(seconds, 6),
+            query_count=profile.queries,
+            peak_memory_kb=peak_memory_kb(),
+            stages=profile.as_stages(),
+            error_report=error_report(error_rows, total=error_count),
+            started_at=started_at,
+        )
+    except DatabaseError as e:
+        # القياس لا يجب أن يُفشل الاستيراد نفسه
+        logger.warning(f"Could not save import run metrics for {source}: {e}")
+
+
+def _percentiles(values):
+    """(p50, p95) لقائمة قيم غير فارغة"""
+    import numpy as np
+
+    p50, p95 = np.percentile(values, [50, 95])
+    return float(p50), float(p95)
+
+
+def summarize_runs(runs):
+    """
+    ملخص المراحل عبر عمليات استيراد: لكل مرحلة (ثم total للزمن الكلي) عدد
+    العمليات و p50/p95 للزمن ومعدل الصفوف والاستعلامات، وأعلى ذروة ذاكرة.
+    """
+    samples = {}
+    for run in runs:
+        stages = dict(run.stages)
+        stages['total'] = {
+            'seconds': run.total_seconds,
+            'rows_per_second': run.rows / run.total_seconds if run.total_seconds else None,
+            'queries': run.query_count,
+            'peak_memory_kb': run.peak_memory_kb,
+        }
+        for name, metrics in stages.items():
+            samples.setdefault(name, []).append(metrics)
+
+    summary = {}
+    for name in sorted(samples, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+        metrics = samples[name]
+        rates = [m['rows_per_second'] for m in metrics if m.get('rows_per_second')]
+        peaks = [m['peak_memory_kb'] for m in metrics if m.get('peak_memory_kb')]
+        summary[name] = {
+            'runs': len(metrics),
+            'seconds': _percentiles([m['seconds'] for m in metrics]),
+            'rows_per_second': _percentiles(rates) if rates else (None, None),
+            'queries': _percentiles([m['queries'] for m in metrics]),
+            'peak_memory_kb': max(peaks) if peaks else None,
+        }
+    return summary
@@ -0,0 +1,223 @@
+"""
+طابور مهام الاستيراد الخلفية المبني على قاعدة البيانات فقط (دون خدمات خارجية).
+"""
+import logging
+import os
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .error_reports import ErrorReportWriter
+from .importer import IMPORT_MODE_INSERT, import_file, import_summary
+from .instrumentation import record_import
+from .models import ImportJob, ImportRun
+from .parallel import conversion_pool, import_sources
+
+logger = logging.getLogger(__name__)
+
+# ثواني بلا تقدم قبل اعتبار المهمة متوقفة، وعدد المحاولات قبل اعتبارها فاشلة
+DEFAULT_JOB_TIMEOUT = 30 * 60
+DEFAULT_JOB_MAX_ATTEMPTS = 3
+
+STALE_JOB_MESSAGE = 'توقف عامل الاستيراد أثناء تنفيذ المهمة عدة مرات'
+
+
+def get_job_timeout():
+    return getattr(settings, 'MOVIES_IMPORT_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)
+
+
+def get_job_max_attempts():
+    return getattr(settings, 'MOVIES_IMPORT_JOB_MAX_ATTEMPTS', DEFAULT_JOB_MAX_ATTEMPTS)
+
+
+def should_run_in_background(file, requested=False):
+    """
+    تحديد ما إذا كان يجب تحويل الملف إلى مهمة خلفية:
+    بطلب المستخدم، أو إذا تجاوز حجمه MOVIES_BACKGROUND_IMPORT_THRESHOLD.
+    """
+    if requested:
+        return True
+    threshold = getattr(settings, 'MOVIES_BACKGROUND_IMPORT_THRESHOLD', None)
+    return bool(threshold) and file.size > threshold
+
+
+def enqueue_import(file, mode=IMPORT_MODE_INSERT, batch_size=None, all_sheets=False):
+    """حفظ الملف المرفوع وإنشاء مهمة استيراد بانتظار العامل"""
+    job = ImportJob(original_name=file.name[:255], mode=mode, batch_size=batch_size, all_sheets=all_sheets)
+    job.file.save(os.path.basename(file.name), file, save=False)
+    job.save()
+    logger.info(f"Queued import job {job.pk} for {job.original_name}")
+    return job
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    استعادة المهام العالقة في حالة التنفيذ بعد انهيار عاملها: المهمة التي لم
+    يُحدَّث نشاطها (heartbeat_at) منذ timeout ثانية تعود إلى الانتظار بعدادات
+    صفرية، أو تُعلَّم فاشلة ويُحذف ملفها إذا استنفدت MOVIES_IMPORT_JOB_MAX_ATTEMPTS محاولات.
+    إعادة التنفيذ آمنة لأن الأجزاء المحفوظة سابقاً تُعدّ مكررة أو دون تغيير.
+    يعيد (عدد المهام المعادة، عدد المهام الفاشلة).
+    """
+    timeout = get_job_timeout() if timeout is None else timeout
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=timeout)
+    stale = ImportJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=ImportJob.STATUS_RUNNING
+    )
+    max_attempts = get_job_max_attempts()
+
+    with transaction.atomic():
+        abandoned = list(stale.filter(attempts__gte=max_attempts).select_for_update().only('pk', 'file'))
+        failed = ImportJob.objects.filter(pk__in=[job.pk for job in abandoned]).update(
+            status=ImportJob.STATUS_FAILED,
+            message=STALE_JOB_MESSAGE,
+            file='',
+            finished_at=now
+        )
+    for job in abandoned:
+        delete_job_file(job)
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=ImportJob.STATUS_QUEUED,
+        progress=0, chunks_processed=0, rows_processed=0, created_count=0,
+        updated_count=0, unchanged_count=0, error_count=0,
+        started_at=None, heartbeat_at=None
+    )
+    if requeued or failed:
+        logger.warning(f"Stale import jobs: {requeued} requeued, {failed} failed")
+    return requeued, failed
+
+
+def delete_job_file(job):
+    """حذف ملف المهمة المرفوع بعد انتهائها (نجاحاً أو فشلاً)؛ خطأ التخزين لا يُفشل المهمة"""
+    if not job.file:
+        return
+    try:
+        job.file.delete(save=False)
+    except OSError as e:
+        logger.warning(f"Could not delete the file of import job {job.pk}: {e}")
+
+
+def claim_next_job():
+    """
+    حجز أقدم مهمة في الانتظار ونقلها إلى حالة التنفيذ، بعد استعادة المهام
+    العالقة (requeue_stale_jobs). التحديث المشروط على الحالة يمنع عاملين من
+    حجز المهمة نفسها، ويُستخدم SKIP LOCKED حيث تدعمه قاعدة البيانات (MySQL 8+).
+    """
+    requeue_stale_jobs()
+
+    with transaction.atomic():
+        queued = ImportJob.objects.filter(status=ImportJob.STATUS_QUEUED).order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        job = queued.first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_QUEUED).update(
+            status=ImportJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+        if not claimed:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+
+def run_import_job(job):
+    """
+    تنفيذ مهمة استيراد: كل جزء يُحفظ في معاملة مستقلة مع تحديث تقدم المهمة،
+    بحيث تستطيع صفحة النتائج متابعة التقدم أثناء التنفيذ.
+    """
+    ext = os.path.splitext(job.original_name)[1].lower()
+    file_size = job.file.size or 1
+    # أرشيف أو كل أوراق المصنف: تحويل متوازٍ في عمليات العامل مع الحفظ في هذه العملية
+    multi_source = ext == '.zip' or job.all_sheets
+
+    error_report = ErrorReportWriter(job.original_name)
+    try:
+        with conversion_pool() if multi_source else nullcontext() as pool, error_report, \
+                record_import(job.original_name, ImportRun.ORIGIN_JOB, job.file.size) as run, \
+                job.file.open('rb') as handle:
+            def report_chunk(chunk_number, chunk_result):
+                """تحديث تقدم المهمة مع نفس معاملة الجزء"""
+                job.chunks_processed = chunk_number
+                job.rows_processed += chunk_result['rows']
+                job.created_count += chunk_result['created']
+                job.updated_count += chunk_result['updated']
+                job.unchanged_count += chunk_result['unchanged']
+                job.error_count += len(chunk_result['error_rows'])
+                # موضع القراءة في الملف تقدير تقريبي لنسبة التقدم في ملفات CSV
+                job.progress = min(99, int(handle.tell() * 100 / file_size)) if ext == '.csv' else 99
+                job.heartbeat_at = timezone.now()
+                job.save(update_fields=[
+                    'chunks_processed', 'rows_processed', 'created_count', 'updated_count',
+                    'unchanged_count', 'error_count', 'progress', 'heartbeat_at'
+                ])
+                if chunk_result['error_rows']:
+                    # العدد فقط؛ تفاصيل الصفوف في تقرير CSV للمهمة (error_report_id)
+                    logger.warning(
+                        f"Import job {job.pk}: {len(chunk_result['error_rows'])} rows with errors "
+                        f"in chunk {chunk_number}"
+                    )
+
+            options = {
+                'batch_size': job.batch_size, 'on_chunk': report_chunk, 'mode': job.mode,
+                'error_report': error_report,
+            }
+            if multi_source:
+                result = import_sources([(job.original_name, handle)], all_sheets=job.all_sheets, pool=pool, **options)
+            else:
+                result = import_file(handle, ext, **options)
+            run.result = result
+
+        job.status = ImportJob.STATUS_DONE
+        job.progress = 100
+        job.message = import_summary(result)
+
+    except ValueError as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.message = str(e)
+        logger.error(f"Import job {job.pk} validation error: {str(e)}")
+    except Exception as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.message = 'حدث خطأ غير متوقع أثناء معالجة الملف'
+        logger.error(f"Import job {job.pk} failed: {str(e)}\n{traceback.format_exc()}")
+
+    # المهمة الفاشلة لا يُعاد تنفيذها، فلا يبقى ملفها في MEDIA_ROOT/import_jobs
+    delete_job_file(job)
+    if error_report.available:
+        job.error_report_id = error_report.report_id
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'message', 'file', 'error_report_id', 'finished_at'])
+    return job
+
+
+def job_status(job):
+    """تمثيل حالة المهمة كقاموس لواجهة المتابعة"""
+    return {
+        'id': job.pk,
+        'file': job.original_name,
+        'status': job.status,
+        'status_display': str(job.get_status_display()),
+        'progress': job.progress,
+        'chunks_processed': job.chunks_processed,
+        'rows_processed': job.rows_processed,
+        'created_count': job.created_count,
+        'updated_count': job.updated_count,
+        'unchanged_count': job.unchanged_count,
+        'error_count': job.error_count,
+        'error_report_url': reverse('import_error_report', args=[job.error_report_id]) if job.error_report_id else '',
+        'message': job.message,
+        'finished': job.is_finished,
+    }
@@ -0,0 +1,160 @@
+"""
+أدوات سجل غير حاجبة تُستخدم من settings.LOGGING.
+
+- BackgroundRotatingFileHandler: معالج يضع السجلات في طابور محدود ويكتبها
+  خيط خلفي إلى ملف يُدوَّر بالحجم (RotatingFileHandler)، فلا ينتظر خيط الطلب
+  القرص. إذا امتلأ الطابور تُسقط السجلات وتُعدّ بدلاً من حجب الطلب، ثم يُكتب
+  عددها في الملف كتحذير. يعمل لكل عملية على حدة: العملية الابنة بعد fork
+  (gunicorn --preload، الاستيراد المتوازي) تنشئ طابورها وخيطها عند أول سجل.
+- RateLimitFilter: يحد عدد التحذيرات المتشابهة (نفس المسجل ونص الرسالة قبل
+  التنسيق، بعد استبدال الأرقام لأن رسائل المشروع مكتوبة بـ f-string) في كل
+  فترة زمنية، ثم يمرر عينة منها فقط مع عدد ما أُسقط.
+- SuppressedCountFormatter: منسق يضيف عدد السجلات المُسقطة إلى نص السجل.
+"""
+import atexit
+import logging
+import multiprocessing.util
+import os
+import queue
+import re
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class BackgroundRotatingFileHandler(QueueHandler):
+    """
+    QueueHandler يملك RotatingFileHandler وخيط QueueListener يكتب إليه.
+    التنسيق (formatter) يتم في خيط المستدعي عند وضع السجل في الطابور.
+
+    الطابور والخيط والملف خاصة بكل عملية: fork لا ينسخ الخيط، فالعملية
+    الابنة تبدأ خيطها عند أول سجل. عدة عمليات تدوّر الملف نفسه تتسابق على
+    إعادة تسميته، لذا يُستبدل "{pid}" في filename برقم العملية لملف لكل عامل
+    (أو يُترك التدوير لأداة خارجية مثل logrotate مع max_bytes=0).
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000, encoding='utf-8'):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.filename = filename
+        self.target_options = {'maxBytes': max_bytes, 'backupCount': backup_count, 'encoding': encoding}
+        self.target = None
+        self.closed = False
+        self.dropped = self.reported = 0
+        self._start()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start(self):
+        if self.target is not None:
+            # نسخة الملف الموروثة من العملية الأم
+            self.target.close()
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.target = RotatingFileHandler(self.filename.replace('{pid}', str(os.getpid())), **self.target_options)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _after_fork(self):
+        # خيط الكتابة لا يُنسخ مع fork؛ يُنشأ من جديد عند أول سجل في العملية الابنة
+        self.listener = None
+        self.dropped = self.reported = 0
+        if not self.closed:
+            # multiprocessing ينهي عماله بـ os._exit دون atexit؛ Finalize يفرغ الطابور قبلها
+            multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def enqueue(self, record):
+        if self.listener is None:
+            if self.closed:
+                self.target.handle(record)
+                return
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self.reported:
+            try:
+                self.queue.put_nowait(self._dropped_record())
+                self.reported = self.dropped
+            except queue.Full:
+                pass
+
+    def _dropped_record(self):
+        count = self.dropped - self.reported
+        return self.prepare(logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f'{count} log records dropped: logging queue full (total {self.dropped})', None, None,
+        ))
+
+    def close(self):
+        """إيقاف خيط الكتابة بعد تفريغ الطابور وكتابة عدد السجلات المُسقطة التي لم تُذكر بعد"""
+        self.closed = True
+        listener, self.listener = self.listener, None
+        if listener is not None and listener._thread is not None:
+            listener.stop()
+        if self.dropped > self.reported:
+            self.target.handle(self._dropped_record())
+            self.reported = self.dropped
+        self.target.close()
+        super().close()
+
+
+_DIGITS = re.compile(r'\d+')
+
+
+def _level(level):
+    return logging.getLevelName(level) if isinstance(level, str) else level
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    يمرر أول rate سجل متشابه في كل per ثانية، ثم سجلاً واحداً من كل
+    sample_every بعدها حتى نهاية الفترة. الحد يطبق فقط على المستويات من
+    min_level إلى max_level (التحذيرات افتراضياً)؛ INFO و DEBUG و ERROR تمر
+    دائماً. أول سجل يمر بعد إسقاط غيره يحمل عددها في record.suppressed
+    (دون تعديل نص الرسالة المشترك بين المعالجات) ويعرضه SuppressedCountFormatter.
+    """
+
+    def __init__(self, rate=10, per=60, sample_every=100, min_level='WARNING', max_level='WARNING'):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.sample_every = sample_every
+        self.min_level = _level(min_level)
+        self.max_level = _level(max_level)
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def filter(self, record):
+        if not self.min_level <= record.levelno <= self.max_level:
+            return True
+        key = (record.name, record.levelno, _DIGITS.sub('#', str(record.msg)))
+        now = time.monotonic()
+        with self.lock:
+            started, seen, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - started >= self.per:
+                started, seen = now, 0
+            seen += 1
+            allowed = seen <= self.rate or (seen - self.rate) % self.sample_every == 0
+            if not allowed:
+                self.windows[key] = (started, seen, suppressed + 1)
+                return False
+            self.windows[key] = (started, seen, 0)
+            # حذف فترات المفاتيح المنتهية كي لا يكبر القاموس مع الرسائل المتغيرة
+            if len(self.windows) > 10000:
+                self.windows = {k: v for k, v in self.windows.items() if now - v[0] < self.per}
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    """منسق يضيف "[+N similar messages suppressed]" للسجلات التي مررها RateLimitFilter بعد إسقاط غيرها"""
+
+    def format(self, record):
+        message = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            message = f'{message} [+{suppressed} similar messages suppressed]'
+        return message
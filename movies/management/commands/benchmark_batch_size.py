@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from movies.benchmarks import benchmark_batch_sizes
+
+
+class Command(BaseCommand):
+    help = (
+        'قياس سرعة حفظ الأفلام حسب حجم دفعة bulk_create وتكرار التثبيت '
+        '(يكتب في قاعدة البيانات الحالية ثم يحذف أفلام القياس)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='عدد الصفوف الاصطناعية')
+        parser.add_argument('--batch-sizes', nargs='+', default=['50', '500', '2000', 'auto'],
+                            help="أحجام الدفعات المراد قياسها (أرقام أو auto)")
+        parser.add_argument('--commit-every', type=int, nargs='+', default=[0],
+                            help='عدد الدفعات في كل معاملة (0 = معاملة لكل جزء)')
+
+    def handle(self, *args, **options):
+        batch_sizes = [value if value == 'auto' else int(value) for value in options['batch_sizes']]
+        results = benchmark_batch_sizes(options['rows'], batch_sizes, options['commit_every'])
+
+        for row in results:
+            commit_every = row['commit_every'] or '-'
+            self.stdout.write(
+                f"batch_size {str(row['batch_size']):>6} (={row['effective_batch_size']:>5}) | "
+                f"commit_every {str(commit_every):>4} | {row['seconds']:8.3f}s | "
+                f"{row['rows_per_second']:>10,.0f} rows/s"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ انتهى القياس'))
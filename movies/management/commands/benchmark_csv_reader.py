@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from movies.benchmarks import benchmark_csv_engines
+
+
+class Command(BaseCommand):
+    help = 'قياس سرعة قراءة ملفات CSV (MB/s) لكل محرك قراءة متاح'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000],
+                            help='أحجام الملفات الاصطناعية بعدد الصفوف')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='عدد الصفوف في كل جزء')
+        parser.add_argument('--repeat', type=int, default=3, help='عدد مرات التكرار لكل قياس')
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            for row in benchmark_csv_engines(rows, options['chunk_size'], options['repeat']):
+                self.stdout.write(
+                    f"{rows:>9} rows ({row['megabytes']:6.1f}MB) | {row['engine']:>8}: "
+                    f"{row['seconds']:8.3f}s | {row['mb_per_second']:7.1f} MB/s"
+                )
+        self.stdout.write(self.style.SUCCESS('✅ انتهى القياس'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from movies.benchmarks import compare_conversions, legacy_iterrows_conversion, make_movie_frame, time_call
+from movies.importer import convert_dataframe
+
+
+class Command(BaseCommand):
+    help = 'قياس أداء تحويل صفوف الملف إلى كائنات Movie (iterrows مقابل التحويل العمودي)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='أحجام البيانات الاصطناعية المراد قياسها')
+        parser.add_argument('--repeat', type=int, default=3, help='عدد مرات التكرار لكل قياس')
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            df = make_movie_frame(rows)
+
+            if not compare_conversions(df):
+                self.stdout.write(self.style.ERROR(f'❌ نتائج مختلفة بين المسارين عند {rows} صف'))
+                continue
+
+            legacy = time_call(legacy_iterrows_conversion, df, repeat=options['repeat'])
+            vectorized = time_call(convert_dataframe, df, repeat=options['repeat'])
+
+            self.stdout.write(
+                f'{rows:>9} rows | iterrows: {legacy:8.3f}s ({rows / legacy:>10,.0f} rows/s) | '
+                f'vectorized: {vectorized:8.3f}s ({rows / vectorized:>10,.0f} rows/s) | '
+                f'x{legacy / vectorized:.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS('✅ انتهى القياس'))
@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from movies.benchmarks import BENCHMARK_CASES, BENCHMARK_FORMATS, compare_to_baseline, run_benchmark_suite
+
+
+class Command(BaseCommand):
+    help = (
+        'قياس المسارات الساخنة (القراءة، التحويل، الحفظ، الرفع، صفحة النتائج) على كتالوج اصطناعي '
+        'وحفظ النتائج كخط أساس JSON أو مقارنتها بخط أساس سابق '
+        '(يكتب في قاعدة البيانات الحالية ثم يحذف أفلام القياس)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                            help='أحجام الكتالوج بعدد الصفوف (حتى 1000000)')
+        parser.add_argument('--formats', nargs='+', choices=BENCHMARK_FORMATS, default=list(BENCHMARK_FORMATS))
+        parser.add_argument('--cases', nargs='+', choices=BENCHMARK_CASES, default=list(BENCHMARK_CASES))
+        parser.add_argument('--repeat', type=int, default=3, help='عدد مرات التكرار لكل قياس (يُعتمد أفضلها)')
+        parser.add_argument('--seed', type=int, default=42, help='بذرة توليد البيانات')
+        parser.add_argument('--output', help='حفظ النتائج في ملف JSON (خط أساس)')
+        parser.add_argument('--compare', help='مقارنة النتائج بخط أساس JSON سابق')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='نسبة التباطؤ المسموحة قبل اعتبار الحالة تراجعاً (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'تعذر قراءة خط الأساس: {e}')
+            if baseline['environment']['database'] != connection.vendor:
+                raise CommandError('خط الأساس مسجل على قاعدة بيانات مختلفة')
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING(f'⚠️ القياس على {connection.vendor} وليس SQLite'))
+
+        def report(result):
+            if 'skipped' in result:
+                self.stdout.write(f"{result['case']:<13}{result['format']:<6}{result['rows']:>9} rows | {result['skipped']}")
+                return
+            self.stdout.write(
+                f"{result['case']:<13}{result['format']:<6}{result['rows']:>9} rows | "
+                f"{result['seconds']:9.3f}s | {result['rows_per_second']:>12,.0f} rows/s"
+            )
+
+        current = run_benchmark_suite(
+            sizes=options['sizes'],
+            formats=options['formats'],
+            repeat=options['repeat'],
+            cases=options['cases'],
+            seed=options['seed'],
+            on_result=report,
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(current, handle, ensure_ascii=False, indent=2)
+            self.stdout.write(f"💾 تم حفظ خط الأساس في {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_to_baseline(current, baseline, options['tolerance'])
+            for case, fmt, rows, before, after, ratio in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f'❌ {case} {fmt} {rows} rows: {before:.3f}s → {after:.3f}s (x{ratio:.2f})'
+                ))
+            if regressions:
+                raise CommandError(f'{len(regressions)} حالات أبطأ من خط الأساس')
+            self.stdout.write(self.style.SUCCESS('✅ لا تراجع عن خط الأساس'))
+            return
+        self.stdout.write(self.style.SUCCESS('✅ انتهى القياس'))
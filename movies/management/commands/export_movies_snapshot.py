@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.snapshots import DEFAULT_ROW_GROUP_SIZE, SNAPSHOT_FORMATS, export_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'تصدير كتالوج الأفلام إلى لقطة Parquet أو Feather لنقله بين البيئات؛ '
+        'تُحمَّل اللقطة بـ import_movies <path> (مع --mode upsert لتحديث كتالوج موجود)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسار ملف اللقطة (.parquet أو .feather)')
+        parser.add_argument('--format', choices=SNAPSHOT_FORMATS, default=None,
+                            help='صيغة اللقطة، الافتراضي حسب امتداد المسار')
+        parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                            help='عدد الصفوف في كل مجموعة صفوف')
+        parser.add_argument('--compression', default=None,
+                            help='خوارزمية الضغط (snappy/zstd لـ Parquet، lz4/zstd لـ Feather)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            exported = export_snapshot(
+                options['path'],
+                fmt=options['format'],
+                row_group_size=options['row_group_size'],
+                compression=options['compression'],
+            )
+        except ImportError:
+            raise CommandError('تصدير اللقطات يتطلب تثبيت مكتبة pyarrow')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'✅ تم تصدير {exported} فيلم إلى {options["path"]} في {elapsed:.2f} ث'))
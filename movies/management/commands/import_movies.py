@@ -0,0 +1,91 @@
+import os
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from movies.error_reports import ErrorReportWriter
+from movies.importer import (
+    IMPORT_MODES, IMPORT_MODE_INSERT, get_commit_every, import_file, import_summary
+)
+from movies.instrumentation import record_import
+from movies.models import ImportRun
+from movies.parallel import conversion_pool, import_sources
+
+
+class Command(BaseCommand):
+    help = 'استيراد ملفات أفلام (CSV أو Excel أو Parquet أو Feather أو zip) عبر محرك الاستيراد الموحد نفسه المستخدم في صفحة الرفع'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='مسار ملف أو أكثر')
+        parser.add_argument('--mode', choices=IMPORT_MODES, default=IMPORT_MODE_INSERT,
+                            help='insert يتجاهل الأفلام الموجودة، upsert يحدّث قيمها')
+        parser.add_argument('--batch-size', default=None,
+                            help="عدد الصفوف في كل INSERT (رقم أو auto)، الافتراضي MOVIES_IMPORT_BATCH_SIZE")
+        parser.add_argument('--commit-every', type=int, default=None,
+                            help='تثبيت المعاملة كل N دفعة، الافتراضي MOVIES_IMPORT_COMMIT_EVERY')
+        parser.add_argument('--all-sheets', action='store_true',
+                            help='استيراد كل أوراق ملفات xlsx بدلاً من الورقة الأولى فقط')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='عدد عمليات التحويل المتوازية، الافتراضي MOVIES_IMPORT_WORKERS أو عدد المعالجات')
+
+    def handle(self, *args, **options):
+        paths = options['paths']
+        for path in paths:
+            if not os.path.isfile(path):
+                raise CommandError(f'الملف غير موجود: {path}')
+
+        batch_size = options['batch_size']
+        if batch_size not in (None, 'auto'):
+            try:
+                batch_size = int(batch_size)
+            except ValueError:
+                raise CommandError('--batch-size يجب أن يكون رقماً أو auto')
+
+        commit_every = options['commit_every']
+        if commit_every is None:
+            commit_every = get_commit_every()
+
+        def report_chunk(chunk_number, chunk_result):
+            self.stdout.write(
+                f"⏳ الجزء {chunk_number}: {chunk_result['rows']} صفاً - {chunk_result['created']} محفوظ - "
+                f"{chunk_result['updated']} محدَّث - {len(chunk_result['error_rows'])} مرفوض"
+            )
+
+        error_report = ErrorReportWriter(', '.join(paths))
+        import_options = {
+            'batch_size': batch_size,
+            'on_chunk': report_chunk,
+            'mode': options['mode'],
+            'commit_every': commit_every or 0,
+            'error_report': error_report,
+        }
+        ext = os.path.splitext(paths[0])[1].lower()
+        multi_source = len(paths) > 1 or ext == '.zip' or options['all_sheets']
+        file_size = sum(os.path.getsize(path) for path in paths)
+        try:
+            # عمليات التحويل تُنشأ قبل فتح المعاملة
+            with conversion_pool(options['workers']) if multi_source else nullcontext() as pool, error_report, \
+                    record_import(', '.join(paths), ImportRun.ORIGIN_COMMAND, file_size) as run:
+                # كل الملفات أو لا شيء، إلا مع التثبيت كل N دفعة
+                with nullcontext() if commit_every else transaction.atomic():
+                    if multi_source:
+                        result = import_sources(
+                            [(path, path) for path in paths],
+                            all_sheets=options['all_sheets'],
+                            pool=pool,
+                            **import_options
+                        )
+                    else:
+                        result = import_file(paths[0], ext, **import_options)
+                run.result = result
+        except ValueError as e:
+            if error_report.available:
+                self.stderr.write(f'تقرير الصفوف المرفوضة: {error_report.path}')
+            raise CommandError(str(e))
+
+        for row_number, message in result['error_rows'][:20]:
+            self.stdout.write(self.style.WARNING(f'الصف {row_number}: {message}'))
+        if error_report.available:
+            self.stdout.write(f'📄 تقرير الصفوف المرفوضة ({error_report.count}): {error_report.path}')
+        self.stdout.write(self.style.SUCCESS(f'✅ {import_summary(result)}'))
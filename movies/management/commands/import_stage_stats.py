@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from movies.instrumentation import summarize_runs
+from movies.models import ImportRun
+
+
+def _number(value, digits=2):
+    return '-' if value is None else f'{value:.{digits}f}'
+
+
+class Command(BaseCommand):
+    help = 'ملخص زمن مراحل الاستيراد (p50/p95) ومعدل الصفوف والاستعلامات عبر آخر عمليات الاستيراد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--last', type=int, default=100, help='عدد آخر عمليات الاستيراد المشمولة')
+        parser.add_argument('--origin', choices=[choice for choice, _ in ImportRun._meta.get_field('origin').choices],
+                            help='عمليات نقطة بدء واحدة فقط')
+        parser.add_argument('--include-failed', action='store_true', help='تضمين العمليات الفاشلة')
+
+    def handle(self, *args, **options):
+        runs = ImportRun.objects.all()
+        if options['origin']:
+            runs = runs.filter(origin=options['origin'])
+        if not options['include_failed']:
+            runs = runs.filter(status=ImportRun.STATUS_DONE)
+        runs = list(runs.order_by('-started_at')[:options['last']])
+        if not runs:
+            self.stdout.write(self.style.WARNING('لا توجد عمليات استيراد مسجلة'))
+            return
+
+        self.stdout.write(f'آخر {len(runs)} عمليات استيراد:')
+        self.stdout.write(
+            f"{'stage':<10}{'runs':>6}{'p50 s':>10}{'p95 s':>10}{'p50 rows/s':>13}{'p95 rows/s':>13}"
+            f"{'p50 q':>8}{'p95 q':>8}{'peak MB':>10}"
+        )
+        for name, metrics in summarize_runs(runs).items():
+            peak = metrics['peak_memory_kb']
+            self.stdout.write(
+                f"{name:<10}{metrics['runs']:>6}"
+                f"{_number(metrics['seconds'][0], 3):>10}{_number(metrics['seconds'][1], 3):>10}"
+                f"{_number(metrics['rows_per_second'][0], 0):>13}{_number(metrics['rows_per_second'][1], 0):>13}"
+                f"{_number(metrics['queries'][0], 0):>8}{_number(metrics['queries'][1], 0):>8}"
+                f"{_number(peak / 1024 if peak else None, 1):>10}"
+            )
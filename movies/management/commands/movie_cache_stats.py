@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from movies.cache import get_counters, get_dataset_version, reset_counters
+
+
+class Command(BaseCommand):
+    help = 'عرض عدادات الإصابة والإخفاق للذاكرة المؤقتة لصفحة النتائج'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='تصفير العدادات بعد عرضها')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'إصدار البيانات الحالي: {get_dataset_version()}')
+        for name, counter in sorted(get_counters().items()):
+            self.stdout.write(
+                f"{name:<16} hits: {counter['hits']:>8} | misses: {counter['misses']:>8} | "
+                f"hit ratio: {counter['hit_ratio']:.1%} | ttl: {counter['timeout']}s"
+            )
+        if options['reset']:
+            reset_counters()
+            self.stdout.write(self.style.SUCCESS('✅ تم تصفير العدادات'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.dimensions import rebuild_dimensions
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء جداول الأنواع والمخرجين وروابطها من حقلي genre و director'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='عدد الأفلام في كل دفعة ربط')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            processed = rebuild_dimensions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ تمت إعادة بناء الأنواع والمخرجين: {processed} فيلم'))
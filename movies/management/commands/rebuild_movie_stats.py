@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movies.stats import rebuild_movie_stats
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء ملخص إحصائيات الأفلام (MovieStats) من جدول الأفلام كاملاً'
+
+    def handle(self, *args, **options):
+        stats = rebuild_movie_stats()
+        self.stdout.write(self.style.SUCCESS(f'✅ تمت إعادة بناء الإحصائيات: {stats.total_movies} فيلم'))
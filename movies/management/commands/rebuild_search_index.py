@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.search import ensure_search_index
+
+
+class Command(BaseCommand):
+    help = 'إنشاء فهرس النص الكامل لعناوين الأفلام (FULLTEXT في MySQL أو FTS5 في SQLite) وإعادة بنائه'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='قاعدة البيانات (alias)')
+
+    def handle(self, *args, **options):
+        if not ensure_search_index(options['database'], rebuild=True):
+            raise CommandError('فهرس النص الكامل غير مدعوم في قاعدة البيانات هذه؛ سيُستخدم البحث دون فهرس')
+        self.stdout.write(self.style.SUCCESS('✅ تم بناء فهرس البحث في العناوين'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movies.analytics import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب تجميعات لوحة التحليلات (AnalyticsRollup) من جدول الأفلام'
+
+    def handle(self, *args, **options):
+        rollups = refresh_rollups()
+        self.stdout.write(self.style.SUCCESS(f'✅ تمت إعادة حساب {len(rollups)} تجميعات'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from movies.jobs import claim_next_job, run_import_job
+
+
+class Command(BaseCommand):
+    help = 'تشغيل عامل الاستيراد الخلفي لمعالجة مهام رفع الملفات المنتظرة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='معالجة المهام المنتظرة حالياً ثم الخروج')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='الفترة بالثواني بين فحوصات الطابور عندما يكون فارغاً')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('✅ عامل الاستيراد يعمل'))
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'⏳ معالجة المهمة {job.pk}: {job.original_name}')
+            job = run_import_job(job)
+
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f'✅ المهمة {job.pk}: {job.message}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'❌ المهمة {job.pk}: {job.message}'))
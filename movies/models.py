@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 #zain
@@ -16,6 +17,9 @@ class Movie(models.Model):
             models.Index(fields=['rating']),
             models.Index(fields=['genre']),
             models.Index(fields=['director']),
+            # تصفية نطاق السنة مع التقييم في صفحة النتائج (movies.filters)؛ النوع والمخرج
+            # يُصفّيان عبر جداول Genre/Person المفهرسة
+            models.Index(fields=['year', 'rating']),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -143,6 +147,23 @@ class Movie(models.Model):
         help_text=_("تاريخ آخر تحديث للبيانات")
     )
 
+    # قيم genre و director المتعددة (مثل "Action,Adventure") مقسمة إلى جداول مفهرسة
+    genres = models.ManyToManyField(
+        'Genre',
+        through='MovieGenre',
+        related_name='movies',
+        blank=True,
+        verbose_name=_("الأنواع")
+    )
+
+    directors = models.ManyToManyField(
+        'Person',
+        through='MovieDirector',
+        related_name='directed_movies',
+        blank=True,
+        verbose_name=_("المخرجون")
+    )
+
     def __str__(self):
         return f"{self.title} ({self.year}) - {self.rating}/10"
 
@@ -167,8 +188,27 @@ class Movie(models.Model):
 
     def save(self, *args, **kwargs):
         """تجاوز طريقة الحفظ للتأكد من التنظيف"""
+        from .analytics import invalidate_rollups
+        from .cache import bump_dataset_version
+        from .dimensions import DimensionLinker
+        from .stats import add_movie, apply_movie_updates
+
         self.full_clean()  # تطبيق جميع عمليات التحقق
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # القيم السابقة لتعديل ملخص الإحصائيات بالفرق
+            old = None
+            if self.pk:
+                old = Movie.objects.filter(pk=self.pk).values('pk', 'rating', 'revenue', 'runtime').first()
+            super().save(*args, **kwargs)
+            # إعادة ربط الأنواع والمخرجين (الاستيراد يربطها بالجملة دون save)
+            DimensionLinker().link([(self.pk, self.genre, self.director)], replace=[self.pk])
+            if old is None:
+                add_movie(self)
+            else:
+                apply_movie_updates([(old, self)])
+            # إبطال الصفحات المخزنة واستجابات الواجهة البرمجية (ETag) والتجميعات مع المعاملة نفسها
+            bump_dataset_version()
+            invalidate_rollups()
 
     @property
     def rating_percentage(self):
@@ -179,3 +219,337 @@ class Movie(models.Model):
     def is_popular(self):
         """تحقق إذا كان الفيلم شعبيًا"""
         return self.votes > 10000 or self.rating >= 8.0
+
+
+class Genre(models.Model):
+    """نوع فيلم واحد (جزء من قيمة Movie.genre المتعددة)"""
+
+    class Meta:
+        verbose_name = _("نوع")
+        verbose_name_plural = _("أنواع")
+        ordering = ['name']
+
+    name = models.CharField(verbose_name=_("الاسم"), max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Person(models.Model):
+    """شخص (مخرج حالياً) مشترك بين الأفلام"""
+
+    class Meta:
+        verbose_name = _("شخص")
+        verbose_name_plural = _("أشخاص")
+        ordering = ['name']
+
+    name = models.CharField(verbose_name=_("الاسم"), max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MovieGenre(models.Model):
+    """
+    ربط فيلم بنوع. القيد الفريد يبدأ بالنوع فيخدم تجميع وتصفية الأفلام حسب
+    النوع، وفهرس movie (من المفتاح الأجنبي) يخدم جلب أنواع فيلم.
+    """
+
+    class Meta:
+        verbose_name = _("نوع الفيلم")
+        verbose_name_plural = _("أنواع الأفلام")
+        constraints = [
+            models.UniqueConstraint(fields=['genre', 'movie'], name='unique_movie_genre')
+        ]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='genre_links')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='movie_links', db_index=False)
+
+
+class MovieDirector(models.Model):
+    """ربط فيلم بمخرج (بنفس فهارس MovieGenre)"""
+
+    class Meta:
+        verbose_name = _("مخرج الفيلم")
+        verbose_name_plural = _("مخرجو الأفلام")
+        constraints = [
+            models.UniqueConstraint(fields=['person', 'movie'], name='unique_movie_director')
+        ]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='director_links')
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='movie_links', db_index=False)
+
+
+class ImportJob(models.Model):
+    """مهمة استيراد ملف تُنفَّذ في الخلفية بواسطة عامل الاستيراد (run_import_worker)"""
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, _("في الانتظار")),
+        (STATUS_RUNNING, _("قيد التنفيذ")),
+        (STATUS_DONE, _("مكتملة")),
+        (STATUS_FAILED, _("فشلت")),
+    ]
+
+    class Meta:
+        verbose_name = _("مهمة استيراد")
+        verbose_name_plural = _("مهام الاستيراد")
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    file = models.FileField(
+        verbose_name=_("الملف"),
+        upload_to='import_jobs/',
+        help_text=_("نسخة الملف المرفوع بانتظار المعالجة")
+    )
+
+    original_name = models.CharField(
+        verbose_name=_("اسم الملف الأصلي"),
+        max_length=255
+    )
+
+    status = models.CharField(
+        verbose_name=_("الحالة"),
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED
+    )
+
+    mode = models.CharField(
+        verbose_name=_("نمط الاستيراد"),
+        max_length=10,
+        choices=[('insert', _("إضافة الجديد فقط")), ('upsert', _("إضافة وتحديث الموجود"))],
+        default='insert'
+    )
+
+    all_sheets = models.BooleanField(
+        verbose_name=_("كل أوراق المصنف"),
+        default=False
+    )
+
+    batch_size = models.PositiveIntegerField(
+        verbose_name=_("حجم دفعة الحفظ"),
+        null=True,
+        blank=True,
+        help_text=_("فارغ = MOVIES_IMPORT_BATCH_SIZE")
+    )
+
+    progress = models.PositiveSmallIntegerField(
+        verbose_name=_("نسبة التقدم"),
+        default=0,
+        validators=[MaxValueValidator(100)]
+    )
+
+    chunks_processed = models.PositiveIntegerField(verbose_name=_("الأجزاء المعالجة"), default=0)
+    rows_processed = models.PositiveIntegerField(verbose_name=_("الصفوف المعالجة"), default=0)
+    created_count = models.PositiveIntegerField(verbose_name=_("الأفلام المحفوظة"), default=0)
+    updated_count = models.PositiveIntegerField(verbose_name=_("الأفلام المحدَّثة"), default=0)
+    unchanged_count = models.PositiveIntegerField(verbose_name=_("الأفلام دون تغيير"), default=0)
+    error_count = models.PositiveIntegerField(verbose_name=_("الصفوف المرفوضة"), default=0)
+
+    error_report_id = models.CharField(
+        verbose_name=_("تقرير الصفوف المرفوضة"),
+        max_length=32,
+        blank=True,
+        default="",
+        help_text=_("معرف ملف CSV بكل الصفوف المرفوضة (movies.error_reports)")
+    )
+
+    message = models.TextField(
+        verbose_name=_("رسالة النتيجة"),
+        blank=True,
+        default=""
+    )
+
+    created_at = models.DateTimeField(verbose_name=_("تاريخ الإنشاء"), auto_now_add=True)
+    started_at = models.DateTimeField(verbose_name=_("بداية التنفيذ"), null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        verbose_name=_("آخر نشاط للعامل"),
+        null=True,
+        blank=True,
+        help_text=_("يُحدَّث مع كل جزء؛ المهمة التي يتوقف نشاطها تُعاد إلى الانتظار")
+    )
+    attempts = models.PositiveSmallIntegerField(verbose_name=_("عدد محاولات التنفيذ"), default=0)
+    finished_at = models.DateTimeField(verbose_name=_("نهاية التنفيذ"), null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.original_name} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        """هل انتهت المهمة (بنجاح أو فشل)"""
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class MovieStats(models.Model):
+    """
+    ملخص إحصائي لجدول الأفلام في صف واحد (pk=1) يُحدَّث تدريجياً بعد كل
+    عملية استيراد، لتقرأ صفحة النتائج الإحصائيات دون مسح جدول الأفلام.
+    يمكن إعادة بنائه كاملاً بالأمر: python manage.py rebuild_movie_stats
+    """
+
+    SINGLETON_PK = 1
+
+    class Meta:
+        verbose_name = _("إحصائيات الأفلام")
+        verbose_name_plural = _("إحصائيات الأفلام")
+
+    total_movies = models.PositiveIntegerField(verbose_name=_("عدد الأفلام"), default=0)
+
+    # مجاميع لحساب المتوسطات (المتوسط = المجموع / عدد القيم غير الفارغة)
+    rating_sum = models.FloatField(verbose_name=_("مجموع التقييمات"), default=0.0)
+    revenue_sum = models.FloatField(verbose_name=_("مجموع الإيرادات"), default=0.0)
+    revenue_count = models.PositiveIntegerField(verbose_name=_("عدد قيم الإيرادات"), default=0)
+    runtime_sum = models.PositiveBigIntegerField(verbose_name=_("مجموع المدد"), default=0)
+    runtime_count = models.PositiveIntegerField(verbose_name=_("عدد قيم المدة"), default=0)
+
+    min_rating = models.FloatField(verbose_name=_("أقل تقييم"), null=True, blank=True)
+    max_rating = models.FloatField(verbose_name=_("أعلى تقييم"), null=True, blank=True)
+    max_revenue = models.FloatField(verbose_name=_("أعلى إيرادات"), null=True, blank=True)
+    max_metascore = models.PositiveIntegerField(verbose_name=_("أعلى نتيجة ميتا"), null=True, blank=True)
+    max_votes = models.PositiveIntegerField(verbose_name=_("أعلى عدد تقييمات"), null=True, blank=True)
+
+    # الأفلام صاحبة أعلى القيم (بطاقات صفحة النتائج)
+    highest_rating = models.ForeignKey(
+        Movie, verbose_name=_("الفيلم الأعلى تقييماً"), null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='+'
+    )
+    highest_revenue = models.ForeignKey(
+        Movie, verbose_name=_("الفيلم الأعلى إيرادات"), null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='+'
+    )
+    highest_metascore = models.ForeignKey(
+        Movie, verbose_name=_("الفيلم الأعلى نتيجة ميتا"), null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='+'
+    )
+    most_votes = models.ForeignKey(
+        Movie, verbose_name=_("الفيلم الأكثر تصويتاً"), null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='+'
+    )
+
+    # رقم إصدار البيانات ووقت آخر تغيير: مفتاح التخزين المؤقت و ETag في كل العمليات
+    # والخوادم، يُرفع داخل معاملة الكتابة نفسها (movies.cache.bump_dataset_version)
+    data_version = models.PositiveBigIntegerField(verbose_name=_("إصدار البيانات"), default=1)
+    data_modified = models.DateTimeField(verbose_name=_("آخر تغيير للبيانات"), default=timezone.now)
+
+    updated_at = models.DateTimeField(verbose_name=_("تاريخ التحديث"), auto_now=True)
+
+    VERSION_FIELDS = ('data_version', 'data_modified')
+
+    def __str__(self):
+        return f"{self.total_movies} movies"
+
+    def save_summary(self):
+        """حفظ حقول الملخص دون الكتابة فوق رقم الإصدار الذي قد يكون رُفع بعد قراءة الصف"""
+        if self._state.adding:
+            self.save()
+            return
+        self.save(update_fields=[
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.VERSION_FIELDS
+        ])
+
+    def as_stats(self):
+        """قاموس الإحصائيات بالشكل الذي تعرضه صفحة النتائج"""
+        return {
+            'avg_rating': self.rating_sum / self.total_movies if self.total_movies else 0,
+            'max_rating': self.max_rating or 0,
+            'min_rating': self.min_rating or 0,
+            'avg_revenue': self.revenue_sum / self.revenue_count if self.revenue_count else 0,
+            'avg_runtime': self.runtime_sum / self.runtime_count if self.runtime_count else 0,
+            'total_movies': self.total_movies,
+        }
+
+    def highest_values(self):
+        """أفلام بطاقات أعلى القيم"""
+        return {
+            'highest_rating': self.highest_rating,
+            'highest_revenue': self.highest_revenue,
+            'highest_metascore': self.highest_metascore,
+            'most_votes': self.most_votes,
+        }
+
+
+class AnalyticsRollup(models.Model):
+    """
+    نتيجة تجميع محسوبة مسبقاً لرسوم لوحة التحليلات (صف لكل تجميع بالاسم)،
+    تُعاد كتابتها بعد كل استيراد فتقرأ نقاط النهاية صفاً واحداً مهما كبر الجدول،
+    وتُحذف عند حفظ فيلم أو حذفه ليُعاد حسابها عند أول طلب.
+    يمكن إعادة حسابها بالأمر: python manage.py refresh_analytics
+    """
+
+    name = models.CharField(verbose_name=_("اسم التجميع"), max_length=50, unique=True)
+    data = models.JSONField(verbose_name=_("البيانات"), default=dict)
+    refreshed_at = models.DateTimeField(verbose_name=_("تاريخ التحديث"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("تجميع تحليلي")
+        verbose_name_plural = _("التجميعات التحليلية")
+
+    def __str__(self):
+        return self.name
+
+
+class ImportRun(models.Model):
+    """
+    قياسات عملية استيراد واحدة (من صفحة الرفع أو العامل أو سطر الأوامر):
+    الزمن الكلي، وزمن كل مرحلة وعدد صفوفها واستعلاماتها وذروة الذاكرة.
+    الأمر import_stage_stats يلخص المراحل (p50/p95) عبر آخر العمليات.
+    """
+
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    ORIGIN_UPLOAD = 'upload'
+    ORIGIN_JOB = 'job'
+    ORIGIN_COMMAND = 'command'
+    ORIGIN_ADMIN = 'admin'
+
+    class Meta:
+        verbose_name = _("قياس استيراد")
+        verbose_name_plural = _("قياسات الاستيراد")
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['started_at']),
+        ]
+
+    source = models.CharField(verbose_name=_("المصدر"), max_length=255)
+    origin = models.CharField(
+        verbose_name=_("نقطة البدء"),
+        max_length=20,
+        choices=[
+            (ORIGIN_UPLOAD, _("صفحة الرفع")), (ORIGIN_JOB, _("مهمة خلفية")),
+            (ORIGIN_COMMAND, _("سطر الأوامر")), (ORIGIN_ADMIN, _("لوحة الإدارة")),
+        ],
+    )
+    status = models.CharField(
+        verbose_name=_("الحالة"),
+        max_length=10,
+        choices=[(STATUS_DONE, _("مكتملة")), (STATUS_FAILED, _("فشلت"))],
+    )
+    file_size = models.PositiveBigIntegerField(verbose_name=_("حجم الملف"), null=True, blank=True)
+
+    rows = models.PositiveIntegerField(verbose_name=_("الصفوف"), default=0)
+    created_count = models.PositiveIntegerField(verbose_name=_("الأفلام المحفوظة"), default=0)
+    updated_count = models.PositiveIntegerField(verbose_name=_("الأفلام المحدَّثة"), default=0)
+    error_count = models.PositiveIntegerField(verbose_name=_("الصفوف المرفوضة"), default=0)
+
+    total_seconds = models.FloatField(verbose_name=_("الزمن الكلي (ثانية)"), default=0.0)
+    query_count = models.PositiveIntegerField(verbose_name=_("عدد الاستعلامات"), default=0)
+    peak_memory_kb = models.PositiveBigIntegerField(verbose_name=_("ذروة الذاكرة (KB)"), null=True, blank=True)
+
+    # {المرحلة: {seconds, rows, rows_per_second, queries, peak_memory_kb}}
+    stages = models.JSONField(verbose_name=_("المراحل"), default=dict)
+
+    # أول MOVIES_ERROR_REPORT_ROWS صفاً مرفوضاً: {total, truncated, rows: [{row, message}]}
+    error_report = models.JSONField(verbose_name=_("تقرير الصفوف المرفوضة"), default=dict, blank=True)
+
+    started_at = models.DateTimeField(verbose_name=_("بداية التنفيذ"))
+
+    def __str__(self):
+        return f"{self.source} ({self.total_seconds:.2f}s)"
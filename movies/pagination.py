@@ -0,0 +1,188 @@
+"""
+ترقيم صفحات جدول الأفلام بطريقة keyset (seek) بدلاً من LIMIT/OFFSET.
+
+كل صفحة تُجلب بشرط على آخر قيمة معروضة (field, id) بدلاً من تخطي الصفوف
+السابقة، فيبقى زمن الصفحة ثابتاً مهما كان عمقها، ولا حاجة لـ COUNT(*) كامل.
+يُفترض أن القيم الفارغة (NULL) هي الأصغر في الترتيب كما في MySQL و SQLite.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from django_tables2.data import TableListData
+
+from .models import Movie
+
+# الأعمدة القابلة للترتيب التي لها فهارس (الفهرس الثانوي يتضمن المفتاح الأساسي ضمنياً)
+KEYSET_COLUMNS = ('rating', 'year', 'title', 'genre', 'director')
+
+# الترتيب الافتراضي من Movie.Meta.ordering مع المعرف لكسر التعادل
+DEFAULT_SORT = Movie._meta.ordering[0]
+
+RESULTS_PER_PAGE = 25
+
+
+def get_pagination_mode():
+    """نمط ترقيم صفحات النتائج: keyset أو offset"""
+    return getattr(settings, 'MOVIES_RESULTS_PAGINATION', 'offset')
+
+
+def normalize_sort(sort):
+    """إرجاع ترتيب صالح لـ keyset أو الترتيب الافتراضي"""
+    if sort and sort.lstrip('-') in KEYSET_COLUMNS:
+        return sort
+    return DEFAULT_SORT
+
+
+def encode_cursor(sort, movie, direction):
+    """ترميز موضع الصف (قيمة الحقل والمعرف) في مؤشر نصي للرابط"""
+    field = sort.lstrip('-')
+    payload = json.dumps({'s': sort, 'v': getattr(movie, field), 'id': movie.pk, 'd': direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """
+    فك المؤشر؛ يعيد None إذا كان تالفاً أو يخص ترتيباً آخر. المؤشر يأتي من
+    العميل، فتُحوَّل قيمته بـ to_python لحقل الترتيب ولا تُقبل إلا قيمة مفردة.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data['s'] != sort or data['d'] not in ('next', 'prev') or not isinstance(data['id'], int):
+            return None
+        value = data['v']
+        if value is not None:
+            if not isinstance(value, (str, int, float)):
+                return None
+            data['v'] = Movie._meta.get_field(sort.lstrip('-')).to_python(value)
+        return data
+    except (ValueError, KeyError, TypeError, AttributeError, binascii.Error, ValidationError):
+        return None
+
+
+def rows_after(field, value, pk, ascending):
+    """
+    شرط الصفوف التي تأتي بعد (value, pk) في الترتيب المعطى، مع اعتبار NULL أصغر قيمة.
+    الشرط field <= v (أو >=) في المقدمة ليستخدم فهرس العمود كنطاق.
+    """
+    if ascending:
+        if value is None:
+            return Q(**{f'{field}__isnull': True, 'pk__gt': pk}) | Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(pk__gt=pk))
+
+    if value is None:
+        return Q(**{f'{field}__isnull': True, 'pk__lt': pk})
+    return (
+        Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(pk__lt=pk))
+        | Q(**{f'{field}__isnull': True})
+    )
+
+
+class KeysetPage:
+    """صفحة نتائج keyset مع مؤشرات الصفحة التالية والسابقة"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """جلب صفحات queryset مرتبة بـ (field, id) باستخدام مؤشرات keyset"""
+
+    def __init__(self, queryset, sort=None, per_page=RESULTS_PER_PAGE):
+        self.queryset = queryset
+        self.sort = normalize_sort(sort)
+        self.field = self.sort.lstrip('-')
+        self.descending = self.sort.startswith('-')
+        self.per_page = per_page
+
+    def _ordering(self, ascending):
+        if ascending:
+            return (self.field, 'pk')
+        return (f'-{self.field}', '-pk')
+
+    def page(self, cursor=None):
+        """جلب الصفحة التي يشير إليها المؤشر (أو الصفحة الأولى) باستعلام واحد"""
+        position = decode_cursor(cursor, self.sort)
+        forward = position is None or position['d'] == 'next'
+        # الصفحة السابقة تُجلب بالترتيب المعكوس ثم تُقلب
+        ascending = (not self.descending) if forward else self.descending
+
+        queryset = self.queryset.order_by(*self._ordering(ascending))
+        if position is not None:
+            queryset = queryset.filter(rows_after(self.field, position['v'], position['id'], ascending))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, position is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(self.sort, rows[-1], 'next') if rows and has_next else None,
+            previous_cursor=encode_cursor(self.sort, rows[0], 'prev') if rows and has_previous else None,
+        )
+
+
+class KeysetTableData(TableListData):
+    """بيانات جدول مرتبة مسبقاً من قاعدة البيانات؛ لا تُعاد فرزها في بايثون"""
+
+    def order_by(self, aliases):
+        pass
+
+
+def approximate_count(queryset):
+    """
+    تقدير سريع لعدد صفوف الجدول من إحصائيات MySQL (information_schema)،
+    أو None إذا لم يكن التقدير متاحاً فيُستخدم العدد المخزن.
+    """
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_total_count(queryset, cached_total=None, paginator_count=None):
+    """
+    عدد الأفلام الكلي حسب MOVIES_RESULTS_COUNT، دون تحميل أي صفوف:
+    'cached' من ملخص الإحصائيات (افتراضي)، 'approximate' تقدير MySQL،
+    'exact' عدد المُرقِّم إن كان محسوباً وإلا COUNT(*)، أو 'none' لعدم عرض العدد.
+    """
+    mode = getattr(settings, 'MOVIES_RESULTS_COUNT', 'cached')
+    if mode == 'none':
+        return None
+    if mode == 'exact':
+        return paginator_count if paginator_count is not None else queryset.count()
+    if mode == 'approximate':
+        estimate = approximate_count(queryset)
+        if estimate is not None:
+            return estimate
+    return cached_total
@@ -0,0 +1,262 @@
+"""
+استيراد عدة مصادر معاً: عدة ملفات، أو كل أوراق مصنف Excel، أو أرشيف zip.
+
+مع مجمع عمليات (conversion_pool) تتم القراءة والتحويل والتحقق لكل مصدر في
+عملية منفصلة، بينما الحفظ في قاعدة البيانات يتم في العملية الرئيسية فقط
+(كاتب واحد) عبر import_converted، بترتيب المصادر نفسه ليبقى ناتج upsert حتمياً.
+المجمع يُنشأ فقط من عامل الاستيراد وسطر الأوامر؛ طلبات الويب تحوّل المصادر
+في العملية الحالية دون fork.
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+from django.conf import settings
+from django.db import connections
+
+from .importer import (
+    build_movies, check_required_columns, convert_records, get_max_upload_size, import_converted, import_file,
+    read_file_chunks, read_xlsx_chunks, supported_extensions, xlsx_sheet_names
+)
+from .instrumentation import stage, timed_chunks
+
+logger = logging.getLogger(__name__)
+
+# مصدر واحد للتحويل: اسم للعرض في رسائل الأخطاء، ومسار على القرص، والامتداد، والورقة (لملفات xlsx)
+ImportTask = namedtuple('ImportTask', ['label', 'path', 'ext', 'sheet'])
+
+# مجمع التحويل الذي ينتجه conversion_pool: العمليات وعددها
+ConversionPool = namedtuple('ConversionPool', ['executor', 'workers'])
+
+
+def get_import_workers():
+    """عدد عمليات التحويل المتوازية (MOVIES_IMPORT_WORKERS أو عدد المعالجات)"""
+    workers = getattr(settings, 'MOVIES_IMPORT_WORKERS', None)
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def _save_to(directory, name, source):
+    """
+    حفظ المصدر (ملف مرفوع أو كائن ملف) في المجلد المؤقت لتقرأه العمليات
+    الأخرى، أو إرجاع المسار كما هو إذا كان المصدر مساراً.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+
+    handle, path = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(name)[1].lower())
+    with os.fdopen(handle, 'wb') as destination:
+        if hasattr(source, 'chunks'):
+            for block in source.chunks():
+                destination.write(block)
+        else:
+            source.seek(0)
+            shutil.copyfileobj(source, destination)
+    return path
+
+
+def _file_tasks(label, path, ext, all_sheets):
+    if ext not in supported_extensions():
+        raise ValueError(f'نوع الملف غير مدعوم: {label}')
+    if ext == '.xlsx' and all_sheets:
+        return [ImportTask(f'{label} [{sheet}]', path, ext, sheet) for sheet in xlsx_sheet_names(path)]
+    return [ImportTask(label, path, ext, None)]
+
+
+def _zip_tasks(label, path, directory, all_sheets):
+    """
+    فك ملفات الأرشيف المدعومة إلى المجلد المؤقت (بأسماء جديدة، دون الثقة
+    بمسارات الأرشيف) مع فحص الحجم غير المضغوط لكل ملف بحد نوعه.
+    """
+    tasks = []
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            member = info.filename
+            ext = os.path.splitext(member)[1].lower()
+            if info.is_dir() or member.startswith('__MACOSX/') or os.path.basename(member).startswith('.'):
+                continue
+            if ext not in supported_extensions():
+                logger.info(f"Skipping unsupported archive member {member}")
+                continue
+
+            max_size = get_max_upload_size(ext)
+            if max_size and info.file_size > max_size:
+                raise ValueError(f'حجم الملف {member} داخل الأرشيف يتجاوز الحد المسموح')
+
+            handle, member_path = tempfile.mkstemp(dir=directory, suffix=ext)
+            with os.fdopen(handle, 'wb') as destination, archive.open(info) as source:
+                shutil.copyfileobj(source, destination)
+            tasks.extend(_file_tasks(f'{label}/{member}', member_path, ext, all_sheets))
+
+    if not tasks:
+        raise ValueError(f'لا توجد ملفات مدعومة في الأرشيف {label}')
+    return tasks
+
+
+def build_tasks(sources, directory, all_sheets=False):
+    """
+    تحويل المصادر [(الاسم، مسار أو كائن ملف)] إلى مهام تحويل مستقلة:
+    ملف لكل مهمة، وورقة لكل مهمة مع all_sheets، وملف لكل عضو في أرشيف zip.
+    """
+    tasks = []
+    for name, source in sources:
+        ext = os.path.splitext(name)[1].lower()
+        path = _save_to(directory, name, source)
+        if ext == '.zip':
+            tasks.extend(_zip_tasks(name, path, directory, all_sheets))
+        else:
+            tasks.extend(_file_tasks(name, path, ext, all_sheets))
+    return tasks
+
+
+def parse_task(task):
+    """
+    قراءة مصدر وتحويله جزءاً بجزء دون الوصول لقاعدة البيانات. ينتج لكل جزء
+    (عدد الصفوف، قواميس الأفلام، صفوف الأخطاء)، مع اسم المصدر في رسائل
+    الأخطاء لأن أرقام الصفوف تخص كل مصدر على حدة.
+    """
+    if task.sheet is not None:
+        chunks = read_xlsx_chunks(task.path, task.ext, sheet=task.sheet, allow_empty=True)
+    else:
+        chunks = read_file_chunks(task.path, task.ext)
+
+    try:
+        for number, chunk in enumerate(chunks):
+            if number == 0:
+                check_required_columns(chunk)
+            records, error_rows = convert_records(chunk)
+            yield len(chunk), records, [(row, f'{task.label}: {message}') for row, message in error_rows]
+    except pd.errors.EmptyDataError:
+        raise ValueError(f'{task.label}: لا توجد بيانات في الملف')
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f'{task.label}: خطأ في قراءة الملف: {str(e)}')
+    except ValueError as e:
+        raise ValueError(f'{task.label}: {str(e)}')
+
+
+def spill_task(task, directory):
+    """
+    (تعمل في عملية منفصلة) تحويل مصدر وكتابة كل جزء محوَّل في ملف مستقل
+    داخل مجلد الاستيراد المؤقت. يعيد مسارات الأجزاء بالترتيب، فلا يُنقل بين
+    العمليات نتيجة مصدر كامل ولا يبقى في ذاكرة أي منهما أكثر من جزء.
+    """
+    paths = []
+    for chunk in parse_task(task):
+        handle, path = tempfile.mkstemp(dir=directory, suffix='.pickle')
+        with os.fdopen(handle, 'wb') as destination:
+            pickle.dump(chunk, destination, protocol=pickle.HIGHEST_PROTOCOL)
+        paths.append(path)
+    return paths
+
+
+def _load_chunks(paths):
+    """قراءة أجزاء spill_task بالترتيب مع حذف ملف كل جزء بعد تحميله"""
+    for path in paths:
+        with open(path, 'rb') as source:
+            chunk = pickle.load(source)
+        os.remove(path)
+        yield chunk
+
+
+def _pool_context():
+    """
+    العمليات تُنشأ بـ fork لترث إعدادات Django المحمّلة؛ على الأنظمة التي
+    لا تدعمه يتم التحويل في العملية الحالية.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+@contextmanager
+def conversion_pool(workers=None):
+    """
+    مجمع عمليات التحويل لعامل الاستيراد وسطر الأوامر (لا يُستخدم داخل طلبات
+    الويب). يُستخدم خارج أي معاملة: تُغلق اتصالات قاعدة البيانات ثم تُنشأ كل
+    العمليات فوراً، قبل أن تفتح العملية الرئيسية اتصالاً جديداً، فلا ترث
+    العمليات الابنة اتصالاً مشتركاً. ينتج ConversionPool، أو None (تحويل في
+    العملية الحالية) مع عملية واحدة أو على الأنظمة التي لا تدعم fork.
+    """
+    workers = workers or get_import_workers()
+    context = _pool_context()
+    if workers <= 1 or context is None:
+        yield None
+        return
+
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    try:
+        # مع fork تُنشأ كل العمليات عند أول مهمة
+        executor.submit(int).result()
+        yield ConversionPool(executor, workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def convert_tasks(tasks, directory, pool=None):
+    """
+    تحويل المهام وإرجاع الأجزاء بترتيب المهام لتحفظها العملية الرئيسية.
+    بدون pool يتم التحويل هنا جزءاً بجزء؛ ومع pool لا يُرسل إلى العمليات أكثر
+    من ضعف عددها من المهام مسبقاً، وتُقرأ أجزاؤها من القرص واحداً تلو الآخر.
+    """
+    if pool is None:
+        for task in tasks:
+            for row_count, records, error_rows in parse_task(task):
+                yield row_count, build_movies(records), error_rows
+        return
+
+    pending = iter(tasks)
+    futures = deque(
+        pool.executor.submit(spill_task, task, directory) for _, task in zip(range(pool.workers * 2), pending)
+    )
+    try:
+        while futures:
+            paths = futures.popleft().result()
+            task = next(pending, None)
+            if task is not None:
+                futures.append(pool.executor.submit(spill_task, task, directory))
+            for row_count, records, error_rows in _load_chunks(paths):
+                yield row_count, build_movies(records), error_rows
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def import_sources(sources, all_sheets=False, pool=None, **options):
+    """
+    استيراد عدة مصادر [(الاسم، مسار أو كائن ملف)] بكاتب واحد، والتحويل في
+    عمليات pool (conversion_pool) أو في العملية الحالية إذا لم يُمرَّر.
+    تُمرَّر options (batch_size, on_chunk, mode, commit_every, error_report) إلى import_converted.
+    يعيد نتيجة import_converted مع sources: عدد الملفات/الأوراق المقروءة.
+    """
+    with tempfile.TemporaryDirectory(prefix='movies_import_') as directory:
+        with stage('save'):
+            tasks = build_tasks(sources, directory, all_sheets)
+        # مع pool يتم التحويل في العمليات، فيُقاس انتظار نتائجها كمرحلة convert
+        converted = timed_chunks('convert', convert_tasks(tasks, directory, pool), rows=lambda chunk: chunk[0])
+        result = import_converted(converted, **options)
+    result['sources'] = len(tasks)
+    return result
+
+
+def import_uploads(files, all_sheets=False, **options):
+    """
+    استيراد الملفات المرفوعة من طلب ويب: ملف واحد يُقرأ مباشرة من الرفع عبر
+    import_file، أما عدة ملفات أو أرشيف zip أو كل أوراق مصنف xlsx فعبر
+    import_sources في العملية الحالية دون fork (الملفات الكبيرة تُحوَّل إلى
+    مهام خلفية يحوّلها العامل بالتوازي).
+    """
+    ext = os.path.splitext(files[0].name)[1].lower()
+    if len(files) == 1 and ext != '.zip' and not (all_sheets and ext == '.xlsx'):
+        files[0].seek(0)
+        return import_file(files[0], ext, **options)
+    return import_sources([(file.name, file) for file in files], all_sheets=all_sheets, **options)
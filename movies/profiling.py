@@ -0,0 +1,180 @@
+"""
+قياس زمن الطلبات واستعلاماتها (اختياري، MOVIES_PROFILE_REQUESTS).
+
+RequestProfilingMiddleware تلف كل طلب بـ connection.execute_wrapper فتسجل
+عدد الاستعلامات وزمنها الكلي وأبطأها، وأكثر استعلام تكرر (علامة N+1)، وزمن
+العرض. الأرقام تُرسل في ترويسة Server-Timing (تظهر في أدوات المطور في
+المتصفح) وتُجمع في نافذة متحركة لكل مسار URL تعرضها صفحة request_profile
+للمشرفين (أو محلياً مع DEBUG) عند تفعيل القياس فقط. الإحصائيات في ذاكرة العملية فلكل عملية خادم نافذتها.
+"""
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# حدود فئات مدرج زمن الطلب (ملي ثانية)؛ الفئة الأخيرة لما فوق آخر حد
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+DEFAULT_WINDOW = 200
+DEFAULT_SLOW_QUERIES = 5
+
+
+def profiling_enabled():
+    return getattr(settings, 'MOVIES_PROFILE_REQUESTS', False)
+
+
+def get_window():
+    """عدد آخر الطلبات المحفوظة لكل مسار"""
+    return getattr(settings, 'MOVIES_PROFILE_WINDOW', DEFAULT_WINDOW)
+
+
+def get_slow_query_count():
+    """عدد أبطأ الاستعلامات المحفوظة لكل طلب"""
+    return getattr(settings, 'MOVIES_PROFILE_SLOW_QUERIES', DEFAULT_SLOW_QUERIES)
+
+
+def latency_bucket(milliseconds):
+    """رقم فئة المدرج لزمن طلب"""
+    for index, limit in enumerate(LATENCY_BUCKETS_MS):
+        if milliseconds <= limit:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+class QueryRecorder:
+    """(execute_wrapper) تسجيل زمن كل استعلام ونصه"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000))
+
+    @property
+    def sql_ms(self):
+        return sum(duration for _, duration in self.queries)
+
+    def slowest(self, count):
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:count]
+
+    def most_repeated(self):
+        """(نص الاستعلام، عدد مرات تكراره) للاستعلام الأكثر تكراراً بالمعاملات المختلفة"""
+        if not self.queries:
+            return None, 0
+        return Counter(sql for sql, _ in self.queries).most_common(1)[0]
+
+
+class ProfileStore:
+    """نافذة متحركة من قياسات الطلبات لكل مسار (آمنة بين الخيوط)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def add(self, route, sample):
+        with self.lock:
+            samples = self.routes.get(route)
+            if samples is None or samples.maxlen != get_window():
+                samples = self.routes[route] = deque(samples or (), maxlen=get_window())
+            samples.append(sample)
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
+
+    def summary(self):
+        """ملخص كل مسار: النسب المئوية للزمن، الاستعلامات، المدرج، وأبطأ الاستعلامات"""
+        with self.lock:
+            routes = {route: list(samples) for route, samples in self.routes.items()}
+
+        summary = []
+        for route, samples in routes.items():
+            durations = sorted(sample['total_ms'] for sample in samples)
+            histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for duration in durations:
+                histogram[latency_bucket(duration)] += 1
+            slowest = sorted(
+                (query for sample in samples for query in sample['slowest']),
+                key=lambda query: query[1], reverse=True
+            )[:get_slow_query_count()]
+            repeated = max(samples, key=lambda sample: sample['repeated_count'])
+            summary.append({
+                'route': route,
+                'requests': len(samples),
+                'p50_ms': _percentile(durations, 50),
+                'p95_ms': _percentile(durations, 95),
+                'max_ms': durations[-1],
+                'avg_queries': sum(sample['queries'] for sample in samples) / len(samples),
+                'max_queries': max(sample['queries'] for sample in samples),
+                'avg_sql_ms': sum(sample['sql_ms'] for sample in samples) / len(samples),
+                'histogram': histogram,
+                'slowest': slowest,
+                'repeated_sql': repeated['repeated_sql'],
+                'repeated_count': repeated['repeated_count'],
+            })
+        return sorted(summary, key=lambda route: route['p95_ms'], reverse=True)
+
+
+def _percentile(sorted_values, percent):
+    """النسبة المئوية بأقرب رتبة لقائمة مرتبة غير فارغة"""
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+store = ProfileStore()
+
+
+def server_timing(sample):
+    """قيمة ترويسة Server-Timing لقياس طلب"""
+    return (
+        f'sql;dur={sample["sql_ms"]:.1f};desc="{sample["queries"]} queries", '
+        f'app;dur={sample["view_ms"]:.1f};desc="view without SQL", '
+        f'total;dur={sample["total_ms"]:.1f}'
+    )
+
+
+class RequestProfilingMiddleware:
+    """
+    قياس كل طلب عند تفعيل MOVIES_PROFILE_REQUESTS (وإلا تُستبعد من سلسلة
+    الوسائط عند بدء الخادم فلا كلفة لها).
+    """
+
+    def __init__(self, get_response):
+        if not profiling_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        sql_ms = recorder.sql_ms
+        repeated_sql, repeated_count = recorder.most_repeated()
+        sample = {
+            'total_ms': total_ms,
+            'sql_ms': sql_ms,
+            'view_ms': max(total_ms - sql_ms, 0),
+            'queries': len(recorder.queries),
+            'slowest': recorder.slowest(get_slow_query_count()),
+            'repeated_sql': repeated_sql,
+            'repeated_count': repeated_count,
+        }
+        response['Server-Timing'] = server_timing(sample)
+
+        match = request.resolver_match
+        route = f'{request.method} /{match.route}' if match and match.route else f'{request.method} {request.path}'
+        store.add(route, sample)
+        return response
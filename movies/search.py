@@ -0,0 +1,131 @@
+"""
+البحث النصي في عناوين الأفلام باستخدام فهرس النص الكامل لقاعدة البيانات.
+
+- MySQL: فهرس FULLTEXT على العنوان، والبحث بـ MATCH ... AGAINST (BOOLEAN MODE).
+- SQLite: جدول FTS5 خارجي المحتوى (content=movies_movie) تُبقيه المشغلات
+  (triggers) متزامناً مع الجدول عند الإدراج والتعديل والحذف، ومنها bulk_create.
+- غير ذلك (أو إذا تعذر إنشاء الفهرس): icontains دون فهرس.
+
+لا توجد ملفات ترحيل في التطبيق، فالفهرس يُنشأ بعد migrate (movies.apps)
+أو بالأمر rebuild_search_index.
+"""
+import logging
+import re
+
+from django.db import connections, DatabaseError
+from django.db.models.expressions import RawSQL
+
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'movies_movie_fts'
+FULLTEXT_INDEX = 'movies_movie_title_fulltext'
+
+# قواعد البيانات (aliases) التي تأكد وجود فهرس النص الكامل فيها
+_search_ready = set()
+
+# الكلمات: حروف وأرقام (بما فيها العربية)؛ كل ما عداها يُهمل لتفادي صيغ الاستعلام الخاصة
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """كلمات البحث بعد إزالة رموز صيغ الاستعلام"""
+    return _WORD_RE.findall(query or '')
+
+
+def _sqlite_statements():
+    table = Movie._meta.db_table
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"title, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title); "
+        f"INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title); END",
+    ]
+
+
+def _mysql_has_fulltext(cursor):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        [Movie._meta.db_table, FULLTEXT_INDEX]
+    )
+    return cursor.fetchone() is not None
+
+
+def ensure_search_index(using='default', rebuild=False):
+    """
+    إنشاء فهرس النص الكامل إن لم يكن موجوداً (وإعادة بنائه من الجدول مع rebuild).
+    يعيد True إذا كان الفهرس متاحاً.
+    """
+    connection = connections[using]
+    table = Movie._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                created = FTS_TABLE not in connection.introspection.table_names(cursor)
+                for statement in _sqlite_statements():
+                    cursor.execute(statement)
+                if created or rebuild:
+                    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            elif connection.vendor == 'mysql':
+                if not _mysql_has_fulltext(cursor):
+                    cursor.execute(f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON {table} (title)")
+            else:
+                return False
+    except DatabaseError as e:
+        logger.warning(f"Full-text index unavailable on {using}, falling back to icontains: {e}")
+        _search_ready.discard(using)
+        return False
+
+    _search_ready.add(using)
+    return True
+
+
+def search_index_available(using='default'):
+    """هل فهرس النص الكامل موجود؟ (يُفحص مرة واحدة لكل قاعدة بيانات)"""
+    if using in _search_ready:
+        return True
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                available = FTS_TABLE in connection.introspection.table_names(cursor)
+            elif connection.vendor == 'mysql':
+                available = _mysql_has_fulltext(cursor)
+            else:
+                available = False
+    except DatabaseError:
+        return False
+    if available:
+        _search_ready.add(using)
+    return available
+
+
+def search_titles(queryset, query):
+    """
+    تصفية queryset بالأفلام التي يحتوي عنوانها كل كلمات البحث (كبادئات كلمات).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    using = queryset.db
+    vendor = connections[using].vendor
+    if not search_index_available(using):
+        for term in terms:
+            queryset = queryset.filter(title__icontains=term)
+        return queryset
+
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+    match = ' '.join(f'+{term}*' for term in terms)
+    relevance = RawSQL(f'MATCH({Movie._meta.db_table}.title) AGAINST (%s IN BOOLEAN MODE)', [match])
+    return queryset.alias(title_relevance=relevance).filter(title_relevance__gt=0)
@@ -0,0 +1,121 @@
+"""
+لقطات عمودية (Parquet أو Feather) لكتالوج الأفلام لنقله بين البيئات.
+
+التصدير يقرأ الجدول على دفعات بالمفتاح الأساسي (pk > آخر معرف، LIMIT) ويكتب
+كل دفعة مجموعةَ صفوف (row group) مستقلة بأنواع أعمدة محددة مسبقاً، فلا
+يُحمَّل الجدول كاملاً في الذاكرة (حتى مع مؤشر MySQL الافتراضي الذي يجلب ناتج
+الاستعلام كاملاً إلى العميل). الاستيراد يتم عبر المحرك الموحد (import_file) الذي يقرأ الملف
+مجموعةً بعد مجموعة ويحفظه بـ bulk_create، كأي ملف مرفوع.
+تتطلب مكتبة pyarrow الاختيارية.
+"""
+import os
+
+from .importer import IMPORT_FIELDS
+from .models import Movie
+
+SNAPSHOT_FORMAT_PARQUET = 'parquet'
+SNAPSHOT_FORMAT_FEATHER = 'feather'
+SNAPSHOT_FORMATS = (SNAPSHOT_FORMAT_PARQUET, SNAPSHOT_FORMAT_FEATHER)
+
+# الحقول المصدَّرة: كل حقول بيانات Movie، وهي نفس الحقول التي يملؤها الاستيراد
+# ليُعاد تحميل اللقطة بلا فقد (المعرف و updated_at لا يُنقلان، وروابط الأنواع
+# والمخرجين تُعاد من genre و director عند الاستيراد)
+SNAPSHOT_FIELDS = IMPORT_FIELDS
+
+# عدد الصفوف في كل مجموعة صفوف (ودفعة قراءة من قاعدة البيانات)
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+# الضغط الافتراضي لكل صيغة
+DEFAULT_COMPRESSION = {
+    SNAPSHOT_FORMAT_PARQUET: 'snappy',
+    SNAPSHOT_FORMAT_FEATHER: 'lz4',
+}
+
+
+def snapshot_format(path):
+    """صيغة اللقطة من امتداد المسار"""
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext not in SNAPSHOT_FORMATS:
+        raise ValueError(f'امتداد اللقطة يجب أن يكون .parquet أو .feather: {path}')
+    return ext
+
+
+def snapshot_schema():
+    """أنواع أعمدة اللقطة بحسب حقول Movie"""
+    import pyarrow as pa
+
+    types = {
+        'title': pa.string(),
+        'year': pa.int32(),
+        'rating': pa.float64(),
+        'genre': pa.string(),
+        'director': pa.string(),
+        'runtime': pa.int32(),
+        'votes': pa.int64(),
+        'revenue': pa.float64(),
+        'metascore': pa.int32(),
+        'actors': pa.string(),
+        'description': pa.string(),
+        'country': pa.string(),
+        'language': pa.string(),
+    }
+    required = {'title', 'year', 'rating'}
+    return pa.schema([pa.field(name, types[name], nullable=name not in required) for name in SNAPSHOT_FIELDS])
+
+
+def snapshot_batches(schema, row_group_size):
+    """
+    دفعات RecordBatch من جدول الأفلام مرتبة بالمعرف، row_group_size صفاً لكل
+    دفعة، باستعلام مستقل لكل دفعة بعد آخر معرف.
+    """
+    import pyarrow as pa
+
+    rows = Movie.objects.order_by('pk').values_list('pk', *SNAPSHOT_FIELDS)
+    last_pk = 0
+    while True:
+        group = list(rows.filter(pk__gt=last_pk)[:row_group_size])
+        if not group:
+            return
+        last_pk = group[-1][0]
+        columns = list(zip(*group))[1:]
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+        if len(group) < row_group_size:
+            return
+
+
+def export_snapshot(path, fmt=None, row_group_size=None, compression=None):
+    """
+    تصدير جدول الأفلام إلى ملف Parquet أو Feather (الصيغة من الامتداد إن لم تُحدد).
+    يُكتب الملف باسم مؤقت ثم يُستبدل به المسار، فلا يبقى ملف ناقص عند الفشل.
+    يعيد عدد الأفلام المصدَّرة.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fmt = fmt or snapshot_format(path)
+    row_group_size = row_group_size or DEFAULT_ROW_GROUP_SIZE
+    compression = compression or DEFAULT_COMPRESSION[fmt]
+    schema = snapshot_schema()
+
+    exported = 0
+    temp_path = f'{path}.part'
+    try:
+        if fmt == SNAPSHOT_FORMAT_PARQUET:
+            with pq.ParquetWriter(temp_path, schema, compression=compression) as writer:
+                for batch in snapshot_batches(schema, row_group_size):
+                    writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_size)
+                    exported += batch.num_rows
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            with pa.OSFile(temp_path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+                for batch in snapshot_batches(schema, row_group_size):
+                    writer.write_batch(batch)
+                    exported += batch.num_rows
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return exported
@@ -0,0 +1,233 @@
+"""
+إحصائيات صفحة النتائج: ملخص مُخزَّن (MovieStats) يُحدَّث تدريجياً عند الاستيراد.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Subquery, Sum
+
+from .models import Movie, MovieStats
+
+# بطاقات "أعلى القيم": الحقل الذي تُرتب به كل بطاقة، وحقل القيمة العظمى المخزنة في MovieStats
+HIGHEST_FIELDS = {
+    'highest_rating': ('rating', 'max_rating'),
+    'highest_revenue': ('revenue', 'max_revenue'),
+    'highest_metascore': ('metascore', 'max_metascore'),
+    'most_votes': ('votes', 'max_votes'),
+}
+
+STATS_RELATED = tuple(HIGHEST_FIELDS)
+
+
+def get_highest_values(queryset):
+    """
+    جلب أفلام بطاقات "أعلى القيم" معاً في استعلام واحد.
+
+    كل بطاقة تمثلها استعلامات فرعية عددية (pk = (SELECT ... LIMIT 1)) تستخدم
+    فهارس الأعمدة، ثم يُوزَّع الناتج (4 صفوف كحد أقصى) على البطاقات في بايثون.
+    """
+    condition = Q()
+    for field, _ in HIGHEST_FIELDS.values():
+        top_pk = queryset.order_by(f'-{field}').values('pk')[:1]
+        condition |= Q(pk=Subquery(top_pk))
+
+    candidates = list(queryset.filter(condition))
+
+    highest_values = {}
+    for key, (field, _) in HIGHEST_FIELDS.items():
+        with_value = [movie for movie in candidates if getattr(movie, field) is not None]
+        highest_values[key] = max(with_value, key=lambda movie: getattr(movie, field)) if with_value else None
+    return highest_values
+
+
+def _merge(stats, queryset):
+    """
+    دمج إحصائيات مجموعة أفلام (جديدة أو كل الجدول) في ملخص MovieStats.
+    يكلف استعلامين بغض النظر عن حجم المجموعة.
+    """
+    delta = queryset.aggregate(
+        count=Count('pk'),
+        rating_sum=Sum('rating'),
+        revenue_sum=Sum('revenue'),
+        revenue_count=Count('revenue'),
+        runtime_sum=Sum('runtime'),
+        runtime_count=Count('runtime'),
+        min_rating=Min('rating'),
+        max_rating=Max('rating'),
+    )
+    if not delta['count']:
+        return stats
+
+    stats.total_movies += delta['count']
+    stats.rating_sum += delta['rating_sum'] or 0
+    stats.revenue_sum += delta['revenue_sum'] or 0
+    stats.revenue_count += delta['revenue_count']
+    stats.runtime_sum += delta['runtime_sum'] or 0
+    stats.runtime_count += delta['runtime_count']
+    if stats.min_rating is None or delta['min_rating'] < stats.min_rating:
+        stats.min_rating = delta['min_rating']
+
+    for key, movie in get_highest_values(queryset).items():
+        if movie is None:
+            continue
+        field, max_field = HIGHEST_FIELDS[key]
+        current = getattr(stats, max_field)
+        if current is None or getattr(movie, field) > current:
+            setattr(stats, max_field, getattr(movie, field))
+            setattr(stats, key, movie)
+    return stats
+
+
+def rebuild_movie_stats():
+    """إعادة حساب الملخص كاملاً من جدول الأفلام (مسح كامل للجدول)"""
+    with transaction.atomic():
+        # رقم إصدار البيانات يستمر بعد إعادة البناء (ويُرفع لإبطال ما خُزن قبلها)
+        version = MovieStats.objects.filter(pk=MovieStats.SINGLETON_PK).values_list('data_version', flat=True).first()
+        MovieStats.objects.filter(pk=MovieStats.SINGLETON_PK).delete()
+        stats = _merge(MovieStats(pk=MovieStats.SINGLETON_PK, data_version=(version or 0) + 1), Movie.objects.all())
+        stats.save()
+    return stats
+
+
+def _locked_stats():
+    """
+    قفل صف الملخص (select_for_update)، وإنشاؤه من كل الجدول إن لم يكن موجوداً.
+    الإنشاء تحت القفل نفسه (get_or_create) فلا تبنيه عمليتان معاً. يعيد
+    (الملخص، هل أُنشئ الآن)؛ الملخص المنشأ للتو يشمل كل الصفوف المحفوظة.
+    """
+    stats, created = MovieStats.objects.select_for_update().get_or_create(pk=MovieStats.SINGLETON_PK)
+    if created:
+        _merge(stats, Movie.objects.all())
+    return stats, created
+
+
+def _refresh_extremes(stats, keys, min_rating=False):
+    """إعادة حساب أقل تقييم و/أو أفلام بطاقات keys من الجدول بعد فقدان صاحبها"""
+    if min_rating:
+        stats.min_rating = Movie.objects.aggregate(min_rating=Min('rating'))['min_rating']
+    for key in keys:
+        field, max_field = HIGHEST_FIELDS[key]
+        top = Movie.objects.filter(**{f'{field}__isnull': False}).order_by(f'-{field}').first()
+        setattr(stats, max_field, getattr(top, field) if top else None)
+        setattr(stats, key, top)
+
+
+def get_movie_stats():
+    """قراءة الملخص مع أفلام البطاقات في استعلام واحد، وبناؤه إن لم يكن موجوداً"""
+    stats = MovieStats.objects.select_related(*STATS_RELATED).filter(pk=MovieStats.SINGLETON_PK).first()
+    if stats is None:
+        stats = rebuild_movie_stats()
+    return stats
+
+
+@contextmanager
+def track_new_movies():
+    """
+    تحديث الملخص بالأفلام المضافة داخل الكتلة فقط.
+
+    يُقفل صف الملخص (select_for_update) ويُسجَّل أكبر معرف قبل الإدراج، ثم
+    تُجمَّع الصفوف ذات المعرفات الأكبر بعده؛ فتكون الكلفة بحجم الدفعة لا
+    بحجم الجدول، ويصبح عدد الأفلام المضافة دقيقاً حتى مع ignore_conflicts.
+    يجب استخدامها داخل transaction.atomic. يعيد قاموساً يحتوي created بعد الخروج،
+    و last_pk (أكبر معرف قبل الإدراج) لتمييز الأفلام الجديدة.
+    القفل يسبق قراءة أكبر معرف، فلا تتداخل نافذتا استيراد متزامنين.
+    """
+    stats, _ = _locked_stats()
+    last_pk = Movie.objects.aggregate(last=Max('pk'))['last'] or 0
+    before = stats.total_movies
+
+    tracked = {'created': 0, 'last_pk': last_pk}
+    yield tracked
+
+    _merge(stats, Movie.objects.filter(pk__gt=last_pk))
+    stats.save_summary()
+    tracked['created'] = stats.total_movies - before
+
+
+def _adjust_sum(stats, field, old, new):
+    """تعديل مجموع وعدد القيم غير الفارغة لحقل بعد تغيير قيمته"""
+    sum_field, count_field = f'{field}_sum', f'{field}_count'
+    if old is not None:
+        setattr(stats, sum_field, getattr(stats, sum_field) - old)
+        setattr(stats, count_field, getattr(stats, count_field) - 1)
+    if new is not None:
+        setattr(stats, sum_field, getattr(stats, sum_field) + new)
+        setattr(stats, count_field, getattr(stats, count_field) + 1)
+
+
+def apply_movie_updates(changes):
+    """
+    تحديث الملخص بعد تعديل قيم أفلام موجودة (استيراد upsert).
+
+    changes قائمة أزواج (old, movie): old قاموس بالقيم السابقة مع pk، و movie
+    الكائن بالقيم الجديدة بعد حفظها. المجاميع تُعدَّل بالفرق، ولا يُعاد حساب
+    القيمة العظمى أو الصغرى من الجدول إلا إذا انخفضت قيمة الفيلم صاحبها.
+    يجب استخدامها داخل transaction.atomic بعد حفظ التعديلات.
+    """
+    if not changes:
+        return
+    stats, created = _locked_stats()
+    if created:
+        # بُني من الجدول بعد حفظ التعديلات
+        stats.save_summary()
+        return
+
+    stale = set()
+    min_rating_stale = False
+    for old, movie in changes:
+        stats.rating_sum += movie.rating - old['rating']
+        _adjust_sum(stats, 'revenue', old['revenue'], movie.revenue)
+        _adjust_sum(stats, 'runtime', old['runtime'], movie.runtime)
+
+        if stats.min_rating is None or movie.rating < stats.min_rating:
+            stats.min_rating = movie.rating
+        elif old['rating'] == stats.min_rating and movie.rating > old['rating']:
+            min_rating_stale = True
+
+        for key, (field, max_field) in HIGHEST_FIELDS.items():
+            value, current = getattr(movie, field), getattr(stats, max_field)
+            if value is not None and (current is None or value > current):
+                setattr(stats, max_field, value)
+                setattr(stats, f'{key}_id', old['pk'])
+            elif getattr(stats, f'{key}_id') == old['pk'] and (value is None or value < current):
+                stale.add(key)
+
+    _refresh_extremes(stats, stale, min_rating=min_rating_stale)
+    stats.save_summary()
+
+
+def add_movie(movie):
+    """تحديث الملخص بفيلم أُضيف بـ Movie.save (داخل معاملة الحفظ)"""
+    stats, created = _locked_stats()
+    if not created:
+        _merge(stats, Movie.objects.filter(pk=movie.pk))
+    stats.save_summary()
+
+
+def remove_movie(movie):
+    """
+    تحديث الملخص بعد حذف فيلم؛ يُستدعى من إشارة post_delete فيشمل حذف الفيلم
+    منفرداً والحذف بالجملة (QuerySet.delete وإجراء الحذف في لوحة الإدارة).
+    ربط بطاقات الفيلم المحذوف صار NULL (SET_NULL) قبل الإشارة، فتُعاد قيمها
+    العظمى وأفلامها من الجدول، وكذلك أقل تقييم إذا كان للفيلم المحذوف.
+    """
+    stats, created = _locked_stats()
+    if not created:
+        stats.total_movies -= 1
+        stats.rating_sum -= movie.rating
+        _adjust_sum(stats, 'revenue', movie.revenue, None)
+        _adjust_sum(stats, 'runtime', movie.runtime, None)
+        stale = [key for key in HIGHEST_FIELDS if getattr(stats, f'{key}_id') in (None, movie.pk)]
+        _refresh_extremes(stats, stale, min_rating=movie.rating == stats.min_rating)
+    stats.save_summary()
+
+
+def movie_deleted(sender, instance, **kwargs):
+    """مستقبل post_delete لـ Movie: تحديث الملخص ورفع إصدار البيانات وإبطال التجميعات مع معاملة الحذف"""
+    from .analytics import invalidate_rollups
+    from .cache import bump_dataset_version
+
+    with transaction.atomic():
+        remove_movie(instance)
+        bump_dataset_version()
+        invalidate_rollups()
@@ -6,4 +6,10 @@ class MovieTable(tables.Table):
         model = Movie
         template_name = "django_tables2/bootstrap.html"
         fields = ('rank', 'title', 'genre', 'director', 'year', 
-                 'runtime', 'rating', 'votes', 'revenue', 'metascore')
\ No newline at end of file
+                 'runtime', 'rating', 'votes', 'revenue', 'metascore')
+
+    def restrict_ordering(self, columns):
+        """السماح بالترتيب على الأعمدة المحددة فقط (مثل أعمدة ترقيم keyset المفهرسة)"""
+        for bound_column in self.columns:
+            if bound_column.name not in columns:
+                bound_column.column.orderable = False
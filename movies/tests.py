@@ -1,4 +1,1537 @@
-from django.test import TestCase
+import base64
+import importlib.util
+import io
+import json
+import logging
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import addModuleCleanup, mock, skipUnless
 
-# Create your tests here.
- 
\ No newline at end of file
+import openpyxl
+import pandas as pd
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.db.models.signals import post_init
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .analytics import ROLLUPS
+from .benchmarks import (
+    compare_conversions, compare_to_baseline, make_catalog_frame, make_movie_frame, movie_signature,
+    run_benchmark_suite, write_catalog
+)
+from .dimensions import genre_breakdown, rebuild_dimensions
+from .error_reports import ErrorReportWriter, check_error_report_dir, prune_error_reports, report_path
+from .exports import EXPORT_FIELDS, export_ordering, export_rows
+from .file_processor import FileProcessor
+from .filters import filter_movies
+from .jobs import STALE_JOB_MESSAGE, claim_next_job, enqueue_import, requeue_stale_jobs, run_import_job
+from .importer import (
+    IMPORT_FIELDS, MAX_ADAPTIVE_BATCH_SIZE, RATING_RANGE_MESSAGE, TITLE_REQUIRED_MESSAGE, YEAR_RANGE_MESSAGE, YEAR_REQUIRED_MESSAGE,
+    convert_dataframe, convert_records, import_chunks, import_file, import_summary, read_csv_chunks,
+    read_xlsx_chunks, resolve_batch_size
+)
+from .logging_utils import BackgroundRotatingFileHandler, RateLimitFilter, SuppressedCountFormatter
+from .models import AnalyticsRollup, Genre, ImportJob, ImportRun, Movie, MovieGenre, MovieStats, Person
+from .pagination import RESULTS_PER_PAGE, KeysetPaginator
+from .parallel import conversion_pool, import_sources
+from .profiling import QueryRecorder, store as profile_store
+from .snapshots import export_snapshot
+from .stats import HIGHEST_FIELDS, rebuild_movie_stats
+
+
+def setUpModule():
+    """تقارير الصفوف المرفوضة في الاختبارات تُكتب في مجلد مؤقت لا في MOVIES_DATA_DIR"""
+    directory = tempfile.TemporaryDirectory()
+    settings_override = override_settings(MOVIES_ERROR_REPORT_DIR=directory.name)
+    settings_override.enable()
+    addModuleCleanup(directory.cleanup)
+    addModuleCleanup(settings_override.disable)
+
+
+def forge_cursor(**payload):
+    """مؤشر keyset بقيم يحددها العميل (للتحقق من رفض المؤشرات المزورة)"""
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def create_movies(count, start=0):
+    """إنشاء أفلام اختبارية بقيم متفاوتة"""
+    Movie.objects.bulk_create([
+        Movie(
+            title=f'Movie {i}',
+            year=1950 + i % 70,
+            rating=round((i * 7) % 100 / 10, 1),
+            votes=(i * 131) % 5000,
+            revenue=None if i % 5 == 0 else (i * 17) % 900,
+            metascore=(i * 13) % 100,
+            runtime=80 + i % 60,
+        )
+        for i in range(start, start + count)
+    ])
+
+
+@contextmanager
+def count_loaded_movies():
+    """عدّ كائنات Movie التي تُنشأ من صفوف قاعدة البيانات داخل الكتلة"""
+    loaded = []
+
+    def receiver(sender, instance, **kwargs):
+        loaded.append(instance)
+
+    post_init.connect(receiver, sender=Movie)
+    try:
+        yield loaded
+    finally:
+        post_init.disconnect(receiver, sender=Movie)
+
+
+class ShowResultsQueryCountTests(TestCase):
+    """صفحة النتائج يجب أن تنفذ عدداً ثابتاً من الاستعلامات مهما كان حجم الجدول"""
+
+    # فحص الجدول + رقم إصدار البيانات + ملخص الإحصائيات مع بطاقات أعلى القيم + صفحة الجدول (keyset دون COUNT)
+    EXPECTED_QUERIES = 4
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_count_small_table(self):
+        create_movies(3)
+        rebuild_movie_stats()
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse('results'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_count_large_table(self):
+        create_movies(500)
+        rebuild_movie_stats()
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(reverse('results'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MOVIES_RESULTS_PAGINATION='offset')
+    def test_query_count_offset_pagination(self):
+        create_movies(500)
+        rebuild_movie_stats()
+        # ترقيم OFFSET يضيف استعلام COUNT(*)
+        with self.assertNumQueries(self.EXPECTED_QUERIES + 1):
+            response = self.client.get(reverse('results'), {'page': 3})
+        self.assertEqual(response.status_code, 200)
+
+    def test_stats_and_highest_values(self):
+        create_movies(200)
+        response = self.client.get(reverse('results'))
+        stats = response.context['stats']
+        highest = response.context['highest_values']
+
+        self.assertEqual(stats['total_movies'], 200)
+        self.assertEqual(stats['max_rating'], max(m.rating for m in Movie.objects.all()))
+        for key, field in [('highest_rating', 'rating'), ('highest_revenue', 'revenue'),
+                           ('highest_metascore', 'metascore'), ('most_votes', 'votes')]:
+            expected = Movie.objects.order_by(f'-{field}').first()
+            self.assertEqual(getattr(highest[key], field), getattr(expected, field))
+
+    def test_empty_table(self):
+        response = self.client.get(reverse('results'))
+        self.assertEqual(response.context['stats']['total_movies'], 0)
+        self.assertIsNone(response.context['highest_values']['highest_rating'])
+
+
+class ShowResultsRowsFetchedTests(TestCase):
+    """صفحة النتائج لا تجلب إلا صفوف الصفحة المعروضة وبطاقات أعلى القيم"""
+
+    # صفوف الصفحة (+1 لمعرفة وجود صفحة تالية في keyset) + أفلام البطاقات الأربع
+    MAX_ROWS = RESULTS_PER_PAGE + 1 + 4
+
+    def setUp(self):
+        cache.clear()
+        create_movies(300)
+        rebuild_movie_stats()
+
+    def assert_rows_fetched(self, params=None):
+        with count_loaded_movies() as loaded:
+            response = self.client.get(reverse('results'), params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(loaded), self.MAX_ROWS)
+        self.assertEqual(response.context['total_movies'], 300)
+        self.assertIn('300', response.content.decode())
+
+    def test_keyset_page(self):
+        self.assert_rows_fetched({'sort': 'year'})
+
+    @override_settings(MOVIES_RESULTS_PAGINATION='offset')
+    def test_offset_page(self):
+        self.assert_rows_fetched({'page': 5})
+
+    @override_settings(MOVIES_RESULTS_PAGINATION='offset', MOVIES_RESULTS_COUNT='exact')
+    def test_exact_count_reuses_paginator_count(self):
+        # فحص الجدول + رقم الإصدار + الملخص + COUNT المُرقِّم + صفحة الجدول، دون COUNT إضافي للشارة
+        with self.assertNumQueries(5):
+            self.assert_rows_fetched({'page': 2})
+
+
+class ResultsCacheTests(TestCase):
+    """الإحصائيات وصفحات الجدول تُقرأ من الذاكرة المؤقتة حتى الاستيراد التالي"""
+
+    def setUp(self):
+        cache.clear()
+        create_movies(30)
+        rebuild_movie_stats()
+
+    def test_cached_page_skips_queries(self):
+        self.client.get(reverse('results'))
+        # لم يبق إلا فحص وجود الجدول وقراءة رقم الإصدار
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('results'))
+        self.assertEqual(response.context['stats']['total_movies'], 30)
+
+    def test_version_bumped_by_another_process(self):
+        self.client.get(reverse('results'))
+        # ما يثبته استيراد في عملية أخرى: صفوف جديدة ورقم إصدار أعلى في قاعدة البيانات،
+        # دون أي تغيير في الذاكرة المؤقتة لهذه العملية
+        create_movies(1, start=500)
+        MovieStats.objects.update(total_movies=F('total_movies') + 1, data_version=F('data_version') + 1)
+        response = self.client.get(reverse('results'))
+        self.assertEqual(response.context['stats']['total_movies'], 31)
+
+    def test_cached_page_ignores_request_specific_params(self):
+        for mode in ('offset', 'keyset'):
+            cache.clear()
+            with override_settings(MOVIES_RESULTS_PAGINATION=mode):
+                first = self.client.get(reverse('results'), {'per_page': 5, 'job': 99}).content.decode()
+                plain = self.client.get(reverse('results')).content.decode()
+            self.assertEqual(plain, plain.replace('job=99', ''), mode)
+            self.assertNotIn('per_page=5', plain + first, mode)
+            self.assertEqual(plain.count('<tr'), first.count('<tr'), mode)
+            self.assertEqual(plain.count('<tr') - 1, RESULTS_PER_PAGE, mode)
+
+    def test_rebuild_keeps_version_increasing(self):
+        version = MovieStats.objects.get().data_version
+        rebuild_movie_stats()
+        self.assertEqual(MovieStats.objects.get().data_version, version + 1)
+
+    def test_import_invalidates_cache(self):
+        self.client.get(reverse('results'))
+        with self.captureOnCommitCallbacks(execute=True):
+            import_chunks([pd.DataFrame([{'title': 'Fresh', 'year': 2024, 'rating': 9.95}])])
+
+        response = self.client.get(reverse('results'))
+        self.assertEqual(response.context['stats']['total_movies'], 31)
+        self.assertEqual(response.context['highest_values']['highest_rating'].title, 'Fresh')
+        self.assertIn('Fresh', response.content.decode())
+
+
+class KeysetPaginationTests(TestCase):
+    """التنقل بمؤشرات keyset يجب أن يعطي نفس ترتيب الاستعلام الكامل دون تكرار أو فقد"""
+
+    def setUp(self):
+        create_movies(57)
+        # قيم فارغة ومتكررة لاختبار كسر التعادل بالمعرف
+        Movie.objects.filter(pk__in=Movie.objects.order_by('pk').values('pk')[:10]).update(genre=None)
+
+    def walk(self, sort):
+        paginator = KeysetPaginator(Movie.objects.all(), sort, per_page=10)
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+
+        # الرجوع للخلف من الصفحة الأخيرة يعيد نفس الصفحات
+        backwards = [pages[-1]]
+        while backwards[-1].has_previous:
+            backwards.append(paginator.page(backwards[-1].previous_cursor))
+        self.assertEqual(
+            [[m.pk for m in page.object_list] for page in reversed(backwards)],
+            [[m.pk for m in page.object_list] for page in pages],
+        )
+        return [movie.pk for page in pages for movie in page.object_list]
+
+    def test_matches_full_ordering(self):
+        for sort in ('-rating', 'rating', 'year', '-title', 'genre', '-genre'):
+            field = sort.lstrip('-')
+            ordering = (sort, '-pk' if sort.startswith('-') else 'pk')
+            expected = list(Movie.objects.order_by(*ordering).values_list('pk', flat=True))
+            self.assertEqual(self.walk(sort), expected, field)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Movie.objects.all(), '-rating', per_page=10)
+        first = paginator.page()
+        self.assertEqual(
+            [m.pk for m in paginator.page('not-a-cursor').object_list],
+            [m.pk for m in first.object_list],
+        )
+
+    def test_forged_cursor_values_fall_back_to_first_page(self):
+        paginator = KeysetPaginator(Movie.objects.all(), '-rating', per_page=10)
+        first = [m.pk for m in paginator.page().object_list]
+        for value in ({'a': 1}, [1], 'not-a-number'):
+            cursor = forge_cursor(s='-rating', v=value, id=1, d='next')
+            self.assertEqual([m.pk for m in paginator.page(cursor).object_list], first, value)
+
+        # القيمة النصية الصالحة تُحوَّل بنوع الحقل
+        cursor = forge_cursor(s='-rating', v='5.0', id=0, d='next')
+        expected = list(Movie.objects.filter(rating__lt=5.0).order_by('-rating', '-pk').values_list('pk', flat=True))
+        self.assertEqual([m.pk for m in paginator.page(cursor).object_list], expected[:10])
+
+
+class MovieStatsTests(TestCase):
+    """الملخص المحدَّث تدريجياً يجب أن يطابق إعادة البناء الكاملة"""
+
+    def import_frame(self, rows):
+        df = pd.DataFrame(rows)
+        return import_chunks([df])
+
+    def test_incremental_matches_rebuild(self):
+        create_movies(50)
+        rebuild_movie_stats()
+
+        result = self.import_frame([
+            {'title': 'New Hit', 'year': 2020, 'rating': 9.9, 'votes': 999999, 'revenue': 5000, 'metascore': 100},
+            {'title': 'New Flop', 'year': 2021, 'rating': 0.5, 'votes': 1},
+            # مكرر لفيلم موجود: يُتجاهل ولا يدخل في الإحصائيات
+            {'title': 'Movie 1', 'year': 1951, 'rating': 10.0},
+        ])
+        self.assertEqual(result['created'], 2)
+
+        incremental = MovieStats.objects.get(pk=MovieStats.SINGLETON_PK)
+        self.assertEqual(incremental.highest_rating.title, 'New Hit')
+        self.assertEqual(incremental.most_votes.title, 'New Hit')
+
+        rebuilt = rebuild_movie_stats()
+        for key, value in rebuilt.as_stats().items():
+            self.assertAlmostEqual(incremental.as_stats()[key], value)
+        self.assertEqual(incremental.highest_values(), rebuilt.highest_values())
+
+    def test_stats_built_on_first_import(self):
+        result = self.import_frame([{'title': 'Only', 'year': 2000, 'rating': 7.0, 'runtime': 100}])
+        self.assertEqual(result['created'], 1)
+        stats = MovieStats.objects.get(pk=MovieStats.SINGLETON_PK).as_stats()
+        self.assertEqual(stats['total_movies'], 1)
+        self.assertEqual(stats['avg_runtime'], 100)
+
+    def assert_matches_rebuild(self):
+        incremental = MovieStats.objects.get(pk=MovieStats.SINGLETON_PK)
+        rebuilt = rebuild_movie_stats()
+        for key, value in rebuilt.as_stats().items():
+            self.assertAlmostEqual(incremental.as_stats()[key], value)
+        self.assertEqual(incremental.highest_values(), rebuilt.highest_values())
+
+    def test_save_updates_stats(self):
+        create_movies(20)
+        rebuild_movie_stats()
+        Movie.objects.create(title='Saved Hit', year=2020, rating=9.9, votes=99999, revenue=5000, metascore=99)
+        self.assertEqual(MovieStats.objects.get().highest_rating.title, 'Saved Hit')
+        self.assert_matches_rebuild()
+
+        movie = Movie.objects.get(title='Saved Hit')
+        movie.rating, movie.revenue, movie.runtime = 0.1, None, 200
+        movie.save()
+        self.assertNotEqual(MovieStats.objects.get().highest_rating_id, movie.pk)
+        self.assert_matches_rebuild()
+
+    def test_delete_updates_stats(self):
+        create_movies(30)
+        stats = rebuild_movie_stats()
+        version = stats.data_version
+
+        # حذف صاحب أعلى تقييم وأقل تقييم منفرداً ثم بالجملة
+        stats.highest_rating.delete()
+        self.assert_matches_rebuild()
+        Movie.objects.order_by('rating')[:1].get().delete()
+        self.assert_matches_rebuild()
+        Movie.objects.filter(votes__gte=2500).delete()
+        stats = MovieStats.objects.get()
+        self.assertGreater(stats.data_version, version)
+        self.assertIsNotNone(stats.highest_rating)
+        self.assert_matches_rebuild()
+
+        Movie.objects.all().delete()
+        stats = MovieStats.objects.get()
+        self.assertEqual((stats.total_movies, stats.max_rating, stats.highest_rating), (0, None, None))
+
+
+class UpsertImportTests(TestCase):
+    """نمط upsert يحدّث الأفلام الموجودة بعملية bulk ويعدّ المضاف والمحدَّث ودون تغيير بدقة"""
+
+    def setUp(self):
+        create_movies(20)
+        rebuild_movie_stats()
+
+    def upsert(self, rows):
+        return import_chunks([pd.DataFrame(rows)], mode='upsert')
+
+    def test_counts_and_values(self):
+        unchanged = Movie.objects.get(title='Movie 3')
+        result = self.upsert([
+            {'title': 'Movie 1', 'year': 1951, 'rating': 9.7, 'votes': 123456, 'revenue': 1234.5},
+            {'title': 'Movie 2', 'year': 1952, 'rating': 1.0},
+            {'title': 'Movie 3', 'year': 1953, 'rating': unchanged.rating, 'votes': unchanged.votes,
+             'revenue': unchanged.revenue, 'metascore': unchanged.metascore, 'runtime': unchanged.runtime,
+             'genre': unchanged.genre, 'director': unchanged.director},
+            {'title': 'Brand New', 'year': 2024, 'rating': 8.0},
+            # نفس الفيلم مكرر في الملف: تُعتمد آخر قيمة
+            {'title': 'Movie 2', 'year': 1952, 'rating': 2.5},
+        ])
+
+        self.assertEqual((result['created'], result['updated'], result['unchanged']), (1, 2, 2))
+        self.assertEqual(Movie.objects.count(), 21)
+        updated = Movie.objects.get(title='Movie 1', year=1951)
+        self.assertEqual((updated.rating, updated.votes, updated.revenue), (9.7, 123456, 1234.5))
+        self.assertEqual(Movie.objects.get(title='Movie 2').rating, 2.5)
+        self.assertEqual(Movie.objects.get(title='Movie 3').updated_at, unchanged.updated_at)
+
+    def test_missing_columns_and_empty_cells_keep_values(self):
+        Movie.objects.filter(title='Movie 1').update(genre='Drama', director='Ann Lee')
+        before = Movie.objects.get(title='Movie 1')
+        other = Movie.objects.get(title='Movie 2')
+        result = self.upsert([
+            {'title': 'Movie 1', 'year': 1951, 'rating': 9.5, 'votes': 77},
+            {'title': 'Movie 2', 'year': 1952, 'rating': None, 'votes': 88},
+        ])
+        self.assertEqual((result['updated'], result['unchanged']), (2, 0))
+
+        after = Movie.objects.get(title='Movie 1')
+        self.assertEqual((after.rating, after.votes), (9.5, 77))
+        for field in ('revenue', 'metascore', 'runtime', 'genre', 'director'):
+            self.assertEqual(getattr(after, field), getattr(before, field), field)
+        self.assertEqual(Movie.objects.get(title='Movie 2').rating, other.rating)
+
+        rebuilt = rebuild_movie_stats().as_stats()
+        incremental = MovieStats.objects.get(pk=MovieStats.SINGLETON_PK).as_stats()
+        for key, value in rebuilt.items():
+            self.assertAlmostEqual(incremental[key], value)
+
+    def test_insert_mode_keeps_existing_values(self):
+        original = Movie.objects.get(title='Movie 1').rating
+        result = import_chunks([pd.DataFrame([{'title': 'Movie 1', 'year': 1951, 'rating': 9.7}])])
+        self.assertEqual((result['created'], result['updated'], result['unchanged']), (0, 0, 1))
+        self.assertEqual(Movie.objects.get(title='Movie 1').rating, original)
+
+    def test_stats_match_rebuild(self):
+        top = MovieStats.objects.get(pk=MovieStats.SINGLETON_PK)
+        # تخفيض قيم الأفلام صاحبة أعلى القيم يفرض إعادة حسابها، ورفع غيرها يغيّرها
+        rows = [
+            {'title': movie.title, 'year': movie.year, 'rating': 0.1, 'votes': 0, 'metascore': 0}
+            for movie in {top.highest_rating, top.most_votes, top.highest_metascore}
+        ]
+        rows.append({'title': 'Movie 7', 'year': 1957, 'rating': 9.99, 'revenue': 99999.0, 'runtime': 200})
+        self.upsert(rows)
+
+        incremental = MovieStats.objects.get(pk=MovieStats.SINGLETON_PK)
+        rebuilt = rebuild_movie_stats()
+        for key, value in rebuilt.as_stats().items():
+            self.assertAlmostEqual(incremental.as_stats()[key], value)
+        for key, movie in rebuilt.highest_values().items():
+            field = HIGHEST_FIELDS[key][0]
+            self.assertEqual(getattr(incremental.highest_values()[key], field), getattr(movie, field))
+
+
+class BatchSizeTests(TestCase):
+    """حجم الدفعة قابل للضبط أو محسوب من حدود قاعدة البيانات"""
+
+    def setUp(self):
+        self.frame = pd.DataFrame([{'title': f'Batch {i}', 'year': 2000, 'rating': 5.0} for i in range(250)])
+
+    def test_auto_respects_backend_limit(self):
+        movies, _ = convert_dataframe(self.frame)
+        fields = [field for field in Movie._meta.concrete_fields if not field.primary_key]
+        self.assertEqual(resolve_batch_size(movies, 'auto'), connection.ops.bulk_batch_size(fields, movies))
+
+    @override_settings(MOVIES_IMPORT_BATCH_SIZE=40)
+    def test_setting_and_override(self):
+        movies, _ = convert_dataframe(self.frame)
+        self.assertEqual(resolve_batch_size(movies), 40)
+        self.assertEqual(resolve_batch_size(movies, 7), 7)
+
+    def test_commit_every_groups(self):
+        result = import_chunks([self.frame], batch_size=30, commit_every=2)
+        self.assertEqual(result['created'], 250)
+        self.assertEqual(Movie.objects.count(), 250)
+        self.assertEqual(MovieStats.objects.get(pk=MovieStats.SINGLETON_PK).total_movies, 250)
+
+
+class ChunkedReadingTests(TestCase):
+    """الملفات الأكبر من جزء واحد تُقرأ على أجزاء بفهرس متصل فتبقى أرقام الصفوف صحيحة"""
+
+    ROWS = 12
+
+    def rows(self):
+        rows = [[f'Chunk {i}', 2000 + i, 5.5] for i in range(self.ROWS)]
+        rows[7][1] = 1500
+        return rows
+
+    def csv(self):
+        lines = ['Title,Year,Rating'] + [','.join(map(str, row)) for row in self.rows()]
+        return io.BytesIO('\n'.join(lines).encode())
+
+    def xlsx(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['Title', 'Year', 'Rating'])
+        for row in self.rows():
+            sheet.append(row)
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+        return buffer
+
+    def assert_chunks(self, chunks):
+        self.assertEqual([len(chunk) for chunk in chunks], [5, 5, 2])
+        self.assertEqual([index for chunk in chunks for index in chunk.index], list(range(self.ROWS)))
+        self.assertEqual(list(chunks[0].columns), ['title', 'year', 'rating'])
+        errors = [error for chunk in chunks for error in convert_dataframe(chunk)[1]]
+        self.assertEqual(errors, [(9, YEAR_RANGE_MESSAGE)])
+
+    def test_csv_chunk_boundaries(self):
+        self.assert_chunks(list(read_csv_chunks(self.csv(), chunk_size=5, engine='c')))
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow غير مثبتة')
+    def test_csv_chunk_boundaries_pyarrow(self):
+        self.assert_chunks(list(read_csv_chunks(self.csv(), chunk_size=5, engine='pyarrow')))
+
+    def test_xlsx_chunk_boundaries(self):
+        self.assert_chunks(list(read_xlsx_chunks(self.xlsx(), chunk_size=5)))
+
+    @override_settings(MOVIES_IMPORT_CHUNK_SIZE=5)
+    def test_import_reports_each_chunk(self):
+        reported = []
+        result = import_file(self.csv(), '.csv', on_chunk=lambda number, chunk: reported.append(
+            (number, chunk['rows'], chunk['created'], chunk['error_rows'])
+        ))
+        self.assertEqual((result['chunks'], result['rows'], result['created']), (3, 12, 11))
+        self.assertEqual(reported, [(1, 5, 5, []), (2, 5, 4, [(9, YEAR_RANGE_MESSAGE)]), (3, 2, 2, [])])
+
+    def test_batch_size_clamped_to_backend_limit(self):
+        movies, _ = convert_dataframe(pd.DataFrame([{'title': f'B {i}', 'year': 2000, 'rating': 1} for i in range(50)]))
+        fields = [field for field in Movie._meta.concrete_fields if not field.primary_key]
+        limit = connection.ops.bulk_batch_size(fields, movies)
+        self.assertEqual(resolve_batch_size(movies, 10 ** 6), limit)
+        self.assertEqual(resolve_batch_size(movies, '0'), 1)
+        self.assertLessEqual(resolve_batch_size(movies, 'auto'), MAX_ADAPTIVE_BATCH_SIZE)
+
+
+class ConversionTests(TestCase):
+    """التحويل العمودي (convert_records) يطبق قواعد حلقة الصفوف السابقة ورسائلها وأرقام صفوفها"""
+
+    def convert(self, rows, index=None):
+        return convert_records(pd.DataFrame(rows, index=index))
+
+    def test_valid_values_and_defaults(self):
+        records, errors = self.convert([
+            {'title': '  Padded  ', 'year': '2010.0', 'rating': '7.5', 'runtime': '95.9', 'votes': 12,
+             'revenue': '12.5', 'metascore': None, 'genre': ' Drama ', 'director': None},
+        ])
+        self.assertEqual(errors, [])
+        record = records[0]
+        self.assertEqual(
+            {field: record[field] for field in IMPORT_FIELDS},
+            {'title': 'Padded', 'year': 2010, 'rating': 7.5, 'runtime': 95, 'votes': 12,
+             'revenue': 12.5, 'metascore': 0, 'genre': 'Drama', 'director': '',
+             'actors': '', 'description': '', 'country': '', 'language': ''},
+        )
+        self.assertEqual(type(record['year']), int)
+
+    def test_rules_and_messages(self):
+        records, errors = self.convert([
+            {'title': 'Early', 'year': 1500, 'rating': 5},
+            {'title': 'Late', 'year': 2200, 'rating': 5},
+            {'title': 'Text Rating', 'year': 2000, 'rating': 'high'},
+            {'title': 'High Rating', 'year': 2000, 'rating': 10.5},
+            {'title': None, 'year': 2000, 'rating': 5},
+            {'title': '   ', 'year': 2000, 'rating': 5},
+            {'title': 'No Year', 'year': None, 'rating': 5},
+            {'title': 'Overflow', 'year': 2000, 'rating': 5, 'votes': '1e30'},
+            {'title': 'Infinite', 'year': 2000, 'rating': 5, 'runtime': float('inf')},
+            # أول خطأ بترتيب الحلقة السابقة: تحويل السنة قبل التقييم
+            {'title': 'Both', 'year': 'unknown', 'rating': 'high'},
+            {'title': 'Kept', 'year': 1888, 'rating': 0},
+        ], index=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 40])
+        self.assertEqual([record['title'] for record in records], ['Kept'])
+        self.assertEqual(errors, [
+            (2, YEAR_RANGE_MESSAGE),
+            (3, YEAR_RANGE_MESSAGE),
+            (4, 'قيمة غير صالحة في العمود rating'),
+            (5, RATING_RANGE_MESSAGE),
+            (6, TITLE_REQUIRED_MESSAGE),
+            (7, TITLE_REQUIRED_MESSAGE),
+            (8, YEAR_REQUIRED_MESSAGE),
+            (9, 'قيمة غير صالحة في العمود votes'),
+            (10, 'قيمة غير صالحة في العمود runtime'),
+            (11, 'قيمة غير صالحة في العمود year'),
+        ])
+
+    def test_missing_optional_columns_and_empty_frame(self):
+        records, errors = self.convert([{'title': 'Only Required', 'year': 2001, 'rating': 6}])
+        self.assertEqual(errors, [])
+        self.assertEqual((records[0]['genre'], records[0]['revenue'], records[0]['votes']), ('', 0.0, 0))
+        self.assertEqual(convert_records(pd.DataFrame()), ([], []))
+
+    def test_dataframe_matches_row_loop(self):
+        # نفس الأفلام ونفس أرقام صفوف الأخطاء التي تنتجها حلقة iterrows السابقة
+        self.assertTrue(compare_conversions(make_movie_frame(500, error_ratio=0.1)))
+
+
+class IngestionEngineTests(TestCase):
+    """كل مسارات الاستيراد (الصفحة، الإدارة، سطر الأوامر، FileProcessor) تمر بالمحرك نفسه"""
+
+    CSV = (
+        'Film,Release_Year,Score,Runtime (Minutes),Revenue (Millions)\n'
+        'Alias Movie,1890,7.5,95,12.5\n'
+        ',2000,5.0,,\n'
+    )
+
+    def write_csv(self):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        with handle:
+            handle.write(self.CSV)
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def test_aliases_and_rules(self):
+        result = import_file(io.BytesIO(self.CSV.encode()), '.csv')
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['error_rows'], [(3, 'عنوان الفيلم مطلوب')])
+        movie = Movie.objects.get(title='Alias Movie')
+        # نفس قاعدة السنة (1888+) في كل المسارات
+        self.assertEqual((movie.year, movie.runtime, movie.revenue), (1890, 95, 12.5))
+
+    def test_file_processor_uses_engine(self):
+        df = FileProcessor.process_file(self.write_csv())
+        self.assertEqual(FileProcessor.validate_dataframe(df), {'rating': 'rating', 'title': 'title', 'year': 'year'})
+        movies, errors = FileProcessor.create_movie_objects(FileProcessor.convert_to_movies_data(df))
+        self.assertEqual([(m.title, m.year) for m in movies], [('Alias Movie', 1890)])
+
+    def test_file_processor_alias_headers(self):
+        df = pd.DataFrame({'Film': ['Alias Film'], 'Release_Year': [1999], 'Score': [7.5], 'Genres': ['Drama']})
+        mapping = FileProcessor.validate_dataframe(df)
+        self.assertEqual(mapping, {'rating': 'Score', 'title': 'Film', 'year': 'Release_Year'})
+        self.assertEqual(list(df.columns), ['Film', 'Release_Year', 'Score', 'Genres'])
+
+        movies_data = FileProcessor.convert_to_movies_data(df)
+        self.assertEqual(
+            [(m['title'], m['year'], m['rating'], m['genre']) for m in movies_data], [('Alias Film', 1999, 7.5, 'Drama')]
+        )
+        self.assertEqual(list(df.columns), ['Film', 'Release_Year', 'Score', 'Genres'])
+
+    def test_unsupported_extension(self):
+        with self.assertRaisesMessage(ValueError, 'نوع الملف غير مدعوم'):
+            import_file(io.BytesIO(b''), '.txt')
+
+    def test_import_command(self):
+        out = io.StringIO()
+        call_command('import_movies', self.write_csv(), stdout=out)
+        self.assertTrue(Movie.objects.filter(title='Alias Movie').exists())
+        self.assertIn('الصف 3', out.getvalue())
+
+
+class ExcelUploadTests(TestCase):
+    """ملفات xlsx تُقرأ مرة واحدة على أجزاء مباشرة من الرفع دون نسخة في MEDIA_ROOT"""
+
+    def make_xlsx(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['Title', 'Year', 'Rating', 'Genre'])
+        sheet.append(['Excel One', 2001, 7.1, 'Drama'])
+        sheet.append([None, None, None, None])
+        sheet.append(['Excel Two', 1500, 6.0, None])
+        sheet.append(['Excel Three', 2003, 8.2, 'Action'])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return SimpleUploadedFile('movies.xlsx', buffer.getvalue())
+
+    def test_streamed_chunks_keep_row_numbers(self):
+        chunks = list(read_xlsx_chunks(self.make_xlsx(), chunk_size=1))
+        self.assertEqual([list(chunk.index) for chunk in chunks], [[0], [2], [3]])
+        result = import_chunks(iter(chunks))
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['error_rows'], [(4, 'سنة الإنتاج يجب أن تكون بين 1888 و 2100')])
+
+    def test_upload_without_media_copy(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with mock.patch('openpyxl.load_workbook', wraps=openpyxl.load_workbook) as load_workbook:
+                response = self.client.post(reverse('upload'), {'file': self.make_xlsx()})
+            self.assertEqual(os.listdir(media_root), [])
+        # التحقق في النموذج لا يفتح المصنف؛ يُفتح مرة واحدة عند الاستيراد
+        self.assertEqual(load_workbook.call_count, 1)
+        self.assertRedirects(response, reverse('results'), fetch_redirect_response=False)
+        self.assertEqual(Movie.objects.filter(title__startswith='Excel').count(), 2)
+
+    def test_empty_or_invalid_workbook_rejected(self):
+        buffer = io.BytesIO()
+        openpyxl.Workbook().save(buffer)
+        upload = SimpleUploadedFile('empty.xlsx', buffer.getvalue())
+        response = self.client.post(reverse('upload'), {'file': upload}, follow=True)
+        self.assertIn('لا توجد بيانات في الملف', str(list(response.context['messages'])[0]))
+
+        response = self.client.post(reverse('upload'), {'file': SimpleUploadedFile('bad.xlsx', b'not a workbook')})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['file'])
+        self.assertFalse(Movie.objects.exists())
+
+
+class CsvReaderTests(TestCase):
+    """قارئ CSV يقرأ أعمدة Movie فقط وينتج النتائج نفسها بكل محرك"""
+
+    def setUp(self):
+        df = make_movie_frame(1200)
+        df['notes'] = 'نص حر لا يحتاجه الاستيراد'
+        self.csv = df.to_csv(index=False).encode('utf-8-sig')
+
+    def read(self, engine):
+        chunks = list(read_csv_chunks(io.BytesIO(self.csv), chunk_size=500, engine=engine))
+        movies, errors = [], []
+        for chunk in chunks:
+            self.assertNotIn('notes', chunk.columns)
+            chunk_movies, chunk_errors = convert_dataframe(chunk)
+            movies += [movie_signature(movie) for movie in chunk_movies]
+            errors += chunk_errors
+        return movies, errors
+
+    def test_c_engine(self):
+        movies, errors = self.read('c')
+        self.assertEqual(len(movies) + len(errors), 1200)
+        self.assertEqual(movies, [movie_signature(m) for m in convert_dataframe(make_movie_frame(1200))[0]])
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow غير مثبتة')
+    def test_pyarrow_matches_c_engine(self):
+        self.assertEqual(self.read('pyarrow'), self.read('c'))
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow غير مثبتة')
+    def test_pyarrow_rejects_bad_value_after_first_block(self):
+        # أكبر من كتلة open_csv الأولى (1 MB)، والقيمة غير الرقمية في آخر الملف
+        lines = ['title,year,rating'] + [f'Movie {i},{1950 + i % 70},{i % 10}.5' for i in range(80000)]
+        lines += ['Bad,unknown,5', 'Worse,2001,high']
+        source = io.BytesIO('\n'.join(lines).encode())
+        errors = []
+        for chunk in read_csv_chunks(source, chunk_size=1000, engine='pyarrow'):
+            errors += convert_dataframe(chunk)[1]
+        self.assertEqual(errors, [
+            (80002, 'قيمة غير صالحة في العمود year'), (80003, 'قيمة غير صالحة في العمود rating'),
+        ])
+
+    def test_missing_required_columns_reported_from_header(self):
+        with self.assertRaisesMessage(ValueError, 'الأعمدة المطلوبة مفقودة: rating'):
+            import_file(io.BytesIO(b'title,year,description\nA,2000,x\n'), '.csv')
+
+
+class ParallelImportTests(TestCase):
+    """عدة ملفات وأوراق وأرشيفات zip تُحوَّل بالتوازي وتُحفظ بكاتب واحد بترتيبها"""
+
+    def make_workbook(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.title = 'First'
+        workbook.active.append(['Title', 'Year', 'Rating'])
+        workbook.active.append(['Sheet One', 2001, 7.0])
+        workbook.create_sheet('Empty')
+        second = workbook.create_sheet('Second')
+        second.append(['العنوان', 'سنة', 'تقييم'])
+        second.append(['Sheet Two', 2002, 8.0])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return SimpleUploadedFile('sheets.xlsx', buffer.getvalue())
+
+    def make_zip(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('a.csv', 'title,year,rating\nZip A,2001,7.0\nZip Bad,1500,6.0\n')
+            archive.writestr('nested/b.csv', 'title,year,rating\nZip B,2002,8.0\n')
+            archive.writestr('readme.txt', 'ignored')
+            archive.writestr('__MACOSX/._a.csv', 'ignored')
+        return SimpleUploadedFile('movies.zip', buffer.getvalue())
+
+    def test_all_sheets(self):
+        result = import_sources([('sheets.xlsx', self.make_workbook())], all_sheets=True)
+        self.assertEqual(result['sources'], 3)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(
+            list(Movie.objects.order_by('pk').values_list('title', flat=True)), ['Sheet One', 'Sheet Two']
+        )
+
+    def test_zip_in_worker_processes(self):
+        with conversion_pool(2) as pool:
+            self.assertEqual(pool.workers, 2)
+            result = import_sources([('movies.zip', self.make_zip())], pool=pool)
+        self.assertEqual(result['sources'], 2)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['error_rows'], [(3, 'movies.zip/a.csv: سنة الإنتاج يجب أن تكون بين 1888 و 2100')])
+        self.assertEqual(list(Movie.objects.order_by('pk').values_list('title', flat=True)), ['Zip A', 'Zip B'])
+
+    def test_upload_multiple_files(self):
+        files = [
+            SimpleUploadedFile('one.csv', b'title,year,rating\nUpload One,2001,7.0\n'),
+            SimpleUploadedFile('two.csv', b'title,year,rating\nUpload Two,2002,8.0\n'),
+        ]
+        # طلب الويب يحوّل المصادر في عمليته دون إنشاء عمليات
+        with mock.patch('movies.parallel.ProcessPoolExecutor') as executor:
+            response = self.client.post(reverse('upload'), {'file': files})
+        executor.assert_not_called()
+        self.assertRedirects(response, reverse('results'), fetch_redirect_response=False)
+        self.assertEqual(Movie.objects.filter(title__startswith='Upload').count(), 2)
+
+    def test_command_uses_worker_pool(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name in ('one', 'two'):
+                paths.append(os.path.join(directory, f'{name}.csv'))
+                with open(paths[-1], 'w', encoding='utf-8') as handle:
+                    handle.write(f'title,year,rating\nCommand {name},2001,7.0\n')
+            call_command('import_movies', *paths, workers=2, stdout=io.StringIO())
+        self.assertEqual(Movie.objects.filter(title__startswith='Command').count(), 2)
+        self.assertEqual(ImportRun.objects.get().origin, ImportRun.ORIGIN_COMMAND)
+
+    def test_parallel_chunks_streamed_from_disk(self):
+        frame = make_movie_frame(90, error_ratio=0)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('a.csv', frame.iloc[:45].to_csv(index=False))
+            archive.writestr('b.csv', frame.iloc[45:].to_csv(index=False))
+        with override_settings(MOVIES_IMPORT_CHUNK_SIZE=10), conversion_pool(2) as pool:
+            result = import_sources([('movies.zip', SimpleUploadedFile('movies.zip', buffer.getvalue()))], pool=pool)
+        self.assertEqual((result['sources'], result['chunks'], result['created']), (2, 10, 90))
+        self.assertEqual(
+            list(Movie.objects.order_by('pk').values_list('title', flat=True)), list(frame['title'])
+        )
+
+
+@skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow غير مثبتة')
+class SnapshotTests(TestCase):
+    """لقطات Parquet و Feather تُعاد قراءتها عبر المحرك الموحد بالقيم نفسها"""
+
+    def setUp(self):
+        import_chunks(iter([make_movie_frame(300, error_ratio=0)]))
+        self.signatures = [movie_signature(movie) for movie in Movie.objects.order_by('pk')]
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def round_trip(self, name):
+        path = os.path.join(self.directory.name, name)
+        self.assertEqual(export_snapshot(path, row_group_size=70), 300)
+        Movie.objects.all().delete()
+        rebuild_movie_stats()
+        with override_settings(MOVIES_IMPORT_CHUNK_SIZE=128):
+            result = import_file(path, os.path.splitext(name)[1])
+        self.assertEqual((result['chunks'], result['created'], result['error_rows']), (3, 300, []))
+        self.assertEqual([movie_signature(movie) for movie in Movie.objects.order_by('pk')], self.signatures)
+
+    def test_parquet_round_trip(self):
+        self.round_trip('movies.parquet')
+
+    def test_feather_round_trip(self):
+        self.round_trip('movies.feather')
+
+    def test_round_trip_keeps_every_movie_field(self):
+        description = ' '.join(['وصف طويل'] * 60)
+        Movie.objects.filter(pk__in=Movie.objects.order_by('pk').values('pk')[:10]).update(
+            actors='Actor A, Actor B', description=description, country='مصر', language='العربية',
+        )
+        fields = ('title', 'year', 'actors', 'description', 'country', 'language')
+        expected = list(Movie.objects.order_by('pk').values_list(*fields))
+        self.round_trip('movies.parquet')
+        self.assertEqual(list(Movie.objects.order_by('pk').values_list(*fields)), expected)
+        self.assertEqual(Movie.objects.filter(description=description).count(), 10)
+
+    def test_row_groups_read_by_pk_batches(self):
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.directory.name, 'movies.parquet')
+        # استعلام لكل مجموعة صفوف (300 = 4×70 + 20)، دون مؤشر على الجدول كاملاً
+        with self.assertNumQueries(5):
+            export_snapshot(path, row_group_size=70)
+        self.assertEqual(pq.ParquetFile(path).metadata.num_row_groups, 5)
+
+    def test_upload_parquet(self):
+        path = os.path.join(self.directory.name, 'movies.parquet')
+        export_snapshot(path)
+        Movie.objects.all().delete()
+        with open(path, 'rb') as snapshot:
+            upload = SimpleUploadedFile('movies.parquet', snapshot.read())
+        response = self.client.post(reverse('upload'), {'file': upload})
+        self.assertRedirects(response, reverse('results'), fetch_redirect_response=False)
+        self.assertEqual(Movie.objects.count(), 300)
+
+
+class ExportTests(TestCase):
+    """التصدير يتدفق بالترتيب المعروض ويمكن إعادة استيراد ملفه"""
+
+    def setUp(self):
+        import_chunks(iter([make_movie_frame(50, error_ratio=0)]))
+
+    def test_csv_streams_in_chunks(self):
+        with override_settings(MOVIES_EXPORT_CHUNK_SIZE=20):
+            response = self.client.get(reverse('export_results', args=['csv']), {'sort': 'year'})
+            parts = list(response.streaming_content)
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(parts), 3)
+        content = b''.join(parts).decode('utf-8-sig')
+        frame = pd.read_csv(io.StringIO(content))
+        self.assertEqual(len(frame), 50)
+        self.assertEqual(list(frame['title']), list(Movie.objects.order_by('year', 'pk').values_list('title', flat=True)))
+
+    def test_xlsx_round_trip(self):
+        response = self.client.get(reverse('export_results', args=['xlsx']), {'sort': '-rating'})
+        content = b''.join(response.streaming_content)
+        expected = [movie_signature(movie) for movie in Movie.objects.order_by('pk')]
+        Movie.objects.all().delete()
+        rebuild_movie_stats()
+        result = import_file(io.BytesIO(content), '.xlsx')
+        self.assertEqual(result['created'], 50)
+        self.assertEqual(sorted(movie_signature(movie) for movie in Movie.objects.all()), sorted(expected))
+
+    def test_keyset_batches_follow_sort_with_nulls(self):
+        create_movies(23)
+        Movie.objects.filter(pk__in=Movie.objects.order_by('pk').values('pk')[:7]).update(genre=None)
+        movies = Movie.objects.all()
+        for sort in ('genre', '-genre', 'title', '-year'):
+            expected = list(movies.order_by(*export_ordering(sort)).values_list(*EXPORT_FIELDS))
+            # استعلام لكل دفعة من 10 صفوف (73 صفاً)، دون مؤشر على الناتج كاملاً
+            with self.assertNumQueries(8):
+                rows = list(export_rows(movies, chunk_size=10, sort=sort))
+            self.assertEqual(rows, expected, sort)
+
+    def test_unindexed_sort_reads_in_one_query(self):
+        create_movies(23)
+        movies = Movie.objects.all()
+        for sort in ('revenue', '-runtime', 'votes'):
+            expected = list(movies.order_by(*export_ordering(sort)).values_list(*EXPORT_FIELDS))
+            # عمود بلا فهرس: فرز واحد بدلاً من مسح الجدول لكل دفعة
+            with self.assertNumQueries(1):
+                rows = list(export_rows(movies, chunk_size=10, sort=sort))
+            self.assertEqual(rows, expected, sort)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse('export_results', args=['pdf'])).status_code, 404)
+
+
+class FilterTests(TestCase):
+    """كل شرط تصفية (ومجموعاته) يُنفذ من فهرس دون مسح كامل للجدول"""
+
+    def setUp(self):
+        import_chunks(iter([make_movie_frame(400, error_ratio=0)]))
+        Movie.objects.create(title='الفيلم العربي الطويل', year=2001, rating=7.5, genre='Drama')
+        genres, self.director = Movie.objects.values_list('genre', 'director').first()
+        self.genre = genres.split(',')[0]
+
+    def cases(self):
+        return {
+            'year range': {'year_min': 1990, 'year_max': 2000},
+            'rating range': {'rating_min': 7.0, 'rating_max': 8.0},
+            'genre': {'genre': self.genre},
+            'director': {'director': self.director},
+            'title prefix': {'title': 'Movie 1'},
+            'full-text': {'q': 'Movie'},
+            'genre + year': {'genre': self.genre, 'year_min': 1990, 'year_max': 2000},
+            'genre + rating': {'genre': self.genre, 'rating_min': 7.0},
+            'director + year': {'director': self.director, 'year_min': 1990},
+            'year + rating': {'year_min': 1990, 'rating_min': 7.0},
+        }
+
+    def assert_no_full_scan(self, queryset):
+        if connection.vendor == 'mysql':
+            self.assertNotIn('"access_type": "ALL"', queryset.explain(format='json'))
+        else:
+            # SCAN مرفوض لكل الجداول (ومنها جداول الربط) عدا جدول FTS5 الافتراضي
+            scans = [line for line in queryset.explain().splitlines() if 'SCAN ' in line and 'VIRTUAL TABLE' not in line]
+            self.assertEqual(scans, [])
+
+    @skipUnless(connection.vendor in ('sqlite', 'mysql'), 'EXPLAIN خاص بـ SQLite و MySQL')
+    def test_filters_use_indexes(self):
+        for name, filters in self.cases().items():
+            with self.subTest(name):
+                queryset = filter_movies(Movie.objects.all(), filters)
+                self.assert_no_full_scan(queryset.order_by('-rating', '-pk')[:RESULTS_PER_PAGE + 1])
+
+    def test_filter_results(self):
+        queryset = filter_movies(Movie.objects.all(), {'genre': self.genre, 'year_min': 1990, 'year_max': 2000})
+        expected = [m.pk for m in Movie.objects.all() if self.genre in m.genre.split(',') and 1990 <= m.year <= 2000]
+        self.assertEqual(sorted(queryset.values_list('pk', flat=True)), sorted(expected))
+
+        prefix = filter_movies(Movie.objects.all(), {'title': 'Movie 1'})
+        self.assertTrue(prefix.exists())
+        self.assertTrue(all(title.startswith('Movie 1') for title in prefix.values_list('title', flat=True)))
+
+    def test_full_text_search(self):
+        found = filter_movies(Movie.objects.all(), {'q': 'العرب'})
+        self.assertEqual(list(found.values_list('title', flat=True)), ['الفيلم العربي الطويل'])
+        self.assertFalse(filter_movies(Movie.objects.all(), {'q': 'غير موجود'}).exists())
+
+    def test_results_page_filters(self):
+        response = self.client.get(reverse('results'), {'q': 'العربي', 'rating_min': '7'})
+        table_html = str(response.context['table_page']['html'])
+        self.assertIn('الفيلم العربي الطويل', table_html)
+        self.assertNotIn('Movie ', table_html)
+        self.assertEqual(response.context['total_movies'], 1)
+
+
+class DimensionTests(TestCase):
+    """الأنواع والمخرجون المتعددون تُقسم إلى جداول أبعاد بروابط تتبع الاستيراد والتعديل"""
+
+    def setUp(self):
+        import_chunks([pd.DataFrame([
+            {'title': 'First', 'year': 2000, 'rating': 8.0, 'genre': 'Action,Drama', 'director': 'Ann Lee'},
+            {'title': 'Second', 'year': 2001, 'rating': 6.0, 'genre': 'Drama، Comedy', 'director': 'Ann Lee, Bo Kim'},
+            {'title': 'Third', 'year': 2002, 'rating': 7.0, 'genre': 'Drama'},
+        ])])
+
+    def genres_of(self, title):
+        return sorted(Movie.objects.get(title=title).genres.values_list('name', flat=True))
+
+    def test_import_links_unique_names(self):
+        self.assertEqual(sorted(Genre.objects.values_list('name', flat=True)), ['Action', 'Comedy', 'Drama'])
+        self.assertEqual(sorted(Person.objects.values_list('name', flat=True)), ['Ann Lee', 'Bo Kim'])
+        self.assertEqual(self.genres_of('Second'), ['Comedy', 'Drama'])
+        self.assertEqual(Movie.objects.get(title='Third').directors.count(), 0)
+
+    def test_upsert_and_save_relink(self):
+        import_chunks([pd.DataFrame([{'title': 'First', 'year': 2000, 'rating': 8.0, 'genre': 'Horror'}])], mode='upsert')
+        self.assertEqual(self.genres_of('First'), ['Horror'])
+        # العمود الغائب عن الملف لا يمس المخرج الحالي ولا روابطه
+        first = Movie.objects.get(title='First')
+        self.assertEqual(first.director, 'Ann Lee')
+        self.assertEqual(list(first.directors.values_list('name', flat=True)), ['Ann Lee'])
+
+        movie = Movie.objects.get(title='Third')
+        movie.genre = 'Action'
+        movie.save()
+        self.assertEqual(self.genres_of('Third'), ['Action'])
+
+    def test_filter_and_breakdown(self):
+        drama = filter_movies(Movie.objects.all(), {'genre': 'Drama'})
+        self.assertEqual(sorted(drama.values_list('title', flat=True)), ['First', 'Second', 'Third'])
+        by_director = filter_movies(Movie.objects.all(), {'director': 'Bo Kim'})
+        self.assertEqual(list(by_director.values_list('title', flat=True)), ['Second'])
+
+        breakdown = {genre.name: (genre.movie_count, genre.avg_rating) for genre in genre_breakdown()}
+        self.assertEqual(breakdown['Drama'], (3, 7.0))
+        self.assertEqual(breakdown['Action'], (1, 8.0))
+
+    def test_rebuild_matches_import(self):
+        links = set(MovieGenre.objects.values_list('movie_id', 'genre_id'))
+        MovieGenre.objects.all().delete()
+        self.assertEqual(rebuild_dimensions(batch_size=2), 3)
+        self.assertEqual(set(MovieGenre.objects.values_list('movie_id', 'genre_id')), links)
+
+
+class AnalyticsRollupTests(TestCase):
+    """التجميعات تُحفظ بعد الاستيراد وتطابق الحساب المباشر على البيانات"""
+
+    def setUp(self):
+        self.frame = make_movie_frame(300, error_ratio=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_chunks(iter([self.frame]))
+
+    def rollup(self, name):
+        response = self.client.get(reverse('analytics_rollup', args=[name]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_refreshed_after_import(self):
+        self.assertEqual(set(AnalyticsRollup.objects.values_list('name', flat=True)), set(ROLLUPS))
+        with self.captureOnCommitCallbacks(execute=True):
+            import_chunks([pd.DataFrame([{'title': 'Late Entry', 'year': 1901, 'rating': 10.0}])])
+        years = {row['year']: row['count'] for row in self.rollup('by_year')}
+        self.assertEqual(years[1901], 1)
+        self.assertEqual(self.rollup('rating_histogram')[-1]['count'], Movie.objects.filter(rating__gte=9.5).count())
+
+    def test_values_match_movies(self):
+        movies = pd.DataFrame(list(Movie.objects.values('year', 'rating', 'revenue')))
+        self.assertEqual(sum(bucket['count'] for bucket in self.rollup('rating_histogram')), len(movies))
+
+        expected = movies.groupby('year')['rating'].agg(['count', 'mean'])
+        for row in self.rollup('by_year'):
+            self.assertEqual(row['count'], expected.loc[row['year'], 'count'])
+            self.assertAlmostEqual(row['avg_rating'], expected.loc[row['year'], 'mean'], places=2)
+
+        with_revenue = movies.dropna(subset=['revenue'])
+        correlation = self.rollup('rating_revenue_correlation')
+        self.assertEqual(correlation['count'], len(with_revenue))
+        self.assertAlmostEqual(correlation['correlation'], with_revenue['rating'].corr(with_revenue['revenue']), places=3)
+
+        genres = {row['name']: row['count'] for row in self.rollup('by_genre')}
+        self.assertEqual(genres, dict(Genre.objects.annotate(n=Count('movie_links')).values_list('name', 'n')))
+
+    def test_save_and_delete_invalidate_rollups(self):
+        self.assertEqual(self.rollup('by_year')[0]['year'], self.frame['year'].min())
+        movie = Movie(title='Admin Entry', year=1890, rating=5.0)
+        movie.save()
+        self.assertFalse(AnalyticsRollup.objects.exists())
+        years = {row['year']: row['count'] for row in self.rollup('by_year')}
+        self.assertEqual(years[1890], 1)
+
+        movie.delete()
+        self.assertFalse(AnalyticsRollup.objects.exists())
+        self.assertNotIn(1890, {row['year'] for row in self.rollup('by_year')})
+
+    def test_unknown_rollup(self):
+        response = self.client.get(reverse('analytics_rollup', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+
+class JsonApiTests(TestCase):
+    """الواجهة البرمجية: ترقيم بالمؤشرات، و 304 باستعلام رقم الإصدار فقط للبيانات غير المتغيرة"""
+
+    def setUp(self):
+        cache.clear()
+        create_movies(30)
+        rebuild_movie_stats()
+
+    def test_movie_list_cursor_pages(self):
+        url = reverse('api_movie_list')
+        first = self.client.get(url, {'sort': '-rating', 'limit': 20}).json()
+        second = self.client.get(url, {'sort': '-rating', 'limit': 20, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['results']), 20)
+        self.assertIsNone(second['next_cursor'])
+        ids = [movie['id'] for movie in first['results'] + second['results']]
+        self.assertEqual(ids, list(Movie.objects.order_by('-rating', '-pk').values_list('pk', flat=True)))
+
+        self.assertEqual(self.client.get(url, {'year_min': 'x'}).status_code, 400)
+
+        for value in ({'a': 1}, 'x'):
+            cursor = forge_cursor(s='-rating', v=value, id=1, d='next')
+            response = self.client.get(url, {'sort': '-rating', 'limit': 20, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'], first['results'])
+            self.assertEqual(self.client.get(reverse('results'), {'sort': '-rating', 'cursor': cursor}).status_code, 200)
+
+    def test_detail_and_stats(self):
+        movie = Movie.objects.first()
+        data = self.client.get(reverse('api_movie_detail', args=[movie.pk])).json()
+        self.assertEqual((data['id'], data['title']), (movie.pk, movie.title))
+        self.assertEqual(self.client.get(reverse('api_movie_detail', args=[0])).status_code, 404)
+
+        stats = self.client.get(reverse('api_stats')).json()
+        self.assertEqual(stats['total_movies'], 30)
+        self.assertEqual(stats['highest_values']['highest_rating']['rating'], stats['max_rating'])
+
+    def test_conditional_get(self):
+        url = reverse('api_movie_list')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        # رقم الإصدار فقط (استعلام واحد بالمفتاح الأساسي)
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_chunks([pd.DataFrame([{'title': 'New Arrival', 'year': 2024, 'rating': 9.9}])])
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+        # التعديل من عملية أخرى يظهر هنا أيضاً رغم الذاكرة المؤقتة المحلية
+        cache.clear()
+        movie = Movie.objects.get(title='New Arrival')
+        movie.rating = 1.0
+        movie.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 200)
+
+
+class ImportRunTests(TestCase):
+    """كل استيراد من الصفحة أو سطر الأوامر يُسجل زمن مراحله في ImportRun"""
+
+    def upload(self, content):
+        upload = SimpleUploadedFile('movies.csv', content.encode(), content_type='text/csv')
+        return self.client.post(reverse('upload'), {'file': upload, 'mode': 'insert'})
+
+    def test_upload_records_stages(self):
+        frame = make_movie_frame(120, error_ratio=0)
+        self.upload(frame.to_csv(index=False))
+
+        run = ImportRun.objects.get()
+        self.assertEqual((run.origin, run.status, run.rows, run.created_count), ('upload', 'done', 120, 120))
+        self.assertEqual(list(run.stages), ['read', 'convert', 'write'])
+        self.assertEqual(run.stages['write']['rows'], 120)
+        self.assertGreater(run.stages['write']['queries'], 0)
+        self.assertGreaterEqual(run.query_count, run.stages['write']['queries'])
+
+    def test_failed_import_is_recorded(self):
+        self.upload('name,score\nx,1\n')
+        self.assertEqual(ImportRun.objects.get().status, ImportRun.STATUS_FAILED)
+
+    def test_no_profile_outside_record_import(self):
+        import_chunks([make_movie_frame(10, error_ratio=0)])
+        self.assertFalse(ImportRun.objects.exists())
+
+    def test_stage_stats_command(self):
+        for _ in range(3):
+            self.upload(make_movie_frame(20, error_ratio=0).to_csv(index=False))
+        out = io.StringIO()
+        call_command('import_stage_stats', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(any(line.startswith('write') for line in lines))
+        self.assertTrue(any(line.startswith('total') and line.split()[1] == '3' for line in lines))
+
+
+class AdminImportTests(TestCase):
+    """الاستيراد من لوحة الإدارة يُقاس في ImportRun ويكتب تقرير الصفوف المرفوضة"""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(MOVIES_ERROR_REPORT_DIR=self.directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        self.url = reverse('admin:movies_movie_import')
+
+    def upload(self, content):
+        upload = SimpleUploadedFile('movies.csv', content.encode(), content_type='text/csv')
+        return self.client.post(self.url, {'file': upload, 'mode': 'insert'}, follow=True)
+
+    def test_import_records_run_and_error_report(self):
+        frame = make_movie_frame(20, error_ratio=0)
+        frame.loc[0, 'title'] = None
+        response = self.upload(frame.to_csv(index=False))
+
+        run = ImportRun.objects.get()
+        self.assertEqual((run.origin, run.status, run.created_count, run.error_count), ('admin', 'done', 19, 1))
+        message = str(list(response.context['messages'])[0])
+        self.assertIn('/imports/errors/', message)
+
+    def test_failures_are_reported(self):
+        response = self.upload('name,score\nx,1\n')
+        self.assertEqual(ImportRun.objects.get().status, ImportRun.STATUS_FAILED)
+        self.assertIn('الأعمدة المطلوبة مفقودة', str(list(response.context['messages'])[0]))
+
+        with mock.patch('movies.admin.import_uploads', side_effect=RuntimeError('boom')), \
+                self.assertLogs('movies.admin', level='ERROR'):
+            response = self.upload(make_movie_frame(5, error_ratio=0).to_csv(index=False))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(str(list(response.context['messages'])[0]), 'حدث خطأ غير متوقع أثناء معالجة الملف')
+        self.assertEqual(ImportRun.objects.filter(status=ImportRun.STATUS_FAILED).count(), 2)
+
+
+class ImportJobTests(TestCase):
+    """طابور مهام الاستيراد: الحجز الحصري، التنفيذ، الفشل، واستعادة المهام العالقة"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.directory.name,
+            MOVIES_ERROR_REPORT_DIR=os.path.join(self.directory.name, 'errors')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def enqueue(self, content, name='movies.csv'):
+        return enqueue_import(SimpleUploadedFile(name, content.encode(), content_type='text/csv'))
+
+    def test_enqueue_and_claim_is_exclusive(self):
+        first = self.enqueue(make_movie_frame(5, error_ratio=0).to_csv(index=False))
+        second = self.enqueue(make_movie_frame(5, error_ratio=0).to_csv(index=False))
+        self.assertEqual(first.status, ImportJob.STATUS_QUEUED)
+        self.assertTrue(os.path.exists(first.file.path))
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (first.pk, ImportJob.STATUS_RUNNING, 1))
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_run_job_and_status_endpoint(self):
+        frame = make_movie_frame(40, error_ratio=0)
+        frame.loc[0, 'title'] = None
+        job = self.enqueue(frame.to_csv(index=False))
+        job = run_import_job(claim_next_job())
+
+        self.assertEqual((job.status, job.progress, job.created_count, job.error_count), ('done', 100, 39, 1))
+        self.assertEqual(Movie.objects.count(), 39)
+        self.assertFalse(job.file)
+        self.assertEqual(ImportRun.objects.get().origin, ImportRun.ORIGIN_JOB)
+
+        data = self.client.get(reverse('import_status', args=[job.pk])).json()
+        self.assertEqual((data['status'], data['rows_processed'], data['finished']), ('done', 40, True))
+        self.assertEqual(data['error_report_url'], reverse('import_error_report', args=[job.error_report_id]))
+
+    @override_settings(MOVIES_IMPORT_WORKERS=2)
+    def test_zip_job_converted_in_worker_pool(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('a.csv', 'title,year,rating\nJob A,2001,7.0\n')
+            archive.writestr('b.csv', 'title,year,rating\nJob B,2002,8.0\n')
+        enqueue_import(SimpleUploadedFile('movies.zip', buffer.getvalue()))
+        job = run_import_job(claim_next_job())
+        self.assertEqual((job.status, job.created_count), (ImportJob.STATUS_DONE, 2))
+
+    def test_invalid_file_fails_job(self):
+        job = self.enqueue('name,score\nx,1\n')
+        path = job.file.path
+        job = run_import_job(claim_next_job())
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        # الفشل نهائي: لا يبقى الملف المرفوع على القرص
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImportJob.objects.get(pk=job.pk).file)
+        self.assertTrue(job.message)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(ImportRun.objects.get().status, ImportRun.STATUS_FAILED)
+        self.assertTrue(self.client.get(reverse('import_status', args=[job.pk])).json()['finished'])
+
+    @override_settings(MOVIES_IMPORT_JOB_TIMEOUT=60, MOVIES_IMPORT_JOB_MAX_ATTEMPTS=2)
+    def test_stale_running_job_is_requeued_then_failed(self):
+        job = self.enqueue(make_movie_frame(5, error_ratio=0).to_csv(index=False))
+        path = job.file.path
+        claim_next_job()
+        self.assertEqual(requeue_stale_jobs(), (0, 0))
+
+        # العامل انهار: لا نشاط منذ أكثر من المهلة
+        stale = timezone.now() - timedelta(minutes=5)
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=stale, rows_processed=3)
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.attempts, claimed.rows_processed), (job.pk, 2, 0))
+
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        self.assertEqual(requeue_stale_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message), (ImportJob.STATUS_FAILED, STALE_JOB_MESSAGE))
+        self.assertFalse(job.file)
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(claim_next_job())
+
+
+class BenchmarkSuiteTests(TestCase):
+    """مولّد الكتالوج الاصطناعي ومجموعة القياس وخط الأساس"""
+
+    def test_catalog_frame(self):
+        df = make_catalog_frame(1000, error_ratio=0.05, duplicate_ratio=0.1)
+        self.assertEqual(len(df), 1000)
+        self.assertTrue(df['title'].str.contains('[\u0600-\u06FF]', na=False).any())
+        self.assertGreaterEqual(df.duplicated(['title', 'year']).sum(), 100)
+        self.assertTrue(make_catalog_frame(1000).equals(make_catalog_frame(1000)))
+
+        movies, errors = convert_dataframe(df.copy())
+        self.assertTrue(errors)
+        self.assertEqual(len(movies) + len(errors), len(df))
+
+    def test_catalog_files_round_trip(self):
+        df = make_catalog_frame(50)
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in ('csv', 'xlsx'):
+                path = write_catalog(df, os.path.join(directory, f'catalog.{fmt}'))
+                result = import_file(path, f'.{fmt}')
+                self.assertEqual(result['rows'], 50)
+                Movie.objects.all().delete()
+
+    def test_suite_and_baseline(self):
+        create_movies(5)
+        report = run_benchmark_suite(sizes=[100], formats=['csv'], repeat=1)
+        self.assertEqual([row['case'] for row in report['results']],
+                         ['parse', 'convert', 'bulk_create', 'upload', 'results_page'])
+        self.assertEqual(report['environment']['database'], connection.vendor)
+        # الأفلام المضافة أثناء القياس تُحذف
+        self.assertEqual(Movie.objects.count(), 5)
+        self.assertFalse(ImportRun.objects.exists())
+
+        slower = {**report, 'results': [{**row, 'seconds': row['seconds'] * 2} for row in report['results']]}
+        self.assertEqual(len(compare_to_baseline(slower, report)), 5)
+        self.assertEqual(compare_to_baseline(report, slower), [])
+
+
+@override_settings(MOVIES_PROFILE_REQUESTS=True)
+class RequestProfilingTests(TestCase):
+    """الوسيط الاختياري يقيس استعلامات كل طلب ويعرضها في Server-Timing وصفحة القياس"""
+
+    def setUp(self):
+        cache.clear()
+        profile_store.clear()
+        create_movies(30)
+        rebuild_movie_stats()
+
+    def test_server_timing_and_summary(self):
+        response = self.client.get(reverse('results'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+.*, total;dur=[\d.]+')
+
+        summary = {route['route']: route for route in profile_store.summary()}
+        self.assertEqual(summary['GET /results/']['requests'], 1)
+        self.assertGreater(summary['GET /results/']['max_queries'], 0)
+
+        # الطلبات المحلية (مثل ما يمرره وكيل عكسي) لا تكفي خارج DEBUG
+        self.assertEqual(self.client.get(reverse('request_profile')).status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertContains(self.client.get(reverse('request_profile')), 'GET /results/')
+            self.assertEqual(self.client.get(reverse('request_profile'), REMOTE_ADDR='10.1.2.3').status_code, 404)
+
+        from django.contrib.auth import get_user_model
+        self.client.force_login(get_user_model().objects.create_user('staff', password='password', is_staff=True))
+        self.assertContains(self.client.get(reverse('request_profile'), REMOTE_ADDR='10.1.2.3'), 'GET /results/')
+        with override_settings(MOVIES_PROFILE_REQUESTS=False):
+            self.assertEqual(self.client.get(reverse('request_profile')).status_code, 404)
+
+    def test_repeated_queries_detected(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in range(4):
+                Movie.objects.filter(pk=pk).exists()
+        self.assertEqual(len(recorder.queries), 4)
+        self.assertEqual(recorder.most_repeated()[1], 4)
+
+    @override_settings(MOVIES_PROFILE_REQUESTS=False)
+    def test_disabled_by_default(self):
+        self.assertFalse(self.client.get(reverse('results')).has_header('Server-Timing'))
+
+
+class LoggingPipelineTests(TestCase):
+    """كتابة السجل في الخلفية مع التدوير، والحد من التحذيرات المتكررة، وتقرير الأخطاء المحدود"""
+
+    def record(self, message, level=logging.WARNING, name='movies.test'):
+        return logging.LogRecord(name, level, __file__, 1, message, None, None)
+
+    def test_background_handler_rotates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.log')
+            handler = BackgroundRotatingFileHandler(path, max_bytes=200, backup_count=2)
+            for number in range(20):
+                handler.handle(self.record(f'message number {number}'))
+            handler.close()
+            self.assertTrue(os.path.exists(f'{path}.1'))
+            with open(path, encoding='utf-8') as handle:
+                self.assertIn('message number 19', handle.read())
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = BackgroundRotatingFileHandler(os.path.join(directory, 'app.log'), queue_size=2)
+            handler.listener.stop()
+            for number in range(5):
+                handler.handle(self.record(f'message {number}'))
+            self.assertEqual(handler.dropped, 3)
+            handler.close()
+            with open(os.path.join(directory, 'app.log'), encoding='utf-8') as handle:
+                self.assertIn('3 log records dropped', handle.read())
+
+    @skipUnless(hasattr(os, 'fork'), 'fork غير متاح')
+    def test_forked_child_starts_its_own_listener(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = BackgroundRotatingFileHandler(os.path.join(directory, 'app-{pid}.log'))
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    handler.handle(self.record('from child'))
+                    started = handler.listener is not None and handler.listener._thread is not None
+                    handler.close()
+                finally:
+                    os._exit(0 if started else 1)
+            _, status = os.waitpid(pid, 0)
+            handler.close()
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            with open(os.path.join(directory, f'app-{pid}.log'), encoding='utf-8') as handle:
+                self.assertIn('from child', handle.read())
+            self.assertTrue(os.path.exists(os.path.join(directory, f'app-{os.getpid()}.log')))
+
+    def test_rate_limit_samples_similar_messages(self):
+        limiter = RateLimitFilter(rate=10, per=60, sample_every=5)
+        records = [self.record(f'Import chunk {number}: failed') for number in range(25)]
+        passed = [record for record in records if limiter.filter(record)]
+        self.assertEqual(len(passed), 13)
+        # العدد في خاصية مستقلة؛ نص الرسالة المشترك بين المعالجات لا يتغير
+        self.assertEqual((passed[10].suppressed, passed[10].msg), (4, 'Import chunk 14: failed'))
+        formatted = SuppressedCountFormatter('{levelname} {message}', style='{').format(passed[10])
+        self.assertEqual(formatted, 'WARNING Import chunk 14: failed [+4 similar messages suppressed]')
+        self.assertTrue(limiter.filter(self.record('Import chunk 99: failed', level=logging.ERROR)))
+
+    def test_rate_limit_only_applies_to_warnings(self):
+        limiter = RateLimitFilter(rate=2, per=60, sample_every=100)
+        for level in (logging.DEBUG, logging.INFO, logging.ERROR):
+            records = [self.record(f'Processed chunk {number}', level=level) for number in range(10)]
+            self.assertTrue(all(limiter.filter(record) for record in records))
+        warnings = [self.record(f'Processed chunk {number}') for number in range(10)]
+        self.assertEqual(sum(limiter.filter(record) for record in warnings), 2)
+
+    @override_settings(MOVIES_ERROR_REPORT_ROWS=2)
+    def test_error_rows_go_to_bounded_report(self):
+        frame = make_movie_frame(50, error_ratio=0)
+        frame.loc[:4, 'title'] = None
+        upload = SimpleUploadedFile('movies.csv', frame.to_csv(index=False).encode(), content_type='text/csv')
+        with self.assertLogs('movies', level='INFO') as logs:
+            self.client.post(reverse('upload'), {'file': upload, 'mode': 'insert'})
+        self.assertFalse(any('عنوان الفيلم مطلوب' in line for line in logs.output))
+
+        report = ImportRun.objects.get().error_report
+        self.assertEqual((report['total'], report['truncated'], len(report['rows'])), (5, True, 2))
+        self.assertEqual(report['rows'][0], {'row': 2, 'message': 'عنوان الفيلم مطلوب'})
+
+
+class ErrorReportTests(TestCase):
+    """كل الصفوف المرفوضة تُكتب إلى تقرير CSV قابل للتنزيل، وأولها فقط يبقى في الذاكرة"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(MOVIES_ERROR_REPORT_DIR=self.directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_upload(self):
+        frame = make_movie_frame(30, error_ratio=0)
+        frame.loc[:2, 'title'] = None
+        frame.loc[3, 'year'] = 'unknown'
+        frame.loc[4, 'rating'] = 11.5
+        return SimpleUploadedFile('movies.csv', frame.to_csv(index=False).encode(), content_type='text/csv')
+
+    @override_settings(MOVIES_IMPORT_ERROR_ROWS_IN_MEMORY=2)
+    def test_error_rows_capped_in_memory(self):
+        with ErrorReportWriter('movies.csv') as report:
+            result = import_file(self.make_upload(), '.csv', error_report=report)
+        self.assertEqual((result['error_count'], len(result['error_rows']), report.count), (5, 2, 5))
+        self.assertIn('تم تجاهل 5 صفاً', import_summary(result))
+
+    def test_upload_links_downloadable_report(self):
+        response = self.client.post(reverse('upload'), {'file': self.make_upload(), 'mode': 'insert'}, follow=True)
+        message = str(list(response.context['messages'])[0])
+        report_id = message.split('/imports/errors/')[1][:32]
+        self.assertIn(reverse('import_error_report', args=[report_id]), message)
+        self.assertEqual(ImportRun.objects.get().error_count, 5)
+
+        response = self.client.get(reverse('import_error_report', args=[report_id]))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = pd.read_csv(io.BytesIO(b''.join(response.streaming_content)), encoding='utf-8-sig')
+        self.assertEqual(list(rows.columns), ['source', 'row', 'column', 'code', 'message'])
+        self.assertEqual(
+            list(rows[['row', 'column', 'code']].itertuples(index=False, name=None)),
+            [(2, 'title', 'required'), (3, 'title', 'required'), (4, 'title', 'required'),
+             (5, 'year', 'invalid_number'), (6, 'rating', 'out_of_range')]
+        )
+
+    def test_parallel_messages_keep_source(self):
+        with ErrorReportWriter() as report:
+            report.write([(7, 'a.csv: سنة الإنتاج مطلوبة'), (8, 'b.csv: خطأ آخر')])
+        rows = pd.read_csv(report.path, encoding='utf-8-sig', keep_default_na=False)
+        self.assertEqual(
+            list(rows[['source', 'row', 'column', 'code']].itertuples(index=False, name=None)),
+            [('a.csv', 7, 'year', 'required'), ('', 8, '', 'invalid')]
+        )
+
+    def test_missing_or_invalid_report_is_404(self):
+        for report_id in ('0' * 32, 'not-a-report'):
+            response = self.client.get(reverse('import_error_report', args=[report_id]))
+            self.assertEqual(response.status_code, 404)
+        self.assertIsNone(report_path('../settings'))
+
+    def test_report_dir_system_check(self):
+        with override_settings(MOVIES_ERROR_REPORT_DIR='/srv/movies/import_errors'):
+            self.assertEqual(check_error_report_dir(), [])
+        with override_settings(MOVIES_ERROR_REPORT_DIR=os.path.join(tempfile.gettempdir(), 'reports')):
+            self.assertEqual([issue.id for issue in check_error_report_dir()], ['movies.W001'])
+        with override_settings(MOVIES_ERROR_REPORT_DIR=None):
+            self.assertEqual([issue.id for issue in check_error_report_dir()], ['movies.E001'])
+            with self.assertRaises(ImproperlyConfigured):
+                ErrorReportWriter()
+
+    def test_old_reports_are_pruned(self):
+        with ErrorReportWriter() as report:
+            report.write([(2, 'عنوان الفيلم مطلوب')])
+        os.utime(report.path, (0, 0))
+        self.assertEqual(prune_error_reports(), 1)
+        self.assertFalse(os.path.exists(report.path))
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.decorators.csrf import csrf_exempt  # لإستثناء CSRF عند الحاجة
@@ -10,6 +10,26 @@ urlpatterns = [
     
     # صفحة عرض النتائج
     path('results/', views.show_results, name='results'),
+
+    # تنزيل النتائج بالترتيب الحالي (CSV أو Excel) كاستجابة متدفقة
+    path('results/export.<str:fmt>', views.export_results, name='export_results'),
+
+    # واجهة JSON للقراءة فقط (ETag و 304 للبيانات غير المتغيرة)
+    path('api/movies/', api.movie_list, name='api_movie_list'),
+    path('api/movies/<int:movie_id>/', api.movie_detail, name='api_movie_detail'),
+    path('api/stats/', api.stats, name='api_stats'),
+
+    # تجميعات لوحة التحليلات المحسوبة بعد كل استيراد (JSON)
+    path('analytics/<slug:name>.json', views.analytics_rollup, name='analytics_rollup'),
+
+    # قياس الطلبات والاستعلامات (MOVIES_PROFILE_REQUESTS، من الجهاز المحلي فقط)
+    path('debug/requests/', views.request_profile, name='request_profile'),
+
+    # حالة مهمة الاستيراد الخلفية (JSON)
+    path('imports/<int:job_id>/status/', views.import_status, name='import_status'),
+
+    # تنزيل تقرير الصفوف المرفوضة في عملية استيراد (CSV)
+    path('imports/errors/<str:report_id>.csv', views.import_error_report, name='import_error_report'),
     
     # صفحة تفاصيل الفيلم (إضافة اختيارية)
  
@@ -1,25 +1,21 @@
 # movies/utils.py
+import os
+
 import pandas as pd
 import logging
 
+from .importer import check_required_columns, read_file_chunks
+
 logger = logging.getLogger(__name__)
 
 def handle_uploaded_file(file):
+    """قراءة الملف المرفوع كاملاً عبر قراء محرك الاستيراد الموحد مع التحقق من الأعمدة"""
     try:
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file)
-        elif file.name.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(file)
-        else:
-            raise ValueError("نوع الملف غير مدعوم")
-            
-        required_columns = ['title', 'year', 'rating']
-        if not all(col in df.columns for col in required_columns):
-            missing = [col for col in required_columns if col not in df.columns]
-            raise ValueError(f"أعمدة مفقودة: {missing}")
-            
+        ext = os.path.splitext(file.name)[1].lower()
+        df = pd.concat(list(read_file_chunks(file, ext)), ignore_index=True)
+        check_required_columns(df)
         return df
         
     except Exception as e:
         logger.error(f"خطأ في معالجة الملف: {str(e)}")
-        raise
\ No newline at end of file
+        raise
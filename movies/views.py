@@ -3,25 +3,53 @@ from django_tables2 import RequestConfig
 from django.db.models import Avg, Max, Min, Count
 from django.conf import settings
 from django.contrib import messages
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import gettext_lazy as _, get_language
+from django.utils.functional import SimpleLazyObject
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.db import transaction, IntegrityError, DatabaseError, OperationalError
 from .forms import UploadFileForm
 from .tables import MovieTable
 from .models import Movie
+from .stats import get_movie_stats
+from .cache import get_dataset_version, get_or_set as cache_get_or_set
+from .filters import MovieFilterForm, filter_cache_key, filter_movies
+from .pagination import (
+    KEYSET_COLUMNS, RESULTS_PER_PAGE, KeysetPaginator, KeysetTableData, get_pagination_mode, get_total_count
+)
 import pandas as pd
 import os
 import logging
 import traceback
 import time
-from django.http import HttpResponse
+from urllib.parse import urlencode
+from django.http import HttpResponse, QueryDict
 from django.db import connection
+import copy
 
 
 
 logger = logging.getLogger(__name__)
 
+# معاملات الرابط التي تدخل في مفتاح صفحة الجدول المخزنة (مع شروط التصفية المنظفة)
+TABLE_PAGE_PARAMS = ('sort', 'page', 'cursor')
+
+
+def table_page_request(request, filters):
+    """
+    نسخة من الطلب لا تحوي في GET إلا المعاملات التي يُبنى منها مفتاح صفحة الجدول
+    المخزنة، فلا تحمل روابط الترتيب والترقيم المخزنة معاملات طلب بعينه (مثل job)
+    ولا يغيّر ?per_page= حجم الصفحة المخزنة لكل الطلبات.
+    """
+    params = QueryDict(urlencode(filters), mutable=True)
+    for name in TABLE_PAGE_PARAMS:
+        if request.GET.get(name):
+            params[name] = request.GET[name]
+    table_request = copy.copy(request)
+    table_request.GET = params
+    return table_request
+
+
 def show_results(request):
     """عرض صفحة نتائج تحليل الأفلام مع تحسينات التعامل مع قاعدة البيانات"""
     try:
@@ -29,36 +57,80 @@ def show_results(request):
         if 'movies_movie' not in connection.introspection.table_names():
             raise DatabaseError("جدول الأفلام غير موجود في قاعدة البيانات")
         
-        # استخدام select_related/prefetch_related إذا كانت هناك علاقات
-        movies = Movie.objects.all()
+        # شروط التصفية من الرابط (GET)؛ كل شرط يُنفذ من فهرس (movies.filters)
+        filter_form = MovieFilterForm(request.GET)
+        filters = filter_form.active_filters()
+        movies = filter_movies(Movie.objects.all(), filters)
         
-        # حساب الإحصائيات مع التعامل مع القيم الفارغة
-        stats = {
-            'avg_rating': movies.aggregate(avg=Avg('rating'))['avg'] or 0,
-            'max_rating': movies.aggregate(max=Max('rating'))['max'] or 0,
-            'min_rating': movies.aggregate(min=Min('rating'))['min'] or 0,
-            'avg_revenue': movies.aggregate(avg=Avg('revenue'))['avg'] or 0,
-            'total_movies': movies.count()
-        }
-        
-        # الحصول على أعلى القيم مع التحقق من وجود بيانات
-        highest_values = {
-            'highest_rating': movies.order_by('-rating').first(),
-            'highest_revenue': movies.order_by('-revenue').first(),
-            'highest_metascore': movies.order_by('-metascore').first(),
-            'most_votes': movies.order_by('-votes').first(),
-        }
+        # قراءة الإحصائيات وأفلام أعلى القيم من الملخص المخزن (استعلام واحد بغض النظر عن حجم الجدول)،
+        # مع تخزينها مؤقتاً حتى الكتابة التالية (رقم الإصدار من قاعدة البيانات مرة واحدة للطلب)
+        version = get_dataset_version()
+        movie_stats = SimpleLazyObject(get_movie_stats)
+        stats = cache_get_or_set('stats', lambda: movie_stats.as_stats(), version=version)
+        highest_values = cache_get_or_set('highest_values', lambda: movie_stats.highest_values(), version=version)
+
+        # إعداد الجدول مع التعامل مع الأخطاء، وتخزين صفحة الجدول المعروضة مؤقتاً
+        pagination_mode = get_pagination_mode()
+        sort = request.GET.get('sort', '')
+        cursor = request.GET.get('cursor', '')
+
+        def render_table_page():
+            table_request = table_page_request(request, filters)
+            if pagination_mode == 'keyset':
+                # ترقيم keyset: استعلام واحد للصفحة دون OFFSET ولا COUNT(*)
+                paginator = KeysetPaginator(movies, sort)
+                page = paginator.page(cursor)
+                table = MovieTable(KeysetTableData(page.object_list), order_by=paginator.sort)
+                table.restrict_ordering(KEYSET_COLUMNS)
+                return {
+                    'html': table.as_html(table_request),
+                    'sort': paginator.sort,
+                    'next_cursor': page.next_cursor,
+                    'previous_cursor': page.previous_cursor,
+                    # عدد النتائج المصفاة (من الفهرس)؛ عدد الكتالوج الكامل يأتي من الملخص
+                    'total': movies.count() if filters else None,
+                }
 
-        # إعداد الجدول مع التعامل مع الأخطاء
-        table = MovieTable(movies)
-        RequestConfig(request, paginate={'per_page': 25}).configure(table)
+            table = MovieTable(movies)
+            RequestConfig(table_request, paginate={'per_page': RESULTS_PER_PAGE}).configure(table)
+            # عدد المُرقِّم محسوب أصلاً (COUNT واحد) فيُعاد استخدامه بدلاً من عدّ صفوف الجدول
+            return {'html': table.as_html(table_request), 'total': table.paginator.count}
+
+        table_page = cache_get_or_set(
+            'table_page',
+            render_table_page,
+            pagination_mode,
+            sort,
+            request.GET.get('page', '1'),
+            cursor,
+            filter_cache_key(filters),
+            get_language(),
+            version=version,
+        )
         
         context = {
-            'table': table,
+            'table_page': table_page,
+            'total_movies': (
+                table_page['total'] if filters
+                else get_total_count(movies, stats['total_movies'], table_page.get('total'))
+            ),
+            'filter_form': filter_form,
+            'filters': filters,
+            # شروط التصفية لإضافتها إلى روابط الترقيم والتصدير
+            'filter_query': urlencode(filters),
             'stats': stats,
             'highest_values': highest_values,
+            # روابط التصدير تحمل ترتيب الجدول المعروض
+            'export_sort': table_page.get('sort') or sort,
             'messages': messages.get_messages(request)
         }
+
+        # متابعة مهمة استيراد خلفية إذا تم التحويل من صفحة الرفع
+        job_id = request.GET.get('job')
+        if job_id and job_id.isdigit():
+            job = ImportJob.objects.filter(pk=job_id).first()
+            if job:
+                context['import_job'] = job_status(job)
         
         return render(request, 'movies/results.html', context)
         
@@ -76,24 +148,32 @@ def show_results(request):
             'error_type': 'general',
             'error_details': str(e)
         })
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django_tables2 import RequestConfig
 from django.db.models import Avg, Max, Min, Count
 from django.conf import settings
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.db import transaction, IntegrityError, DatabaseError, OperationalError
+from django.urls import reverse
 from .forms import UploadFileForm
 from .tables import MovieTable
-from .models import Movie
+from .models import Movie, ImportJob, ImportRun
+from .instrumentation import record_import
+from .importer import get_commit_every, import_summary
+from .jobs import enqueue_import, job_status, should_run_in_background
+from .parallel import import_uploads
+from .exports import EXPORT_FORMATS, export_response
+from .error_reports import ErrorReportWriter, report_path
+from .analytics import ROLLUPS, get_rollup
+from .profiling import LATENCY_BUCKETS_MS, get_window, profiling_enabled, store as profile_store
+from contextlib import nullcontext
 import pandas as pd
 import os
 import logging
 import traceback
-import time
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.html import format_html
 from django.db import connection
 from django.core.exceptions import ValidationError  # تمت إضافته
 
@@ -112,115 +192,71 @@ def upload_file(request):
                 logger.error(f"Form error in {field}: {error}")
         return render(request, 'movies/upload.html', {'form': form})
 
-    file = request.FILES['file']
-    temp_path = None
-    
+    files = form.cleaned_data['file']
+    all_sheets = form.cleaned_data.get('all_sheets', False)
+    error_report = None
+
     try:
         # === التحقق من وجود الجدول أولاً ===
         if 'movies_movie' not in connection.introspection.table_names():
             raise DatabaseError("جدول الأفلام غير موجود في قاعدة البيانات")
 
+        # === الملفات الكبيرة (أو بطلب المستخدم) تُحوَّل إلى مهام خلفية (مهمة لكل ملف) ===
+        if any(should_run_in_background(file, form.cleaned_data.get('background')) for file in files):
+            jobs = [
+                enqueue_import(
+                    file,
+                    mode=form.cleaned_data['mode'],
+                    batch_size=form.cleaned_data.get('batch_size'),
+                    all_sheets=all_sheets,
+                )
+                for file in files
+            ]
+            messages.info(request, f'تمت إضافة {", ".join(job.original_name for job in jobs)} إلى طابور الاستيراد')
+            return redirect(f"{reverse('results')}?job={jobs[-1].pk}")
+
         # === معالجة الملف ===
-        file_name = file.name
-        file_ext = os.path.splitext(file_name)[1].lower()
-        
-        # حفظ الملف مؤقتاً
-        temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_uploads')
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_filename = f"upload_{int(time.time())}{file_ext}"
-        temp_path = default_storage.save(f'temp_uploads/{temp_filename}', ContentFile(file.read()))
-        file_path = default_storage.path(temp_path)
-
-        # قراءة الملف بناءً على نوعه
-        try:
-            if file_ext == '.csv':
-                df = pd.read_csv(file_path, encoding='utf-8-sig')
-            else:
-                # محاولة قراءة الملف بكل المحركات المتاحة
-                try:
-                    engine = 'openpyxl' if file_ext == '.xlsx' else 'xlrd'
-                    df = pd.read_excel(file_path, engine=engine)
-                except Exception as e:
-                    logger.warning(f"Failed to read with {engine}, trying other engines")
-                    try:
-                        df = pd.read_excel(file_path, engine=None)  # حاول مع جميع المحركات المتاحة
-                    except Exception as e:
-                        raise ValueError(f'لا يمكن قراءة ملف Excel: {str(e)}')
-            
-            if df.empty:
-                raise ValueError('لا توجد بيانات في الملف')
-                
-            # توحيد أسماء الأعمدة
-            df.columns = df.columns.str.strip().str.lower()
-            
-        except Exception as e:
-            raise ValueError(f'خطأ في قراءة الملف: {str(e)}')
-
-        # === التحقق من البيانات ===
-        required_columns = {'title', 'year', 'rating'}
-        missing_cols = required_columns - set(df.columns.str.lower())
-        if missing_cols:
-            raise ValueError(f'الأعمدة المطلوبة مفقودة: {", ".join(missing_cols)}')
-
-        # === تحضير البيانات ===
-        movies_to_create = []
-        error_rows = []
-        
-        for idx, row in df.iterrows():
-            try:
-                movie_data = {
-                    'title': str(row['title']).strip()[:255] if pd.notna(row.get('title')) else None,
-                    'year': int(row['year']) if pd.notna(row.get('year')) else None,
-                    'rating': float(row['rating']) if pd.notna(row.get('rating')) else 0.0,
-                    'genre': str(row.get('genre', '')).strip()[:255] if pd.notna(row.get('genre')) else '',
-                    'director': str(row.get('director', '')).strip()[:255] if pd.notna(row.get('director')) else '',
-                    'runtime': int(row.get('runtime', 0)) if pd.notna(row.get('runtime')) else 0,
-                    'votes': int(row.get('votes', 0)) if pd.notna(row.get('votes')) else 0,
-                    'revenue': float(row.get('revenue', 0.0)) if pd.notna(row.get('revenue')) else 0.0,
-                    'metascore': int(row.get('metascore', 0)) if pd.notna(row.get('metascore')) else 0,
-                }
-                
-                # التحقق من صحة البيانات
-                if not movie_data['title']:
-                    raise ValidationError('عنوان الفيلم مطلوب')
-                    
-                if movie_data['year'] is None:
-                    raise ValidationError('سنة الإنتاج مطلوبة')
-                    
-                if not (1888 <= movie_data['year'] <= 2100):
-                    raise ValidationError('سنة الإنتاج يجب أن تكون بين 1888 و 2100')
-                    
-                if not (0 <= movie_data['rating'] <= 10):
-                    raise ValidationError('التقييم يجب أن يكون بين 0 و 10')
-                    
-                movies_to_create.append(Movie(**movie_data))
-                
-            except Exception as e:
-                error_rows.append((idx + 2, str(e)))
-                continue
-
-        if not movies_to_create:
-            raise ValueError('لا توجد بيانات صالحة للحفظ')
-
-        # === حفظ البيانات ===
-        with transaction.atomic():
-            created_movies = Movie.objects.bulk_create(
-                movies_to_create,
-                batch_size=50,
-                ignore_conflicts=True
+        # ملف واحد يُقرأ مباشرة من الرفع (الذاكرة أو الملف المؤقت لـ Django) على أجزاء،
+        # دون نسخه إلى MEDIA_ROOT؛ وعدة ملفات أو أرشيف أو كل أوراق المصنف تُحوَّل
+        # بالتوازي في عمليات منفصلة مع كاتب واحد
+
+        def report_chunk(chunk_number, chunk_result):
+            """تسجيل تقدم الاستيراد؛ تفاصيل الصفوف المرفوضة في تقرير ImportRun لا في السجل"""
+            logger.info(
+                f"Import chunk {chunk_number}: {chunk_result['rows']} rows, "
+                f"{chunk_result['created']} saved, {chunk_result['updated']} updated, "
+                f"{chunk_result['unchanged']} unchanged, {len(chunk_result['error_rows'])} errors"
             )
-            created_count = len(created_movies)
-            
-            result_msg = f'تم حفظ {created_count} أفلام بنجاح'
-            if error_rows:
-                result_msg += f' (تم تجاهل {len(error_rows)} صفاً)'
-                logger.warning(f"Rows with errors: {error_rows}")
-            
-            messages.success(request, result_msg)
-            return redirect('results')
-            
+
+        # === التحقق والتحويل والحفظ جزءاً بجزء ===
+        # الملف كاملاً أو لا شيء، إلا إذا طُلب التثبيت كل N دفعة (MOVIES_IMPORT_COMMIT_EVERY)
+        source = ', '.join(file.name for file in files)
+        # كل الصفوف المرفوضة تُكتب إلى تقرير CSV على القرص يُنزَّل من رابط في رسالة النتيجة
+        error_report = ErrorReportWriter(source)
+        options = {
+            'batch_size': form.cleaned_data.get('batch_size'),
+            'on_chunk': report_chunk,
+            'mode': form.cleaned_data['mode'],
+            'error_report': error_report,
+        }
+        # قياس مراحل الاستيراد (ImportRun) خارج المعاملة ليُحفظ حتى عند الفشل
+        with error_report, \
+                record_import(source, ImportRun.ORIGIN_UPLOAD, sum(file.size for file in files)) as run:
+            with nullcontext() if get_commit_every() else transaction.atomic():
+                result = import_uploads(files, all_sheets=all_sheets, **options)
+            run.result = result
+
+        result_msg = import_summary(result)
+        if result.get('sources', 1) > 1:
+            result_msg += f' - من {result["sources"]} ملفات/أوراق'
+        elif result['chunks'] > 1:
+            result_msg += f' - {result["rows"]} صفاً في {result["chunks"]} أجزاء'
+
+        messages.success(request, with_error_report_link(result_msg, error_report))
+        return redirect('results')
+
     except ValueError as e:
-        messages.error(request, str(e))
+        messages.error(request, with_error_report_link(str(e), error_report))
         logger.error(f"Validation error: {str(e)}")
     except (DatabaseError, OperationalError) as e:
         logger.critical(f"Database error: {str(e)}\n{traceback.format_exc()}")
@@ -228,11 +264,76 @@ def upload_file(request):
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}\n{traceback.format_exc()}")
         messages.error(request, 'حدث خطأ غير متوقع أثناء معالجة الملف')
-    finally:
-        if temp_path and default_storage.exists(temp_path):
-            try:
-                default_storage.delete(temp_path)
-            except Exception as e:
-                logger.error(f"Error deleting temp file: {str(e)}")
-
-    return render(request, 'movies/upload.html', {'form': form})
\ No newline at end of file
+
+    return render(request, 'movies/upload.html', {'form': form})
+
+
+def with_error_report_link(message, error_report):
+    """رسالة النتيجة مع رابط تنزيل تقرير الصفوف المرفوضة إن وُجدت"""
+    if error_report is None or not error_report.available:
+        return message
+    return format_html(
+        '{} - <a href="{}" class="alert-link">تنزيل تقرير الصفوف المرفوضة ({} صفاً)</a>',
+        message, reverse('import_error_report', args=[error_report.report_id]), error_report.count
+    )
+
+
+def import_error_report(request, report_id):
+    """تنزيل تقرير الصفوف المرفوضة (CSV) كملف متدفق من القرص"""
+    path = report_path(report_id)
+    if path is None or not os.path.isfile(path):
+        raise Http404('التقرير غير موجود أو انتهت صلاحيته')
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f'import-errors-{report_id[:8]}.csv',
+        content_type='text/csv; charset=utf-8',
+    )
+
+
+def import_status(request, job_id):
+    """حالة مهمة الاستيراد الخلفية بصيغة JSON لتستعلم عنها صفحة النتائج دورياً"""
+    job = get_object_or_404(ImportJob, pk=job_id)
+    return JsonResponse(job_status(job))
+
+
+def export_results(request, fmt):
+    """تنزيل الأفلام بشروط التصفية وترتيب صفحة النتائج الحاليين كملف CSV أو Excel متدفق"""
+    if fmt not in EXPORT_FORMATS:
+        raise Http404('صيغة تصدير غير مدعومة')
+    filters = MovieFilterForm(request.GET).active_filters()
+    return export_response(filter_movies(Movie.objects.all(), filters), fmt, request.GET.get('sort'))
+
+
+def analytics_rollup(request, name):
+    """تجميع لوحة التحليلات المحسوب مسبقاً (JSON) لرسم المخططات"""
+    if name not in ROLLUPS:
+        raise Http404('تجميع غير معروف')
+    rollup = get_rollup(name)
+    return JsonResponse({'name': rollup.name, 'refreshed_at': rollup.refreshed_at, 'data': rollup.data})
+
+
+# عناوين فئات مدرج زمن الطلب في صفحة القياس
+LATENCY_LABELS = [f'<= {limit} ms' for limit in LATENCY_BUCKETS_MS] + [f'> {LATENCY_BUCKETS_MS[-1]} ms']
+
+
+def request_profile(request):
+    """
+    صفحة قياس الطلبات، وفيها نصوص استعلامات SQL: تُعرض فقط عند تفعيل القياس،
+    للمشرفين (is_staff)، أو في وضع DEBUG من الجهاز المحلي أو INTERNAL_IPS.
+    عنوان المرسل وحده لا يكفي لأن كل الطلبات خلف وكيل عكسي على الخادم نفسه تبدو محلية.
+    """
+    local = request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1', *getattr(settings, 'INTERNAL_IPS', ()))
+    if not profiling_enabled() or not (request.user.is_staff or (settings.DEBUG and local)):
+        raise Http404()
+    routes = profile_store.summary()
+    for route in routes:
+        route['buckets'] = [
+            {'label': label, 'count': count, 'percent': round(count * 100 / route['requests'])}
+            for label, count in zip(LATENCY_LABELS, route['histogram'])
+        ]
+    return render(request, 'movies/request_profile.html', {
+        'enabled': profiling_enabled(),
+        'routes': routes,
+        'window': get_window(),
+    })